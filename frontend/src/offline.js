@@ -910,13 +910,17 @@ export async function fetchItemStockQuantities(items, pos_profile, chunkSize = 1
 	const allItems = [];
 	try {
 		for (let i = 0; i < items.length; i += chunkSize) {
-			const chunk = items.slice(i, i + chunkSize);
+			// Only stock is needed: send slim rows and let the server run the Bin lookup alone.
+			const chunk = items
+				.slice(i, i + chunkSize)
+				.map((item) => ({ item_code: item.item_code, has_variants: item.has_variants }));
 			const response = await new Promise((resolve, reject) => {
 				frappe.call({
 					method: "posawesome.posawesome.api.items.get_items_details",
 					args: {
-						pos_profile: JSON.stringify(pos_profile),
+						pos_profile: JSON.stringify(pos_profile?.name ? { name: pos_profile.name } : pos_profile),
 						items_data: JSON.stringify(chunk),
+						fields: JSON.stringify(["actual_qty"]),
 					},
 					freeze: false,
 					callback: function (r) {
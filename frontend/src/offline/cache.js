@@ -41,6 +41,8 @@ export const memory = {
         pricing_rules_last_sync: null,
         pricing_rules_stale_at: null,
 	items_last_sync: null,
+	items_sync_sequence: null,
+	items_snapshot_etag: null,
 	customers_last_sync: null,
 	// Track the current cache schema version
 	cache_version: CACHE_VERSION,
@@ -296,6 +298,15 @@ export function setItemsLastSync(ts) {
 	persist("items_last_sync", memory.items_last_sync);
 }
 
+export function getItemsSyncSequence() {
+	return memory.items_sync_sequence ?? null;
+}
+
+export function setItemsSyncSequence(sequence) {
+	memory.items_sync_sequence = sequence;
+	persist("items_sync_sequence", memory.items_sync_sequence);
+}
+
 export function getCustomersLastSync() {
 	return memory.customers_last_sync || null;
 }
@@ -550,6 +561,8 @@ export async function clearAllCache() {
         memory.stock_cache_ready = false;
         memory.customer_storage = [];
         memory.items_last_sync = null;
+        memory.items_sync_sequence = null;
+        memory.items_snapshot_etag = null;
         memory.customers_last_sync = null;
         memory.pos_opening_storage = null;
         memory.opening_dialog_storage = null;
@@ -598,6 +611,8 @@ export async function forceClearAllCache() {
 	memory.stock_cache_ready = false;
 	memory.customer_storage = [];
 	memory.items_last_sync = null;
+	memory.items_sync_sequence = null;
+	memory.items_snapshot_etag = null;
 	memory.customers_last_sync = null;
 	memory.pos_opening_storage = null;
 	memory.opening_dialog_storage = null;
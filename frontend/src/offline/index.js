@@ -25,6 +25,8 @@ export {
 	clearCustomerStorage,
 	getItemsLastSync,
 	setItemsLastSync,
+	getItemsSyncSequence,
+	setItemsSyncSequence,
 	getCustomersLastSync,
 	setCustomersLastSync,
 	getSalesPersonsStorage,
@@ -74,6 +76,7 @@ export {
 	getLocalStockCache,
 	setLocalStockCache,
 	fetchItemStockQuantities,
+	refreshStockSnapshot,
 	updateLocalStockWithActualQuantities,
 } from "./stock.js";
 
@@ -113,6 +116,9 @@ export {
 	saveItemsBulk,
 	getAllStoredItems,
 	searchStoredItems,
+	bootstrapItems,
+	syncItemChanges,
+	loadCatalogueSnapshot,
 } from "./items.js";
 
 export { saveItemGroups, getCachedItemGroups, clearItemGroups } from "./item_groups.js";
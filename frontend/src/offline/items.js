@@ -1,4 +1,4 @@
-import { memory } from "./cache.js";
+import { memory, getItemsSyncSequence, setItemsLastSync, setItemsSyncSequence } from "./cache.js";
 import { persist, db, checkDbHealth } from "./core.js";
 
 export function saveItemUOMs(itemCode, uoms) {
@@ -237,6 +237,162 @@ export async function saveItemsBulk(items) {
 	}
 }
 
+const ITEM_SYNC_URL = "/api/method/posawesome.posawesome.api.item_sync.sync_items";
+
+async function fetchItemSyncChunk(params) {
+	const query = new URLSearchParams();
+	Object.entries(params).forEach(([key, value]) => {
+		if (value !== undefined && value !== null && value !== "") {
+			query.set(key, value);
+		}
+	});
+	const headers = { Accept: "application/x-ndjson" };
+	if (typeof frappe !== "undefined" && frappe.csrf_token) {
+		headers["X-Frappe-CSRF-Token"] = frappe.csrf_token;
+	}
+	const res = await fetch(`${ITEM_SYNC_URL}?${query.toString()}`, {
+		headers,
+		credentials: "same-origin",
+	});
+	if (!res.ok) {
+		throw new Error(`Item sync failed with status ${res.status}`);
+	}
+	const lines = (await res.text()).split("\n").filter(Boolean);
+	const header = JSON.parse(lines.shift() || "{}");
+	const fields = header.fields || [];
+	const items = lines.map((line) => {
+		const values = JSON.parse(line);
+		const item = {};
+		fields.forEach((field, idx) => {
+			item[field] = values[idx];
+		});
+		return item;
+	});
+	return { header, items };
+}
+
+// Download the whole profile catalogue in keyset order and store it locally.
+// Pass the returned cursor back in to resume an interrupted bootstrap.
+export async function bootstrapItems(
+	posProfile,
+	{ priceList = null, customer = null, chunkSize = 2000, cursor = null, onProgress = null } = {},
+) {
+	let loaded = 0;
+	let header = {};
+	do {
+		const chunk = await fetchItemSyncChunk({
+			pos_profile: posProfile,
+			cursor,
+			chunk_size: chunkSize,
+			price_list: priceList,
+			customer,
+		});
+		header = chunk.header;
+		if (chunk.items.length) {
+			await saveItemsBulk(chunk.items);
+		}
+		loaded += chunk.items.length;
+		cursor = header.cursor || null;
+		if (onProgress) {
+			onProgress({ loaded, cursor, done: !!header.done });
+		}
+	} while (cursor);
+
+	setItemsLastSync(header.snapshot || new Date().toISOString());
+	if (header.sequence !== undefined) {
+		setItemsSyncSequence(header.sequence);
+	}
+	return { loaded, snapshot: header.snapshot, sequence: header.sequence };
+}
+
+const SNAPSHOT_URL = "/api/method/posawesome.posawesome.api.item_snapshot.get_catalogue_snapshot";
+
+// Load the prebuilt catalogue snapshot of the profile. Returns null when the
+// server is still building it so callers can fall back to bootstrapItems.
+export async function loadCatalogueSnapshot(posProfile) {
+	const headers = { Accept: "application/json" };
+	if (memory.items_snapshot_etag) {
+		headers["If-None-Match"] = memory.items_snapshot_etag;
+	}
+	const res = await fetch(`${SNAPSHOT_URL}?${new URLSearchParams({ pos_profile: posProfile })}`, {
+		headers,
+		credentials: "same-origin",
+	});
+	if (res.status === 304) {
+		return { loaded: 0, notModified: true };
+	}
+	if (res.status === 202) {
+		return null;
+	}
+	if (!res.ok) {
+		throw new Error(`Catalogue snapshot failed with status ${res.status}`);
+	}
+
+	const snapshot = await res.json();
+	const fields = snapshot.fields || [];
+	const columns = snapshot.columns || {};
+	const items = [];
+	for (let i = 0; i < (snapshot.count || 0); i++) {
+		const item = {};
+		fields.forEach((field) => {
+			item[field] = columns[field] ? columns[field][i] : undefined;
+		});
+		items.push(item);
+	}
+
+	await clearStoredItems();
+	await saveItemsBulk(items);
+	setItemsLastSync(new Date().toISOString());
+	setItemsSyncSequence(snapshot.sequence);
+	memory.items_snapshot_etag = res.headers.get("ETag");
+	persist("items_snapshot_etag", memory.items_snapshot_etag);
+	return { loaded: items.length, notModified: false, sequence: snapshot.sequence };
+}
+
+// Apply the server change feed since the last stored sync token. Falls back
+// to a full bootstrap when the server can no longer provide a delta.
+export async function syncItemChanges(posProfile, { priceList = null, customer = null } = {}) {
+	const since = getItemsSyncSequence();
+	if (since === null || since === undefined) {
+		const result = await bootstrapItems(posProfile, { priceList, customer });
+		return { ...result, fullReload: true, updated: result.loaded, removed: 0 };
+	}
+
+	const { message } = await frappe.call({
+		method: "posawesome.posawesome.api.item_sync.get_item_changes",
+		args: {
+			pos_profile: posProfile,
+			since,
+			price_list: priceList,
+			customer,
+		},
+	});
+	const delta = message || {};
+	if (delta.full_reload) {
+		await clearStoredItems();
+		const result = await bootstrapItems(posProfile, { priceList, customer });
+		return { ...result, fullReload: true, updated: result.loaded, removed: 0 };
+	}
+
+	const items = delta.items || [];
+	const removed = delta.removed || [];
+	if (items.length) {
+		await saveItemsBulk(items);
+	}
+	if (removed.length) {
+		try {
+			await checkDbHealth();
+			if (!db.isOpen()) await db.open();
+			await db.table("items").bulkDelete(removed);
+		} catch (e) {
+			console.error("Failed to remove stale items", e);
+		}
+	}
+	setItemsLastSync(new Date().toISOString());
+	setItemsSyncSequence(delta.sequence);
+	return { fullReload: false, updated: items.length, removed: removed.length, sequence: delta.sequence };
+}
+
 export async function getAllStoredItems() {
 	try {
 		await checkDbHealth();
@@ -159,23 +159,68 @@ export function updateLocalStockCache(items) {
 	}
 }
 
+// Version of the last stock snapshot merged into the local stock cache and
+// the item codes it covers.
+let stockSnapshotVersion = null;
+let stockSnapshotCodes = new Set();
+
 export function clearLocalStockCache() {
 	memory.local_stock_cache = {};
+	stockSnapshotVersion = null;
+	stockSnapshotCodes = new Set();
 	persist("local_stock_cache", memory.local_stock_cache);
 }
 
+// Poll the stock snapshot endpoint; after the first call only items whose
+// stock changed since the previous snapshot are returned and merged.
+export async function refreshStockSnapshot(itemCodes, pos_profile) {
+	const codes = (itemCodes || []).filter(Boolean);
+	if (!codes.length || !pos_profile?.name) {
+		return [];
+	}
+	// Items not covered by the previous snapshot need a full one.
+	const since = codes.every((code) => stockSnapshotCodes.has(code)) ? stockSnapshotVersion : null;
+	try {
+		const { message } = await frappe.call({
+			method: "posawesome.posawesome.api.stock_snapshot.get_stock_snapshot",
+			args: {
+				item_codes: JSON.stringify(codes),
+				pos_profile: pos_profile.name,
+				since,
+			},
+			freeze: false,
+		});
+		if (!message) {
+			return [];
+		}
+		updateLocalStockCache(message.items || []);
+		if (since === null) {
+			stockSnapshotCodes = new Set(codes);
+		}
+		stockSnapshotVersion = message.version;
+		return message.items || [];
+	} catch (error) {
+		console.error("Failed to refresh stock snapshot:", error);
+		return [];
+	}
+}
+
 // Add this new function to fetch stock quantities
 export async function fetchItemStockQuantities(items, pos_profile, chunkSize = 100) {
 	const allItems = [];
 	try {
 		for (let i = 0; i < items.length; i += chunkSize) {
-			const chunk = items.slice(i, i + chunkSize);
+			// Only stock is needed: send slim rows and let the server run the Bin lookup alone.
+			const chunk = items
+				.slice(i, i + chunkSize)
+				.map((item) => ({ item_code: item.item_code, has_variants: item.has_variants }));
 			const response = await new Promise((resolve, reject) => {
 				frappe.call({
 					method: "posawesome.posawesome.api.items.get_items_details",
 					args: {
-						pos_profile: JSON.stringify(pos_profile),
+						pos_profile: JSON.stringify(pos_profile?.name ? { name: pos_profile.name } : pos_profile),
 						items_data: JSON.stringify(chunk),
+						fields: JSON.stringify(["actual_qty"]),
 					},
 					freeze: false,
 					callback: function (r) {
@@ -6,6 +6,24 @@ import { updateLocalStock } from "./stock.js";
 // Flag to avoid concurrent invoice syncs which can cause duplicate submissions
 let invoiceSyncInProgress = false;
 
+// Offline invoices replayed per request.
+const REPLAY_CHUNK_SIZE = 50;
+
+// Client generated id the server uses to recognise replays of the same invoice.
+function newOfflineUuid() {
+	if (typeof crypto !== "undefined" && crypto.randomUUID) {
+		return crypto.randomUUID();
+	}
+	return frappe.utils.get_random(32);
+}
+
+function ensureOfflineUuid(entry) {
+	if (entry.invoice && !entry.invoice.posa_offline_uuid) {
+		entry.invoice.posa_offline_uuid = (entry.data && entry.data.idempotency_key) || newOfflineUuid();
+	}
+	return entry;
+}
+
 export function saveOfflineInvoice(entry) {
 	// Validate that invoice has items before saving
 	if (!entry.invoice || !Array.isArray(entry.invoice.items) || !entry.invoice.items.length) {
@@ -26,7 +44,7 @@ export function saveOfflineInvoice(entry) {
 		throw e;
 	}
 
-	entries.push(cleanEntry);
+	entries.push(ensureOfflineUuid(cleanEntry));
 	if (entries.length > MAX_QUEUE_ITEMS) {
 		entries.splice(0, entries.length - MAX_QUEUE_ITEMS);
 	}
@@ -210,33 +228,41 @@ export async function syncOfflineInvoices() {
 			return { pending: invoices.length, synced: 0, drafted: 0 };
 		}
 
+		// Invoices queued before offline UUIDs existed get one now, persisted
+		// before the replay so a retry after a dropped response reuses it.
+		invoices.forEach(ensureOfflineUuid);
+		persist("offline_invoices", memory.offline_invoices);
+
 		const failures = [];
 		let synced = 0;
 		let drafted = 0;
 
-		for (const inv of invoices) {
+		for (let i = 0; i < invoices.length; i += REPLAY_CHUNK_SIZE) {
+			const chunk = invoices.slice(i, i + REPLAY_CHUNK_SIZE);
+			let results;
 			try {
-				await frappe.call({
-					method: "posawesome.posawesome.api.invoices.submit_invoice",
-					args: {
-						invoice: inv.invoice,
-						data: inv.data,
-					},
+				const { message } = await frappe.call({
+					method: "posawesome.posawesome.api.offline_invoices.replay_offline_invoices",
+					args: { invoices: JSON.stringify(chunk) },
 				});
-				synced++;
+				results = message || [];
 			} catch (error) {
-				console.error("Failed to submit invoice, saving as draft", error);
-				try {
-					await frappe.call({
-						method: "posawesome.posawesome.api.invoices.update_invoice",
-						args: { data: inv.invoice },
-					});
-					drafted += 1;
-				} catch (draftErr) {
-					console.error("Failed to save invoice as draft", draftErr);
+				console.error("Failed to replay offline invoices", error);
+				failures.push(...chunk);
+				continue;
+			}
+			chunk.forEach((inv, index) => {
+				const result = results[index];
+				if (!result || result.status === "Failed") {
+					console.error("Failed to sync offline invoice", result && result.error);
 					failures.push(inv);
+				} else if (result.status === "Drafted") {
+					console.error("Failed to submit invoice, saved as draft", result.error);
+					drafted += 1;
+				} else {
+					synced++;
 				}
-			}
+			});
 		}
 
 		// Reset saved invoices and totals after successful sync
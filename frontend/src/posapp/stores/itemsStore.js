@@ -81,6 +81,12 @@ export const useItemsStore = defineStore("items", () => {
 		return LIMIT_SEARCH_FALLBACK;
 	};
 
+	// The server resolves the profile from its own cache, so only send its name.
+	const profileReference = () =>
+		posProfile.value?.name
+			? JSON.stringify({ name: posProfile.value.name })
+			: JSON.stringify(posProfile.value);
+
 	const resolvePageSize = (pageSize = DEFAULT_PAGE_SIZE) => {
 		if (limitSearchEnabled.value) {
 			return resolveLimitSearchSize();
@@ -311,7 +317,7 @@ export const useItemsStore = defineStore("items", () => {
 
 			// Fetch from server
 			const args = {
-				pos_profile: JSON.stringify(posProfile.value),
+				pos_profile: profileReference(),
 				price_list: priceList || activePriceList.value,
 				item_group: normalizedGroup !== "ALL" ? normalizedGroup.toLowerCase() : "",
 				search_value: searchValue || "",
@@ -929,7 +935,7 @@ export const useItemsStore = defineStore("items", () => {
 				const response = await frappe.call({
 					method: "posawesome.posawesome.api.items.get_items",
 					args: {
-						pos_profile: JSON.stringify(posProfile.value),
+						pos_profile: profileReference(),
 						price_list: activePriceList.value,
 						item_group: normalizedGroup !== "ALL" ? normalizedGroup.toLowerCase() : "",
 						search_value: "",
@@ -1081,7 +1087,7 @@ export const useItemsStore = defineStore("items", () => {
 			const response = await frappe.call({
 				method: "posawesome.posawesome.api.items.get_items_details",
 				args: {
-					pos_profile: JSON.stringify(posProfile.value),
+					pos_profile: profileReference(),
 					items_data: JSON.stringify(itemBatch),
 					price_list: activePriceList.value,
 				},
@@ -0,0 +1,41 @@
+/* global frappe */
+
+const STATUS_METHOD = "posawesome.posawesome.api.submission_queue.get_submission_status";
+const FINAL_STATUSES = ["Submitted", "Failed"];
+
+// Idempotency key sent with a submission; retries of the same invoice reuse it.
+export function newSubmissionKey() {
+	if (typeof crypto !== "undefined" && crypto.randomUUID) {
+		return crypto.randomUUID();
+	}
+	return frappe.utils.get_random(32);
+}
+
+// Poll a queued submission until it is submitted or failed and pass the final
+// status entry ({ key, invoice, status, error }) to onDone.
+export function watchSubmission(key, onDone, { interval = 3000, attempts = 200 } = {}) {
+	let remaining = attempts;
+
+	const poll = async () => {
+		remaining -= 1;
+		try {
+			const { message } = await frappe.call({
+				method: STATUS_METHOD,
+				args: { keys: JSON.stringify([key]) },
+				freeze: false,
+			});
+			const entry = (message || [])[0];
+			if (entry && FINAL_STATUSES.includes(entry.status)) {
+				onDone(entry);
+				return;
+			}
+		} catch (error) {
+			console.error("Failed to poll invoice submission:", error);
+		}
+		if (remaining > 0) {
+			setTimeout(poll, interval);
+		}
+	};
+
+	setTimeout(poll, interval);
+}
@@ -0,0 +1,7 @@
+"""Benchmarks for POS Awesome hot paths.
+
+Each module exposes a ``run`` function meant to be executed against a site
+with representative data, e.g.::
+
+    bench --site mysite execute posawesome.benchmarks.item_batches.run --kwargs "{'warehouse': 'Stores - C'}"
+"""
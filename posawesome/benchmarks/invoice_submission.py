@@ -0,0 +1,123 @@
+"""Per-invoice latency and query count of the draft and single pass submissions.
+
+Every lane is a thread with its own site connection submitting ``invoices``
+sales of one item; lanes run concurrently to show lock contention. Use an
+item with enough stock (or allow negative stock) and an open POS Opening
+Shift of the profile::
+
+    bench --site mysite execute posawesome.benchmarks.invoice_submission.run \
+        --kwargs "{'pos_profile': 'Main POS', 'item_code': 'SKU-001', 'pos_opening_shift': 'POS-OS-0001'}"
+
+Submitted invoices are kept; run it on a test site.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import frappe
+from frappe.utils import flt, nowdate
+
+from posawesome.posawesome.api.invoices import _submit_invoice
+
+from .utils import count_queries
+
+LANES = (1, 10, 50)
+
+
+def _payload(profile: Dict[str, Any], item_code: str, rate: float, pos_opening_shift: Optional[str]):
+    payment = next((row for row in profile.get("payments") or [] if row.get("default")), None)
+    payment = payment or (profile.get("payments") or [{}])[0]
+    return {
+        "company": profile.company,
+        "pos_profile": profile.name,
+        "posa_pos_opening_shift": pos_opening_shift,
+        "customer": profile.customer,
+        "posting_date": nowdate(),
+        "currency": profile.currency,
+        "selling_price_list": profile.selling_price_list,
+        "is_pos": 1,
+        "update_stock": 1,
+        "items": [
+            {
+                "item_code": item_code,
+                "qty": 1,
+                "rate": rate,
+                "price_list_rate": rate,
+                "warehouse": profile.warehouse,
+            }
+        ],
+        "payments": [{"mode_of_payment": payment.get("mode_of_payment"), "amount": rate}],
+    }
+
+
+def _lane(site, user, payload, invoices, single_pass, results, index):
+    frappe.init(site=site)
+    frappe.connect()
+    frappe.set_user(user)
+    timings: List[float] = []
+    queries = 0
+    try:
+        for _ in range(invoices):
+            with count_queries() as counter:
+                started = time.perf_counter()
+                _submit_invoice(copy.deepcopy(payload), {}, single_pass=single_pass)
+                frappe.db.commit()
+                timings.append(time.perf_counter() - started)
+            queries += counter["queries"]
+        results[index] = {"timings": timings, "queries": queries}
+    except Exception:
+        frappe.db.rollback()
+        results[index] = {"error": frappe.get_traceback()}
+    finally:
+        frappe.destroy()
+
+
+def _run_lanes(payload, lanes, invoices, single_pass):
+    results: List[Optional[Dict[str, Any]]] = [None] * lanes
+    site, user = frappe.local.site, frappe.session.user
+    threads = [
+        threading.Thread(target=_lane, args=(site, user, payload, invoices, single_pass, results, index))
+        for index in range(lanes)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    errors = [result["error"] for result in results if result and "error" in result]
+    timings = sorted(t for result in results if result and "timings" in result for t in result["timings"])
+    if not timings:
+        return {"errors": len(errors), "first_error": errors[0] if errors else None}
+    queries = sum(result.get("queries", 0) for result in results if result)
+    return {
+        "invoices": len(timings),
+        "errors": len(errors),
+        "queries_per_invoice": round(queries / len(timings), 1),
+        "avg_ms": round(sum(timings) / len(timings) * 1000, 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+        "invoices_per_second": round(len(timings) / elapsed, 2),
+    }
+
+
+def run(pos_profile, item_code, pos_opening_shift=None, rate=None, invoices=5, lanes=LANES):
+    """Submit ``invoices`` per lane with both paths at every lane count."""
+
+    profile = frappe.get_doc("POS Profile", pos_profile).as_dict()
+    if rate is None:
+        price_filters = {"item_code": item_code, "price_list": profile.selling_price_list}
+        rate = frappe.db.get_value("Item Price", price_filters, "price_list_rate")
+    payload = _payload(profile, item_code, flt(rate) or 1, pos_opening_shift)
+
+    report = {}
+    for count in lanes:
+        report[count] = {
+            "draft": _run_lanes(payload, int(count), int(invoices), single_pass=False),
+            "single_pass": _run_lanes(payload, int(count), int(invoices), single_pass=True),
+        }
+    return report
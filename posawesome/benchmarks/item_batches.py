@@ -0,0 +1,74 @@
+"""Batch quantity lookups: per-item ``get_batch_qty`` loop versus one grouped query.
+
+Usage::
+
+    bench --site mysite execute posawesome.benchmarks.item_batches.run \
+        --kwargs "{'pos_profile': 'Main POS', 'limit': 100}"
+"""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import frappe
+from erpnext.stock.doctype.batch.batch import get_batch_qty
+from frappe.utils import flt
+
+from posawesome.posawesome.api import item_fetchers
+from posawesome.posawesome.api.item_fetchers import ItemDetailAggregator
+
+from .utils import clear_item_caches, measure
+
+
+def _legacy_fetch_batches(warehouse, item_codes):
+    """The previous implementation issuing one ``get_batch_qty`` call per item."""
+
+    rows = []
+    for item_code in item_codes:
+        for batch in get_batch_qty(item_code=item_code, warehouse=warehouse) or []:
+            if batch.get("batch_no") and flt(batch.get("qty")) > 0:
+                rows.append(
+                    frappe._dict(
+                        {
+                            "item_code": item_code,
+                            "batch_no": batch.get("batch_no"),
+                            "batch_qty": batch.get("qty"),
+                            "expiry_date": batch.get("expiry_date"),
+                            "batch_price": batch.get("posa_batch_price"),
+                            "manufacturing_date": batch.get("manufacturing_date"),
+                        }
+                    )
+                )
+    return rows
+
+
+def _build_details(pos_profile, items):
+    clear_item_caches()
+    ItemDetailAggregator(pos_profile).build_details(items)
+
+
+def run(pos_profile, limit=100, repeat=3):
+    profile = frappe.get_doc("POS Profile", pos_profile).as_dict()
+    items = frappe.get_all(
+        "Item",
+        filters={"has_batch_no": 1, "disabled": 0, "is_sales_item": 1},
+        fields=["name as item_code", "item_name", "stock_uom", "has_batch_no", "has_serial_no"],
+        limit_page_length=int(limit),
+    )
+    codes = tuple(sorted(item.item_code for item in items))
+
+    results = {
+        "items": len(codes),
+        "fetch_batches": {
+            "legacy": measure(_legacy_fetch_batches, profile.warehouse, codes, repeat=repeat),
+            "grouped": measure(item_fetchers._fetch_batches, profile.warehouse, codes, repeat=repeat),
+        },
+    }
+
+    with patch.object(item_fetchers, "_fetch_batches", _legacy_fetch_batches):
+        legacy = measure(_build_details, profile, items, repeat=repeat)
+    grouped = measure(_build_details, profile, items, repeat=repeat)
+    clear_item_caches()
+
+    results["build_details"] = {"legacy": legacy, "grouped": grouped}
+    return results
@@ -0,0 +1,82 @@
+"""Cache hit rate of whole-tuple keys versus per item keys for item lookups.
+
+Replays a paged catalogue load with overlapping pages followed by single item
+lookups (as done when scanning items into the cart) against both keying
+schemes and reports the hit rate and the queries issued. Whole-tuple lookups
+count one event per request, per item lookups one per item code.
+
+Usage::
+
+    bench --site mysite execute posawesome.benchmarks.item_cache_hits.run \
+        --kwargs "{'pos_profile': 'Main POS', 'items': 500}"
+"""
+
+from __future__ import annotations
+
+import random
+
+import frappe
+
+from posawesome.posawesome.api import item_fetchers
+from posawesome.posawesome.api.item_cache import get_cache_stats, reset_cache_stats, single_flight
+
+from .utils import clear_item_caches, count_queries
+
+
+def _whole_tuple_bin_qty():
+    """The previous keying: one cache entry per exact tuple of item codes."""
+
+    def whole_tuple_bin_qty(warehouse, item_codes):
+        return item_fetchers._fetch_bin_qty(warehouse, item_codes)
+
+    # Key the entries under item_fetchers so clear_item_caches drops them too.
+    whole_tuple_bin_qty.__module__ = item_fetchers.__name__
+    whole_tuple_bin_qty.__qualname__ = "whole_tuple_bin_qty"
+    return single_flight(ttl=3600)(whole_tuple_bin_qty)
+
+
+def _workload(codes, page_size, overlap, lookups):
+    step = max(page_size - overlap, 1)
+    requests = [tuple(codes[start : start + page_size]) for start in range(0, len(codes), step)]
+    rng = random.Random(42)
+    requests.extend((code,) for code in rng.sample(codes, min(lookups, len(codes))))
+    return requests
+
+
+def _replay(lookup, warehouse, requests):
+    clear_item_caches()
+    reset_cache_stats()
+    with count_queries() as counter:
+        for codes in requests:
+            lookup(warehouse, codes)
+
+    hits = misses = 0
+    for events in get_cache_stats().values():
+        hits += events["hit"] + events["stale"] + events["wait"]
+        misses += events["miss"] + events["refresh"]
+    lookups = hits + misses
+    return {
+        "queries": counter["queries"],
+        "lookups": lookups,
+        "hit_rate": round(hits / lookups, 3) if lookups else 0,
+    }
+
+
+def run(pos_profile, items=500, page_size=100, overlap=50, lookups=200):
+    profile = frappe.get_doc("POS Profile", pos_profile).as_dict()
+    codes = frappe.get_all(
+        "Item",
+        filters={"disabled": 0, "is_sales_item": 1},
+        pluck="name",
+        order_by="name asc",
+        limit_page_length=int(items),
+    )
+    requests = _workload(codes, int(page_size), int(overlap), int(lookups))
+
+    results = {
+        "requests": len(requests),
+        "whole_tuple": _replay(_whole_tuple_bin_qty(), profile.warehouse, requests),
+        "per_item": _replay(item_fetchers.get_bin_qty, profile.warehouse, requests),
+    }
+    clear_item_caches()
+    return results
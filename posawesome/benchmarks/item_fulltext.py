@@ -0,0 +1,124 @@
+"""Standard, full-text (MATCH ... AGAINST) and ranked item search on a large catalogue.
+
+``seed`` bulk inserts synthetic items (named ``POSA-FT-<n>``) so the search can
+be measured on a 100k item catalogue; ``cleanup`` removes them again::
+
+    bench --site mysite execute posawesome.benchmarks.item_fulltext.seed --kwargs "{'count': 100000}"
+    bench --site mysite execute posawesome.benchmarks.item_fulltext.run \
+        --kwargs "{'pos_profile': 'Main POS', 'search': 'organic green tea'}"
+    bench --site mysite execute posawesome.benchmarks.item_fulltext.cleanup
+"""
+
+from __future__ import annotations
+
+import random
+
+import frappe
+from frappe.utils import now
+
+from posawesome.posawesome.api.item_fulltext import FULLTEXT_MODE
+from posawesome.posawesome.api.item_search_index import RANKED_MODE, build_profile_index
+from posawesome.posawesome.api.items import _execute_item_search
+
+from .utils import measure
+
+PREFIX = "POSA-FT-"
+_WORDS = (
+    "organic green black herbal tea coffee arabica robusta instant decaf milk oat almond soy "
+    "chocolate dark white vanilla strawberry mango lemon lime orange apple juice sparkling still "
+    "water mineral spring bottle can pack family large small medium classic premium original "
+    "light zero sugar free whole wheat rice pasta sauce tomato basil garlic onion pepper salt"
+).split()
+
+
+def seed(count=100000, chunk_size=10000):
+    """Insert ``count`` synthetic sales items."""
+
+    rng = random.Random(17)
+    item_group = frappe.db.get_value("Item Group", {"is_group": 0}, "name")
+    stock_uom = frappe.db.get_value("UOM", {"name": "Nos"}, "name") or frappe.db.get_value("UOM", {}, "name")
+    timestamp = now()
+    fields = [
+        "name",
+        "item_code",
+        "item_name",
+        "description",
+        "item_group",
+        "stock_uom",
+        "is_sales_item",
+        "is_stock_item",
+        "disabled",
+        "is_fixed_asset",
+        "has_variants",
+        "docstatus",
+        "owner",
+        "modified_by",
+        "creation",
+        "modified",
+    ]
+    values = []
+    for index in range(int(count)):
+        code = f"{PREFIX}{index:06d}"
+        name = " ".join(rng.sample(_WORDS, 4)).title()
+        description = " ".join(rng.sample(_WORDS, 10))
+        values.append(
+            (
+                code,
+                code,
+                name,
+                description,
+                item_group,
+                stock_uom,
+                1,
+                1,
+                0,
+                0,
+                0,
+                0,
+                "Administrator",
+                "Administrator",
+                timestamp,
+                timestamp,
+            )
+        )
+    frappe.db.bulk_insert("Item", fields, values, ignore_duplicates=True, chunk_size=int(chunk_size))
+    frappe.db.commit()
+    return {"items": len(values)}
+
+
+def cleanup():
+    """Delete the items created by :func:`seed`."""
+
+    frappe.db.sql("delete from `tabItem` where name like %s", (f"{PREFIX}%",))
+    frappe.db.commit()
+
+
+def _search(profile, search, limit):
+    return _execute_item_search(profile, None, "", search, None, limit, None, None, None, False, False, [])
+
+
+def _mode(profile, mode, search, limit, repeat):
+    profile = dict(profile, posa_item_search_mode=mode)
+    rows = _search(profile, search, limit)
+    return dict(
+        measure(_search, profile, search, limit, repeat=repeat),
+        results=len(rows),
+        top=[row["item_code"] for row in rows[:5]],
+    )
+
+
+def run(pos_profile, search="organic green tea", limit=50, repeat=5):
+    """Time every search mode; ``search`` may contain typos to compare recall."""
+
+    profile = frappe.get_doc("POS Profile", pos_profile).as_dict()
+    # The ranked mode reads the search index, build it outside the timings.
+    build_profile_index(profile.name)
+    limit, repeat = int(limit), int(repeat)
+
+    return {
+        "items": frappe.db.count("Item", {"disabled": 0}),
+        "search": search,
+        "standard": _mode(profile, "Standard", search, limit, repeat),
+        "fulltext": _mode(profile, FULLTEXT_MODE, search, limit, repeat),
+        "ranked": _mode(profile, RANKED_MODE, search, limit, repeat),
+    }
@@ -0,0 +1,87 @@
+"""Offline queue replay: one ``submit_invoice`` call per invoice against the bulk endpoint.
+
+Both modes ingest ``count`` fresh offline invoices of one item; ``replayed``
+sends the bulk queue a second time to time the duplicate detection. Every
+call is committed like a separate request::
+
+    bench --site mysite execute posawesome.benchmarks.offline_replay.run \
+        --kwargs "{'pos_profile': 'Main POS', 'item_code': 'SKU-001', 'pos_opening_shift': 'POS-OS-0001'}"
+
+Submitted invoices are kept; run it on a test site.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import time
+from typing import Any, Dict, List
+
+import frappe
+from frappe.utils import flt
+
+from posawesome.posawesome.api.invoices import submit_invoice
+from posawesome.posawesome.api.offline_invoices import replay_offline_invoices
+
+from .invoice_submission import _payload
+from .utils import count_queries
+
+
+def _queue(payload: Dict[str, Any], count: int) -> List[Dict[str, Any]]:
+    queue = []
+    for _ in range(count):
+        invoice = copy.deepcopy(payload)
+        invoice["posa_offline_uuid"] = frappe.generate_hash(length=20)
+        queue.append({"invoice": invoice, "data": {}})
+    return queue
+
+
+def _one_by_one(queue, chunk_size):
+    for entry in queue:
+        submit_invoice(json.dumps(entry["invoice"]), json.dumps(entry["data"]))
+        frappe.db.commit()
+    return []
+
+
+def _bulk(queue, chunk_size):
+    results = []
+    for start in range(0, len(queue), chunk_size):
+        results.extend(replay_offline_invoices(json.dumps(queue[start : start + chunk_size])))
+        frappe.db.commit()
+    return results
+
+
+def _timed(fn, queue, chunk_size) -> Dict[str, Any]:
+    with count_queries() as counter:
+        started = time.perf_counter()
+        results = fn(queue, chunk_size)
+        elapsed = time.perf_counter() - started
+
+    statuses: Dict[str, int] = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    return {
+        "invoices": len(queue),
+        "queries_per_invoice": round(counter["queries"] / max(len(queue), 1), 1),
+        "total_ms": round(elapsed * 1000, 3),
+        "per_invoice_ms": round(elapsed / max(len(queue), 1) * 1000, 3),
+        "statuses": statuses,
+    }
+
+
+def run(pos_profile, item_code, pos_opening_shift=None, rate=None, count=100, chunk_size=50):
+    """Replay ``count`` offline invoices one by one and in bulk."""
+
+    profile = frappe.get_doc("POS Profile", pos_profile).as_dict()
+    if rate is None:
+        price_filters = {"item_code": item_code, "price_list": profile.selling_price_list}
+        rate = frappe.db.get_value("Item Price", price_filters, "price_list_rate")
+    payload = _payload(profile, item_code, flt(rate) or 1, pos_opening_shift)
+    count, chunk_size = int(count), int(chunk_size)
+
+    bulk_queue = _queue(payload, count)
+    return {
+        "one_by_one": _timed(_one_by_one, _queue(payload, count), chunk_size),
+        "bulk": _timed(_bulk, bulk_queue, chunk_size),
+        "replayed": _timed(_bulk, bulk_queue, chunk_size),
+    }
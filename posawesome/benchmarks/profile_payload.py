@@ -0,0 +1,59 @@
+"""Request CPU time of the item endpoints with and without POS Profile JSON round trips.
+
+``details`` compares the detail lookup of one page through the whitelisted
+``get_items_details`` (profile and items serialised and parsed again, as every
+page of ``get_items`` used to do) with the direct aggregator call.
+``request`` compares ``get_items`` receiving the full profile JSON with
+``get_items`` receiving a ``{"name": ...}`` reference::
+
+    bench --site mysite execute posawesome.benchmarks.profile_payload.run \
+        --kwargs "{'pos_profile': 'Main POS', 'items': 200}"
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Callable, Dict
+
+import frappe
+
+from posawesome.posawesome.api.items import _build_items_details, get_items, get_items_details
+
+
+def _cpu(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    fn()  # warm the caches so both variants read the same data
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    elapsed = time.process_time() - started
+    return {"cpu_ms": round(elapsed / repeat * 1000, 3)}
+
+
+def run(pos_profile, items=200, repeat=20):
+    profile = frappe.get_doc("POS Profile", pos_profile).as_dict()
+    profile_json = frappe.as_json(profile)
+    reference = json.dumps({"name": profile.name})
+    items_data = frappe.get_all(
+        "Item",
+        filters={"disabled": 0, "is_sales_item": 1},
+        fields=["name as item_code", "item_name", "stock_uom", "has_batch_no", "has_serial_no"],
+        order_by="name asc",
+        limit_page_length=int(items),
+    )
+    repeat = int(repeat)
+
+    return {
+        "profile_json_bytes": len(profile_json),
+        "details": {
+            "json_round_trip": _cpu(
+                lambda: get_items_details(json.dumps(profile, default=str), json.dumps(items_data)),
+                repeat,
+            ),
+            "direct": _cpu(lambda: _build_items_details(profile, items_data), repeat),
+        },
+        "request": {
+            "profile_json": _cpu(lambda: get_items(profile_json, limit=int(items)), repeat),
+            "profile_reference": _cpu(lambda: get_items(reference, limit=int(items)), repeat),
+        },
+    }
@@ -0,0 +1,144 @@
+"""Scale barcode parsing: per-scan settings interpretation versus the compiled parser.
+
+Runs without touching the database; both parsers decode the same synthetic
+EAN-13 weight barcodes (prefix ``2``, 5 digit item code, 5 digit weight with 3
+decimals)::
+
+    bench --site mysite execute posawesome.benchmarks.scale_barcode.run \
+        --kwargs "{'count': 1000000}"
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from typing import Any, Dict, Optional
+
+import frappe
+from frappe.utils import cint, cstr, flt
+
+from posawesome.posawesome.api.scale_barcode import ScaleBarcodeParser
+
+SETTINGS = frappe._dict(
+    {
+        "prefix_included_or_not": 1,
+        "no_of_prefix_characters": 1,
+        "prefix": "2",
+        "item_code_starting_digit": 2,
+        "item_code_total_digits": 5,
+        "weight_starting_digit": 7,
+        "weight_total_digits": 2,
+        "weight_decimals": 3,
+        "price_included_in_barcode_or_not": 0,
+        "additional_formats": [],
+    }
+)
+
+
+def _extract_numeric_segment(barcode: str, start: int, length: int, decimals: int = 0):
+    if not (start and length):
+        return None
+
+    start_index = max(start - 1, 0)
+    end_index = start_index + max(length, 0)
+    if len(barcode) < end_index:
+        return None
+
+    whole = barcode[start_index:end_index]
+    decimal_part = ""
+    if decimals and decimals > 0:
+        decimal_end = end_index + decimals
+        if len(barcode) < decimal_end:
+            return None
+        decimal_part = barcode[end_index:decimal_end]
+
+    number_str = f"{whole}.{decimal_part}" if decimal_part else whole
+    try:
+        return flt(number_str)
+    except Exception:
+        return None
+
+
+def _legacy_parse(barcode: str, settings) -> Optional[Dict[str, Any]]:
+    """The previous parser, re-deriving every offset from the settings per scan."""
+
+    barcode_value = cstr(barcode or "").strip()
+    if not barcode_value:
+        return None
+
+    prefix_included = cint(settings.prefix_included_or_not)
+    prefix_length = cint(settings.no_of_prefix_characters) if prefix_included else 0
+    prefix_value = cstr(settings.prefix or "").strip()
+
+    if prefix_value and not barcode_value.startswith(prefix_value):
+        return None
+    if prefix_included and prefix_length and len(barcode_value) < prefix_length:
+        return None
+
+    item_start = cint(settings.item_code_starting_digit)
+    item_digits = cint(settings.item_code_total_digits)
+    if not (item_start and item_digits):
+        return None
+
+    item_start_index = max(item_start - 1, 0)
+    item_end_index = item_start_index + item_digits
+    if len(barcode_value) < item_end_index:
+        return None
+
+    data: Dict[str, Any] = {
+        "barcode": barcode_value,
+        "item_code": barcode_value[item_start_index:item_end_index],
+    }
+    qty = _extract_numeric_segment(
+        barcode_value,
+        cint(settings.weight_starting_digit),
+        cint(settings.weight_total_digits),
+        cint(settings.weight_decimals),
+    )
+    if qty is not None:
+        data["qty"] = qty
+
+    if cint(settings.price_included_in_barcode_or_not):
+        price = _extract_numeric_segment(
+            barcode_value,
+            cint(settings.price_starting_digit),
+            cint(settings.price_total_digit),
+            cint(settings.price_decimals),
+        )
+        if price is not None:
+            data["price"] = price
+
+    return data
+
+
+def _barcodes(count: int):
+    rng = random.Random(7)
+    return [
+        f"2{rng.randrange(100000):05d}{rng.randrange(100000):05d}{rng.randrange(10)}0" for _ in range(count)
+    ]
+
+
+def _time(fn, barcodes) -> Dict[str, Any]:
+    started = time.perf_counter()
+    for barcode in barcodes:
+        fn(barcode)
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 3),
+        "per_scan_us": round(elapsed / len(barcodes) * 1_000_000, 3),
+    }
+
+
+def run(count=1_000_000):
+    barcodes = _barcodes(int(count))
+    parser = ScaleBarcodeParser.compile(SETTINGS)
+
+    sample = barcodes[: min(1000, len(barcodes))]
+    mismatches = sum(1 for barcode in sample if parser.parse(barcode) != _legacy_parse(barcode, SETTINGS))
+
+    return {
+        "barcodes": len(barcodes),
+        "mismatches_in_sample": mismatches,
+        "legacy": _time(lambda barcode: _legacy_parse(barcode, SETTINGS), barcodes),
+        "compiled": _time(parser.parse, barcodes),
+    }
@@ -0,0 +1,87 @@
+"""Cart stock validation: per-row Bin/batch lookups versus grouped balances.
+
+Builds a cart of ``lines`` stock items (batched items get their first batch)
+and validates it both ways::
+
+    bench --site mysite execute posawesome.benchmarks.stock_validation.run \
+        --kwargs "{'pos_profile': 'Main POS', 'lines': 60}"
+"""
+
+from __future__ import annotations
+
+import frappe
+from erpnext.stock.doctype.batch.batch import get_batch_qty
+from frappe.utils import cint, flt
+
+from posawesome.posawesome.api.invoices import _collect_stock_errors
+from posawesome.posawesome.api.items import get_stock_availability
+
+from .utils import measure
+
+
+def _legacy_collect_stock_errors(items):
+    """The previous implementation checking every row on its own."""
+
+    errors = []
+    for d in items:
+        if flt(d.get("qty")) < 0:
+            continue
+        if not cint(frappe.get_cached_value("Item", d.get("item_code"), "is_stock_item") or 0):
+            continue
+        if d.get("batch_no"):
+            available = get_batch_qty(d.get("batch_no"), d.get("warehouse")) or 0
+        else:
+            available = get_stock_availability(d.get("item_code"), d.get("warehouse"))
+        requested = flt(d.get("stock_qty") or (flt(d.get("qty")) * flt(d.get("conversion_factor") or 1)))
+        if requested > available:
+            errors.append(
+                {
+                    "item_code": d.get("item_code"),
+                    "warehouse": d.get("warehouse"),
+                    "requested_qty": requested,
+                    "available_qty": available,
+                }
+            )
+    return errors
+
+
+def _cart(warehouse, lines):
+    items = frappe.get_all(
+        "Item",
+        filters={"is_stock_item": 1, "disabled": 0, "is_sales_item": 1, "has_variants": 0},
+        fields=["name", "has_batch_no"],
+        limit_page_length=int(lines),
+    )
+    batched = [item.name for item in items if item.has_batch_no]
+    first_batch = {}
+    if batched:
+        batches = frappe.get_all(
+            "Batch",
+            filters={"item": ["in", batched], "disabled": 0},
+            fields=["name", "item"],
+            order_by="creation",
+        )
+        for row in batches:
+            first_batch.setdefault(row.item, row.name)
+
+    return [
+        {
+            "item_code": item.name,
+            "warehouse": warehouse,
+            "qty": 1,
+            "conversion_factor": 1,
+            "batch_no": first_batch.get(item.name),
+        }
+        for item in items
+    ]
+
+
+def run(pos_profile, lines=60, repeat=5):
+    warehouse = frappe.db.get_value("POS Profile", pos_profile, "warehouse")
+    cart = _cart(warehouse, lines)
+
+    return {
+        "lines": len(cart),
+        "legacy": measure(_legacy_collect_stock_errors, cart, repeat=repeat),
+        "grouped": measure(_collect_stock_errors, cart, repeat=repeat),
+    }
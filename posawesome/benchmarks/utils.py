@@ -0,0 +1,50 @@
+"""Measurement helpers shared by the benchmark modules."""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+import frappe
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements issued through ``frappe.db.sql`` within the block."""
+
+    counter = {"queries": 0}
+    original = frappe.db.sql
+
+    def counting_sql(*args, **kwargs):
+        counter["queries"] += 1
+        return original(*args, **kwargs)
+
+    frappe.db.sql = counting_sql
+    try:
+        yield counter
+    finally:
+        frappe.db.sql = original
+
+
+def measure(fn: Callable[..., Any], *args, repeat: int = 1, **kwargs) -> Dict[str, Any]:
+    """Run ``fn`` ``repeat`` times and return query count and timings of the runs."""
+
+    timings = []
+    with count_queries() as counter:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn(*args, **kwargs)
+            timings.append(time.perf_counter() - started)
+
+    return {
+        "queries": counter["queries"] // max(repeat, 1),
+        "avg_ms": round(sum(timings) / len(timings) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+    }
+
+
+def clear_item_caches() -> None:
+    """Drop the redis cached fetcher results so every run hits the database."""
+
+    frappe.cache().delete_keys("posawesome.posawesome.api.item_fetchers")
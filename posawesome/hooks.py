@@ -92,6 +92,14 @@ after_uninstall = "posawesome.uninstall.after_uninstall"
 # 	"Event": "frappe.desk.doctype.event.event.has_permission",
 # }
 
+# Cache keys kept by `bench clear-cache`; terminals hold sync tokens issued
+# from the item change sequence.
+persistent_cache_keys = [
+    "posa_item_change_seq",
+    "posa_item_change_floor",
+    "posa_item_changes|*",
+]
+
 # Document Events
 # ---------------
 # Hook on document methods and events
@@ -111,6 +119,55 @@ doc_events = {
         "validate": "posawesome.posawesome.api.customer.validate",
         "after_insert": "posawesome.posawesome.api.customer.after_insert",
     },
+    "Item": {
+        "on_update": [
+            "posawesome.posawesome.api.item_changes.on_item_change",
+            "posawesome.posawesome.api.barcode_map.on_item_change",
+        ],
+        "on_trash": [
+            "posawesome.posawesome.api.item_changes.on_item_change",
+            "posawesome.posawesome.api.barcode_map.on_item_change",
+        ],
+        "after_rename": [
+            "posawesome.posawesome.api.item_changes.on_item_change",
+            "posawesome.posawesome.api.barcode_map.on_item_change",
+        ],
+    },
+    "Item Price": {
+        "on_update": [
+            "posawesome.posawesome.api.item_changes.on_item_price_change",
+            "posawesome.posawesome.api.barcode_map.on_item_price_change",
+        ],
+        "on_trash": [
+            "posawesome.posawesome.api.item_changes.on_item_price_change",
+            "posawesome.posawesome.api.barcode_map.on_item_price_change",
+        ],
+    },
+    "Bin": {
+        "on_update": "posawesome.posawesome.api.item_changes.on_bin_change",
+    },
+    "Stock Ledger Entry": {
+        "on_submit": "posawesome.posawesome.api.item_changes.on_stock_ledger_entry",
+    },
+    "Batch": {
+        "on_update": "posawesome.posawesome.api.item_changes.on_batch_change",
+        "on_trash": "posawesome.posawesome.api.item_changes.on_batch_change",
+    },
+    "POS Profile": {
+        "on_update": "posawesome.posawesome.api.profile_context.on_pos_profile_change",
+        "on_trash": "posawesome.posawesome.api.profile_context.on_pos_profile_change",
+        "after_rename": "posawesome.posawesome.api.profile_context.on_pos_profile_change",
+    },
+    "Item Group": {
+        "on_update": "posawesome.posawesome.api.group_tree.on_group_change",
+        "on_trash": "posawesome.posawesome.api.group_tree.on_group_change",
+        "after_rename": "posawesome.posawesome.api.group_tree.on_group_change",
+    },
+    "Customer Group": {
+        "on_update": "posawesome.posawesome.api.group_tree.on_group_change",
+        "on_trash": "posawesome.posawesome.api.group_tree.on_group_change",
+        "after_rename": "posawesome.posawesome.api.group_tree.on_group_change",
+    },
 }
 
 # Scheduled Tasks
@@ -296,6 +353,10 @@ fixtures = [
                     "POS Profile-posa_enable_camera_scanning",
                     "POS Profile-posa_camera_scan_type",
                     "POS Profile-posa_language",
+                    "POS Profile-posa_item_search_mode",
+                    "POS Profile-posa_single_pass_submission",
+                    "Sales Invoice-posa_offline_uuid",
+                    "POS Invoice-posa_offline_uuid",
                 ),
             ]
         ],
@@ -0,0 +1,23 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+
+def execute():
+    for doctype in ("Sales Invoice", "POS Invoice"):
+        if not frappe.db.exists("Custom Field", f"{doctype}-posa_offline_uuid"):
+            create_custom_field(
+                doctype,
+                {
+                    "fieldname": "posa_offline_uuid",
+                    "label": "Offline UUID",
+                    "fieldtype": "Data",
+                    "insert_after": "posa_is_printed",
+                    "read_only": 1,
+                    "print_hide": 1,
+                    "no_copy": 1,
+                    "unique": 1,
+                },
+            )
+
+        # Empty values would collide on the field's unique index, keep them NULL.
+        frappe.db.sql(f"update `tab{doctype}` set posa_offline_uuid = NULL where posa_offline_uuid = ''")
@@ -29,6 +29,7 @@ from .items import (
     get_items_from_barcode,
     parse_scale_barcode,
     get_items_groups,
+    resolve_barcodes,
 )
 from .offers import (
     get_active_gift_coupons,
@@ -0,0 +1,253 @@
+"""Per-site barcode map answering scans with a single redis lookup.
+
+Every barcode of an enabled item is stored in one redis hash together with
+the item name, the barcode UOM, the stock UOM and the selling rate of every
+price list, so a scan no longer needs the Item Barcode, Item and Item Price
+queries. Item and Item Price events rewrite the entries of the changed item.
+"""
+
+from __future__ import annotations
+
+import json
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import frappe
+
+from .item_changes import changes_since, current_sequence
+
+_MAP_KEY = "posa_barcode_map"
+_ITEMS_KEY = "posa_barcode_map_items"
+_READY_KEY = "posa_barcode_map_ready"
+_CHUNK_SIZE = 1000
+
+
+def _key(name: str) -> str:
+    return frappe.cache().make_key(name)
+
+
+def _price_key(price_list: str, currency: str) -> str:
+    return f"{price_list}|{currency}"
+
+
+def _collect_entries(item_codes: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Return ``item_code -> barcode -> entry`` for enabled items."""
+
+    filters: Dict[str, Any] = {"disabled": 0}
+    if item_codes is not None:
+        filters["name"] = ["in", list(item_codes)]
+    items = {
+        item.name: item
+        for item in frappe.get_all(
+            "Item",
+            filters=filters,
+            fields=["name", "item_name", "stock_uom"],
+            limit_page_length=0,
+        )
+    }
+    if not items:
+        return {}
+
+    codes = list(items)
+    barcodes: List[Any] = []
+    prices: Dict[str, Dict[str, float]] = {}
+    for start in range(0, len(codes), _CHUNK_SIZE):
+        chunk = codes[start : start + _CHUNK_SIZE]
+        barcodes.extend(
+            frappe.get_all(
+                "Item Barcode",
+                fields=["parent", "barcode", "posa_uom"],
+                filters={"parent": ["in", chunk]},
+            )
+        )
+        # Customer specific prices never apply to a scan; the most recent
+        # price wins like the ``frappe.db.get_value`` lookup it replaces.
+        for row in frappe.get_all(
+            "Item Price",
+            fields=["item_code", "price_list", "currency", "price_list_rate"],
+            filters={"item_code": ["in", chunk], "selling": 1, "customer": ["is", "not set"]},
+            order_by="modified asc",
+        ):
+            price_key = _price_key(row.price_list, row.currency)
+            prices.setdefault(row.item_code, {})[price_key] = row.price_list_rate
+
+    entries: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for row in barcodes:
+        if not row.barcode:
+            continue
+        item = items[row.parent]
+        entries.setdefault(row.parent, {})[row.barcode] = {
+            "item_code": item.name,
+            "item_name": item.item_name,
+            "posa_uom": row.posa_uom,
+            "stock_uom": item.stock_uom,
+            "prices": prices.get(row.parent, {}),
+        }
+    return entries
+
+
+def build_barcode_map() -> int:
+    """Rebuild the whole barcode map and return the number of barcodes."""
+
+    sequence = current_sequence()
+    entries = _collect_entries()
+    cache = frappe.cache()
+    map_key, items_key = _key(_MAP_KEY), _key(_ITEMS_KEY)
+    staging_map, staging_items = f"{map_key}|staging", f"{items_key}|staging"
+
+    pipe = cache.pipeline()
+    pipe.delete(staging_map, staging_items)
+    count = 0
+    for item_code, barcodes in entries.items():
+        for barcode, entry in barcodes.items():
+            pipe.hset(staging_map, barcode, json.dumps(entry, separators=(",", ":")))
+            count += 1
+        pipe.hset(staging_items, item_code, json.dumps(sorted(barcodes)))
+    pipe.execute()
+
+    # Swap the new map in atomically so scans never see a half built map.
+    pipe = cache.pipeline()
+    if count:
+        pipe.rename(staging_map, map_key)
+        pipe.rename(staging_items, items_key)
+    else:
+        pipe.delete(map_key, items_key)
+    pipe.set(_key(_READY_KEY), 1)
+    pipe.execute()
+
+    # Re-apply edits that landed while the map was being collected.
+    changes = changes_since(sequence, ("item", "price", "barcode"))
+    if changes:
+        refresh_items(changes)
+    return count
+
+
+def _enqueue_build() -> None:
+    try:
+        frappe.enqueue(
+            "posawesome.posawesome.api.barcode_map.build_barcode_map",
+            queue="long",
+            job_id=f"posa_barcode_map::{frappe.local.site}",
+            deduplicate=True,
+        )
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "POS Awesome barcode map")
+
+
+def lookup_barcode(barcode: str) -> Optional[Dict[str, Any]]:
+    """Return the map entry of ``barcode`` or ``None`` to fall back to SQL."""
+
+    if not barcode:
+        return None
+
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.get(_key(_READY_KEY))
+    pipe.hget(_key(_MAP_KEY), barcode)
+    ready, raw = pipe.execute()
+    if not ready:
+        _enqueue_build()
+        return None
+    if raw is None:
+        return None
+    return json.loads(raw)
+
+
+def lookup_barcodes(barcodes: Sequence[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Return ``barcode -> entry`` for the known ``barcodes`` in one round trip.
+
+    ``None`` means the map is not built yet.
+    """
+
+    values = [barcode for barcode in dict.fromkeys(barcodes) if barcode]
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.get(_key(_READY_KEY))
+    if values:
+        pipe.hmget(_key(_MAP_KEY), values)
+    results = pipe.execute()
+    if not results[0]:
+        _enqueue_build()
+        return None
+    if not values:
+        return {}
+    return {
+        barcode: json.loads(raw) for barcode, raw in zip(values, results[1], strict=True) if raw is not None
+    }
+
+
+def entry_rate(entry: Dict[str, Any], price_list: str, currency: str) -> Optional[float]:
+    """Return the rate of ``entry`` for ``price_list``/``currency`` if known."""
+
+    return (entry.get("prices") or {}).get(_price_key(price_list, currency))
+
+
+def refresh_items(item_codes: Iterable[str]) -> None:
+    """Rewrite the map entries of ``item_codes`` from the database."""
+
+    codes = sorted({code for code in item_codes if code})
+    cache = frappe.cache()
+    if not codes or not cache.get(_key(_READY_KEY)):
+        return
+
+    map_key, items_key = _key(_MAP_KEY), _key(_ITEMS_KEY)
+    previous = cache.hmget(items_key, codes)
+    entries = _collect_entries(codes)
+
+    pipe = cache.pipeline()
+    for item_code, raw in zip(codes, previous, strict=True):
+        stale = set(json.loads(raw)) if raw else set()
+        current = entries.get(item_code, {})
+        for barcode in stale - set(current):
+            pipe.hdel(map_key, barcode)
+        for barcode, entry in current.items():
+            pipe.hset(map_key, barcode, json.dumps(entry, separators=(",", ":")))
+        if current:
+            pipe.hset(items_key, item_code, json.dumps(sorted(current)))
+        else:
+            pipe.hdel(items_key, item_code)
+    pipe.execute()
+
+
+def _refresh_after_commit(item_codes: Iterable[str]) -> None:
+    codes = tuple(sorted({code for code in item_codes if code}))
+    if codes:
+        frappe.db.after_commit.add(partial(refresh_items, codes))
+
+
+def on_item_change(doc, method=None, *args):
+    """Item barcodes are child rows saved together with the Item.
+
+    ``after_rename`` passes the old name as the first extra argument; its
+    barcodes are dropped and re-indexed under the new name.
+    """
+
+    codes = {doc.name}
+    if method == "after_rename" and args:
+        codes.add(args[0])
+    _refresh_after_commit(codes)
+
+
+def on_item_price_change(doc, method=None):
+    codes = {doc.get("item_code")}
+    previous = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+    if previous:
+        codes.add(previous.get("item_code"))
+    _refresh_after_commit(codes)
+
+
+def clear_barcode_map() -> None:
+    """Drop the map; the next scan schedules a rebuild."""
+
+    cache = frappe.cache()
+    cache.delete(_key(_MAP_KEY), _key(_ITEMS_KEY), _key(_READY_KEY))
+
+
+__all__ = [
+    "build_barcode_map",
+    "clear_barcode_map",
+    "entry_rate",
+    "lookup_barcode",
+    "lookup_barcodes",
+    "refresh_items",
+]
@@ -11,37 +11,38 @@ from erpnext.accounts.doctype.loyalty_program.loyalty_program import (
     get_loyalty_program_details_with_points,
 )
 from frappe.utils.caching import redis_cache
+from .group_tree import expand_groups, get_group_tree, group_tree_condition
 from .utils import fetch_sales_person_names
 
 
 def get_customer_groups(pos_profile):
     customer_groups = []
     if pos_profile.get("customer_groups"):
-        # Get items based on the item groups defined in the POS profile
-        for data in pos_profile.get("customer_groups"):
-            customer_groups.extend(
-                [d.get("name") for d in get_child_nodes("Customer Group", data.get("customer_group"))]
-            )
+        # Get customers based on the customer groups defined in the POS profile
+        customer_groups = expand_groups(
+            "Customer Group",
+            [data.get("customer_group") for data in pos_profile.get("customer_groups")],
+        )
 
-    return list(set(customer_groups))
+    return customer_groups
 
 
 def get_child_nodes(group_type, root):
-    lft, rgt = frappe.db.get_value(group_type, root, ["lft", "rgt"])
-    return frappe.get_all(
-        group_type,
-        filters={"lft": [">=", lft], "rgt": ["<=", rgt]},
-        fields=["name", "lft", "rgt"],
-        order_by="lft",
-    )
+    tree = get_group_tree(group_type)
+    return [
+        frappe._dict(name=name, lft=tree.bounds[name][0], rgt=tree.bounds[name][1])
+        for name in tree.expand([root])
+        if name in tree.bounds
+    ]
 
 
 def get_customer_group_condition(pos_profile):
     cond = "disabled = 0"
-    customer_groups = get_customer_groups(pos_profile)
-    if customer_groups:
-        escaped_groups = [frappe.db.escape(g) for g in customer_groups]
-        cond = " customer_group in ({})".format(", ".join(escaped_groups))
+    roots = [data.get("customer_group") for data in pos_profile.get("customer_groups") or []]
+    if any(roots):
+        cond = " customer_group in (select name from `tabCustomer Group` where {})".format(
+            group_tree_condition("Customer Group", roots)
+        )
 
     return cond
 
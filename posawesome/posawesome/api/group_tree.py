@@ -0,0 +1,159 @@
+"""Cached nested-set index of the Item Group and Customer Group trees.
+
+Each tree is loaded once per worker as ``(lft, rgt, name)`` rows sorted by
+``lft`` so any set of groups expands to its descendants in memory with a
+binary search. Saving, renaming or deleting a group bumps a version key in
+redis which makes every worker reload the tree on its next request.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import frappe
+
+TREE_DOCTYPES = ("Item Group", "Customer Group")
+
+# Trees can also be rebuilt with direct SQL (``rebuild_tree``) which fires no
+# document events, so a version only lives for an hour.
+_VERSION_TTL = 3600
+
+# Worker-local trees keyed by (site, doctype), tagged with their version.
+_trees: Dict[Tuple[str, str], Tuple[str, "GroupTree"]] = {}
+
+
+@dataclass(frozen=True)
+class GroupTree:
+    """Immutable nested-set index of one tree doctype."""
+
+    names: Tuple[str, ...]
+    lfts: Tuple[int, ...]
+    bounds: Dict[str, Tuple[int, int]]
+
+    @classmethod
+    def load(cls, doctype: str) -> "GroupTree":
+        rows = frappe.get_all(
+            doctype,
+            fields=["name", "lft", "rgt"],
+            order_by="lft asc",
+            limit_page_length=0,
+        )
+        return cls(
+            names=tuple(row.name for row in rows),
+            lfts=tuple(row.lft or 0 for row in rows),
+            bounds={row.name: (row.lft or 0, row.rgt or 0) for row in rows},
+        )
+
+    def intervals(self, groups: Iterable[str]) -> List[Tuple[int, int]]:
+        """Return the merged ``(lft, rgt)`` ranges covering ``groups``."""
+
+        ranges = sorted(self.bounds[group] for group in set(groups) if group in self.bounds)
+        merged: List[Tuple[int, int]] = []
+        for lft, rgt in ranges:
+            if merged and lft <= merged[-1][1]:
+                if rgt > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], rgt)
+                continue
+            merged.append((lft, rgt))
+        return merged
+
+    def expand(self, groups: Iterable[str]) -> List[str]:
+        """Return ``groups`` with all of their descendants.
+
+        Unknown names are kept as-is so a filter on them still matches nothing
+        rather than everything.
+        """
+
+        groups = [group for group in dict.fromkeys(groups or []) if group]
+        expanded: Dict[str, None] = dict.fromkeys(group for group in groups if group not in self.bounds)
+        for lft, rgt in self.intervals(groups):
+            start = bisect_left(self.lfts, lft)
+            end = bisect_right(self.lfts, rgt)
+            expanded.update(dict.fromkeys(self.names[start:end]))
+        return list(expanded)
+
+
+def _version_key(doctype: str) -> str:
+    return f"posa_group_tree_version|{doctype}"
+
+
+def get_group_tree(doctype: str) -> GroupTree:
+    """Return the index of ``doctype``, reloading it once per tree edit."""
+
+    memo = getattr(frappe.local, "posa_group_trees", None)
+    if memo is None:
+        memo = frappe.local.posa_group_trees = {}
+    tree = memo.get(doctype)
+    if tree is not None:
+        return tree
+
+    cache = frappe.cache()
+    version = cache.get_value(_version_key(doctype))
+    key = (frappe.local.site, doctype)
+    cached = _trees.get(key)
+    if version is not None and cached and cached[0] == version:
+        tree = cached[1]
+    else:
+        tree = GroupTree.load(doctype)
+        if version is None:
+            version = frappe.generate_hash(length=10)
+            cache.set_value(_version_key(doctype), version, expires_in_sec=_VERSION_TTL)
+        _trees[key] = (version, tree)
+
+    memo[doctype] = tree
+    return tree
+
+
+def expand_groups(doctype: str, groups: Optional[Iterable[str]]) -> List[str]:
+    """Expand ``groups`` of ``doctype`` to include all of their descendants."""
+
+    if not groups:
+        return []
+    return get_group_tree(doctype).expand(groups)
+
+
+def group_tree_condition(doctype: str, groups: Iterable[str], alias: str = "") -> str:
+    """Return an SQL ``lft BETWEEN`` condition matching ``groups`` and descendants.
+
+    ``alias`` qualifies the ``lft`` column when the tree table is joined.
+    """
+
+    column = f"{alias}.lft" if alias else "lft"
+    ranges = get_group_tree(doctype).intervals(groups)
+    if not ranges:
+        return "1=0"
+    return "({})".format(" or ".join(f"{column} between {lft} and {rgt}" for lft, rgt in ranges))
+
+
+def clear_group_tree(doctype: str) -> None:
+    """Make every worker reload the index of ``doctype``."""
+
+    frappe.cache().set_value(
+        _version_key(doctype), frappe.generate_hash(length=10), expires_in_sec=_VERSION_TTL
+    )
+    _trees.pop((frappe.local.site, doctype), None)
+    memo = getattr(frappe.local, "posa_group_trees", None)
+    if memo:
+        memo.pop(doctype, None)
+
+
+def on_group_change(doc, method=None, *args):
+    """Invalidate the tree index once the edit is committed.
+
+    ``after_rename`` passes the old and new names as extra arguments.
+    """
+
+    if doc.doctype in TREE_DOCTYPES:
+        frappe.db.after_commit.add(partial(clear_group_tree, doc.doctype))
+
+
+__all__ = [
+    "GroupTree",
+    "clear_group_tree",
+    "expand_groups",
+    "get_group_tree",
+    "group_tree_condition",
+]
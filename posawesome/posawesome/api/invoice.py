@@ -9,6 +9,7 @@ from frappe.utils import add_days, flt
 
 from posawesome.posawesome.api.utilities import get_company_domain  # Updated import
 from posawesome.posawesome.api.payments import get_posawesome_credit_redeem_remark
+from posawesome.posawesome.api.profile_context import profile_flag
 from posawesome.posawesome.doctype.delivery_charges.delivery_charges import (
     get_applicable_delivery_charges,
 )
@@ -104,7 +105,7 @@ def create_sales_order(doc):
         and doc.is_pos
         and getattr(doc, "posa_delivery_date", None)
         and not doc.update_stock
-        and frappe.get_value("POS Profile", doc.pos_profile, "posa_allow_sales_order")
+        and profile_flag(doc.pos_profile, "allow_sales_order", False)
     ):
         sales_order_doc = make_sales_order(doc.name)
         if sales_order_doc:
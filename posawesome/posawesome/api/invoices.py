@@ -12,6 +12,7 @@ from erpnext.stock.doctype.batch.batch import (
     get_batch_no,
     get_batch_qty,
 )  # This should be from erpnext directly
+from erpnext.stock.doctype.packed_item.packed_item import make_packing_list
 from frappe import _
 from frappe.utils import (
     cint,
@@ -22,7 +23,6 @@ from frappe.utils import (
     nowdate,
     strip_html_tags,
 )
-from frappe.utils.background_jobs import enqueue
 
 from posawesome.posawesome.api.payments import (
     redeeming_customer_credit,
@@ -32,7 +32,20 @@ from posawesome.posawesome.api.utilities import (
     set_batch_nos_for_bundels,
 )  # Updated imports
 
-from .items import get_stock_availability
+from .profile_context import get_profile_context, profile_flag
+from .stock_snapshot import get_batch_quantities, get_stock_quantities
+from .submission_queue import (
+    FAILED,
+    SUBMITTED,
+    enqueue_submission,
+    get_entry,
+    pending_entry,
+    public_entry,
+    set_entry,
+)
+
+# Client generated id of offline invoices, unique per invoice doctype.
+OFFLINE_UUID_FIELD = "posa_offline_uuid"
 
 
 def _sanitize_item_name(name: str) -> str:
@@ -59,52 +72,79 @@ def _apply_item_name_overrides(invoice_doc, overrides=None):
             item.name_overridden = 0
 
 
-def _get_available_stock(item):
-    """Return available stock qty for an item row."""
-    warehouse = item.get("warehouse")
-    batch_no = item.get("batch_no")
-    item_code = item.get("item_code")
-    if not item_code or not warehouse:
-        return 0
-    if batch_no:
-        return get_batch_qty(batch_no, warehouse) or 0
-    return get_stock_availability(item_code, warehouse)
+def _required_stock(items):
+    """Sum the stock qty the rows need per ``(item_code, warehouse, batch_no)``.
 
+    Returns rows and non stock items are skipped; the stock flag of rows
+    that do not carry ``is_stock_item`` is read for all of them at once.
+    """
 
-def _is_stock_item(item):
-    """Return True when the provided row represents a stock item."""
+    rows = [d for d in items if d and flt(d.get("qty")) >= 0]
+    unflagged = list(
+        {d.get("item_code") for d in rows if d.get("is_stock_item") is None and d.get("item_code")}
+    )
+    stock_codes = set()
+    if unflagged:
+        stock_codes.update(
+            frappe.get_all("Item", filters={"name": ["in", unflagged], "is_stock_item": 1}, pluck="name")
+        )
 
-    if item is None:
-        return False
+    required = {}
+    for d in rows:
+        flag = d.get("is_stock_item")
+        if not (cint(flag) if flag is not None else d.get("item_code") in stock_codes):
+            continue
+        key = (d.get("item_code"), d.get("warehouse"), d.get("batch_no") or None)
+        qty = flt(d.get("stock_qty") or (flt(d.get("qty")) * flt(d.get("conversion_factor") or 1)))
+        required[key] = required.get(key, 0) + qty
+    return required
 
-    flag = item.get("is_stock_item")
-    if flag is not None:
-        return bool(cint(flag))
 
-    item_code = item.get("item_code")
-    if not item_code:
-        return False
+def _available_stock(keys):
+    """Return available stock qty per ``(item_code, warehouse, batch_no)`` key.
+
+    Bin and batch balances are each read with one grouped query per warehouse.
+    """
+
+    codes_by_warehouse = {}
+    batches_by_warehouse = {}
+    for item_code, warehouse, batch_no in keys:
+        if not item_code or not warehouse:
+            continue
+        if batch_no:
+            batches_by_warehouse.setdefault(warehouse, []).append((item_code, batch_no))
+        else:
+            codes_by_warehouse.setdefault(warehouse, []).append(item_code)
 
-    return bool(cint(frappe.get_cached_value("Item", item_code, "is_stock_item") or 0))
+    available = {}
+    for warehouse, codes in codes_by_warehouse.items():
+        for item_code, qty in get_stock_quantities(warehouse, codes).items():
+            available[(item_code, warehouse, None)] = qty["actual_qty"]
+    for warehouse, item_batches in batches_by_warehouse.items():
+        for (item_code, batch_no), qty in get_batch_quantities(warehouse, item_batches).items():
+            available[(item_code, warehouse, batch_no)] = qty
+    return available
 
 
 def _collect_stock_errors(items):
-    """Return list of items exceeding available stock."""
+    """Return list of items exceeding available stock.
+
+    Rows of the same item, warehouse and batch are checked together against
+    their combined quantity.
+    """
+    required = _required_stock(items)
+    available = _available_stock(required)
+
     errors = []
-    for d in items:
-        if flt(d.get("qty")) < 0:
-            continue
-        if not _is_stock_item(d):
-            continue
-        available = _get_available_stock(d)
-        requested = flt(d.get("stock_qty") or (flt(d.get("qty")) * flt(d.get("conversion_factor") or 1)))
-        if requested > available:
+    for (item_code, warehouse, batch_no), requested in required.items():
+        available_qty = available.get((item_code, warehouse, batch_no), 0)
+        if requested > available_qty:
             errors.append(
                 {
-                    "item_code": d.get("item_code"),
-                    "warehouse": d.get("warehouse"),
+                    "item_code": item_code,
+                    "warehouse": warehouse,
                     "requested_qty": requested,
-                    "available_qty": available,
+                    "available_qty": available_qty,
                 }
             )
     return errors
@@ -236,13 +276,7 @@ def _should_block(pos_profile):
     if allow_negative:
         return False
 
-    block_sale = 1
-    if pos_profile:
-        block_sale = cint(
-            frappe.db.get_value("POS Profile", pos_profile, "posa_block_sale_beyond_available_qty") or 1
-        )
-
-    return bool(block_sale)
+    return profile_flag(pos_profile, "block_sale_beyond_available_qty", True)
 
 
 def _validate_stock_on_invoice(invoice_doc):
@@ -271,13 +305,10 @@ def _auto_set_return_batches(invoice_doc):
         return
 
     profile = invoice_doc.get("pos_profile")
-    allow_without_invoice = profile and frappe.db.get_value(
-        "POS Profile", profile, "posa_allow_return_without_invoice"
-    )
-    if not cint(allow_without_invoice):
+    if not profile_flag(profile, "allow_return_without_invoice", False):
         return
 
-    allow_free = cint(frappe.db.get_value("POS Profile", profile, "posa_allow_free_batch_return") or 0)
+    allow_free = get_profile_context(profile).allow_free_batch_return
 
     for d in invoice_doc.items:
         if not d.get("item_code") or not d.get("warehouse"):
@@ -374,17 +405,108 @@ def validate_return_items(original_invoice_name, return_items, doctype="Sales In
     return {"valid": True}
 
 
+def _batch_lookup(kind, key, fetch):
+    """Return ``fetch()`` memoised for the current batch ingestion, if any.
+
+    Bulk ingestion shares lookups between the invoices of one request through
+    ``frappe.local.posa_invoice_lookups``; outside of it every call fetches.
+    """
+
+    lookups = getattr(frappe.local, "posa_invoice_lookups", None)
+    if lookups is None:
+        return fetch()
+    bucket = lookups.setdefault(kind, {})
+    if key not in bucket:
+        bucket[key] = fetch()
+    return bucket[key]
+
+
+def _customer_exists(customer):
+    # Only known customers are memoised, a customer created later in the
+    # batch (or rolled back with its invoice) is looked up again.
+    lookups = getattr(frappe.local, "posa_invoice_lookups", None)
+    known = lookups.setdefault("customer", set()) if lookups is not None else set()
+    if customer in known:
+        return True
+    exists = bool(frappe.db.exists("Customer", customer))
+    if exists:
+        known.add(customer)
+    return exists
+
+
+def _invoice_doctype(payload):
+    return profile_flag(payload.get("pos_profile"), "invoice_doctype", "Sales Invoice")
+
+
+def _normalize_offline_uuid(payload):
+    """Return the stripped offline UUID of ``payload``.
+
+    Empty values are dropped so they stay NULL under the unique index.
+    """
+
+    value = cstr(payload.get(OFFLINE_UUID_FIELD)).strip()
+    if value:
+        payload[OFFLINE_UUID_FIELD] = value
+    else:
+        payload.pop(OFFLINE_UUID_FIELD, None)
+    return value or None
+
+
+def find_offline_invoice(doctype, offline_uuid):
+    """Return ``name`` and ``docstatus`` of the invoice ingested under ``offline_uuid``."""
+
+    if not offline_uuid:
+        return None
+    return _batch_lookup(
+        "offline_invoice",
+        (doctype, offline_uuid),
+        lambda: frappe.db.get_value(
+            doctype, {OFFLINE_UUID_FIELD: offline_uuid}, ["name", "docstatus"], as_dict=True
+        ),
+    )
+
+
+def _replay_response(existing):
+    return {"name": existing.name, "status": existing.docstatus, "replayed": True}
+
+
 @frappe.whitelist()
 def update_invoice(data):
     data = json.loads(data)
+    doctype = _invoice_doctype(data)
+    existing = find_offline_invoice(doctype, _normalize_offline_uuid(data))
+    if existing and existing.docstatus != 0:
+        # Replayed after the invoice was submitted, there is nothing to update.
+        return frappe.get_doc(doctype, existing.name).as_dict()
+    if existing:
+        data["name"] = existing.name
+
+    invoice_doc, exchange_rate_date = _build_invoice_doc(data)
+
+    invoice_doc.flags.ignore_permissions = True
+    frappe.flags.ignore_account_permission = True
+    invoice_doc.docstatus = 0
+    invoice_doc.save()
+
+    # Return both the invoice doc and the updated data
+    response = invoice_doc.as_dict()
+    response["conversion_rate"] = invoice_doc.conversion_rate
+    response["plc_conversion_rate"] = invoice_doc.plc_conversion_rate
+    response["exchange_rate_date"] = exchange_rate_date
+    return response
+
+
+def _build_invoice_doc(data):
+    """Return ``(invoice_doc, exchange_rate_date)`` for the parsed payload ``data``.
+
+    The invoice gets its defaults, currency conversion and tax flags applied
+    but is not written; callers save or submit it.
+    """
+
     _strip_client_freebies_from_payload(data)
     # Determine doctype based on POS Profile setting
     pos_profile = data.get("pos_profile")
-    doctype = "Sales Invoice"
-    if pos_profile and frappe.db.get_value(
-        "POS Profile", pos_profile, "create_pos_invoice_instead_of_sales_invoice"
-    ):
-        doctype = "POS Invoice"
+    doctype = profile_flag(pos_profile, "invoice_doctype", "Sales Invoice")
 
     # Ensure the document type is set for new invoices to prevent validation errors
     data.setdefault("doctype", doctype)
@@ -408,11 +530,16 @@ def update_invoice(data):
     selected_currency = data.get("currency")
     price_list_currency = data.get("price_list_currency")
     if not price_list_currency and invoice_doc.get("selling_price_list"):
-        price_list_currency = frappe.db.get_value("Price List", invoice_doc.selling_price_list, "currency")
+        price_list = invoice_doc.selling_price_list
+        price_list_currency = _batch_lookup(
+            "price_list_currency",
+            price_list,
+            lambda: frappe.db.get_value("Price List", price_list, "currency"),
+        )
 
     # Ensure customer exists before setting missing values
     customer_name = invoice_doc.get("customer")
-    if customer_name and not frappe.db.exists("Customer", customer_name):
+    if customer_name and not _customer_exists(customer_name):
         try:
             cust = frappe.get_doc(
                 {
@@ -539,7 +666,7 @@ def update_invoice(data):
         data["plc_conversion_rate"] = plc_conversion_rate
         data["exchange_rate_date"] = exchange_rate_date
 
-    inclusive = frappe.get_cached_value("POS Profile", invoice_doc.pos_profile, "posa_tax_inclusive")
+    inclusive = profile_flag(invoice_doc.pos_profile, "tax_inclusive", False)
     if invoice_doc.get("taxes"):
         for tax in invoice_doc.taxes:
             if tax.charge_type == "Actual":
@@ -556,17 +683,7 @@ def update_invoice(data):
         invoice_doc.paid_amount = flt(sum(p.amount for p in invoice_doc.payments))
         invoice_doc.base_paid_amount = flt(sum(p.base_amount for p in invoice_doc.payments))
 
-    invoice_doc.flags.ignore_permissions = True
-    frappe.flags.ignore_account_permission = True
-    invoice_doc.docstatus = 0
-    invoice_doc.save()
-
-    # Return both the invoice doc and the updated data
-    response = invoice_doc.as_dict()
-    response["conversion_rate"] = invoice_doc.conversion_rate
-    response["plc_conversion_rate"] = invoice_doc.plc_conversion_rate
-    response["exchange_rate_date"] = exchange_rate_date
-    return response
+    return invoice_doc, exchange_rate_date
 
 
 def _create_change_payment_entries(invoice_doc, data, pos_profile=None, cash_account=None):
@@ -590,11 +707,7 @@ def _create_change_payment_entries(invoice_doc, data, pos_profile=None, cash_acc
             )
         )
 
-    configured_cash_mode_of_payment = None
-    if pos_profile:
-        configured_cash_mode_of_payment = frappe.db.get_value(
-            "POS Profile", pos_profile, "posa_cash_mode_of_payment"
-        )
+    configured_cash_mode_of_payment = profile_flag(pos_profile, "cash_mode_of_payment")
 
     cash_mode_of_payment = configured_cash_mode_of_payment
     if not cash_mode_of_payment:
@@ -748,23 +861,82 @@ def _create_change_payment_entries(invoice_doc, data, pos_profile=None, cash_acc
         change_payment_entry.submit()
 
 
+def _invoice_remarks(invoice_doc):
+    """Return the remarks listing the invoice items and the grand total."""
+
+    items = []
+    for item in invoice_doc.items:
+        if item.item_name and item.rate and item.qty:
+            total = item.rate * item.qty
+            items.append(f"{item.item_name} - Rate: {item.rate}, Qty: {item.qty}, Amount: {total}")
+
+    # Add the grand total at the end of remarks
+    grand_total = f"\nGrand Total: {invoice_doc.grand_total}"
+    items.append(grand_total)
+
+    return "\n".join(items)
+
+
 @frappe.whitelist()
 def submit_invoice(invoice, data):
     data = json.loads(data)
     invoice = json.loads(invoice)
+    try:
+        return ingest_invoice(invoice, data)
+    except frappe.UniqueValidationError:
+        # A concurrent replay inserted the same offline invoice first.
+        frappe.db.rollback()
+        existing = find_offline_invoice(_invoice_doctype(invoice), invoice.get(OFFLINE_UUID_FIELD))
+        if not existing:
+            raise
+        return _replay_response(existing)
+
+
+def ingest_invoice(invoice, data):
+    """Submit the parsed payload unless it replays a queued or ingested invoice."""
+
+    # A retried request of a queued submission returns the queued entry.
+    queued = pending_entry(data.get("idempotency_key"))
+    if queued:
+        return _queued_response(queued)
+
+    existing = find_offline_invoice(_invoice_doctype(invoice), _normalize_offline_uuid(invoice))
+    if existing and existing.docstatus != 0:
+        return _replay_response(existing)
+    if existing:
+        # Finish the draft an interrupted earlier attempt left behind.
+        invoice["name"] = existing.name
+
+    pos_profile = invoice.get("pos_profile")
+    single_pass = profile_flag(pos_profile, "single_pass_submission", False) and not profile_flag(
+        pos_profile, "allow_background_submission", False
+    )
+    return _submit_invoice(invoice, data, single_pass=single_pass)
+
+
+def _submit_invoice(invoice, data, single_pass=False):
+    """Submit the parsed ``invoice`` payload.
+
+    With ``single_pass`` a new invoice is built, validated and submitted in
+    one write instead of being saved as a draft, saved again with its remarks
+    and then submitted.
+    """
+
     _strip_client_freebies_from_payload(invoice)
     pos_profile = invoice.get("pos_profile")
-    doctype = "Sales Invoice"
-    if pos_profile and frappe.db.get_value(
-        "POS Profile", pos_profile, "create_pos_invoice_instead_of_sales_invoice"
-    ):
-        doctype = "POS Invoice"
+    doctype = profile_flag(pos_profile, "invoice_doctype", "Sales Invoice")
 
     invoice_name = invoice.get("name")
     if not invoice_name or not frappe.db.exists(doctype, invoice_name):
-        created = update_invoice(json.dumps(invoice))
-        invoice_name = created.get("name")
-        invoice_doc = frappe.get_doc(doctype, invoice_name)
+        if single_pass:
+            invoice_doc = _build_invoice_doc(invoice)[0]
+            # Totals and packed items are otherwise only set by the draft save.
+            invoice_doc.calculate_taxes_and_totals()
+            make_packing_list(invoice_doc)
+        else:
+            created = update_invoice(json.dumps(invoice))
+            invoice_name = created.get("name")
+            invoice_doc = frappe.get_doc(doctype, invoice_name)
     else:
         invoice_doc = frappe.get_doc(doctype, invoice_name)
         invoice_doc.update(invoice)
@@ -775,28 +947,9 @@ def submit_invoice(invoice, data):
     _apply_item_name_overrides(invoice_doc)
     if invoice.get("posa_delivery_date"):
         invoice_doc.update_stock = 0
-    mop_cash_list = [
-        i.mode_of_payment
-        for i in invoice_doc.payments
-        if "cash" in i.mode_of_payment.lower() and i.type == "Cash"
-    ]
-    if len(mop_cash_list) > 0:
-        cash_account = get_bank_cash_account(mop_cash_list[0], invoice_doc.company)
-    else:
-        cash_account = {"account": frappe.get_value("Company", invoice_doc.company, "default_cash_account")}
+    cash_account = _get_cash_account(invoice_doc)
 
-    # Update remarks with items details
-    items = []
-    for item in invoice_doc.items:
-        if item.item_name and item.rate and item.qty:
-            total = item.rate * item.qty
-            items.append(f"{item.item_name} - Rate: {item.rate}, Qty: {item.qty}, Amount: {total}")
-
-    # Add the grand total at the end of remarks
-    grand_total = f"\nGrand Total: {invoice_doc.grand_total}"
-    items.append(grand_total)
-
-    invoice_doc.remarks = "\n".join(items)
+    invoice_doc.remarks = _invoice_remarks(invoice_doc)
 
     # calculating cash
     total_cash = 0
@@ -839,6 +992,15 @@ def submit_invoice(invoice, data):
     invoice_doc.flags.ignore_permissions = True
     frappe.flags.ignore_account_permission = True
     invoice_doc.posa_is_printed = 1
+
+    if single_pass:
+        if data.get("due_date"):
+            invoice_doc.due_date = data.get("due_date")
+        invoice_doc.submit()
+        _create_change_payment_entries(invoice_doc, data, pos_profile, cash_account)
+        redeeming_customer_credit(invoice_doc, data, is_payment_entry, total_cash, cash_account, payments)
+        return {"name": invoice_doc.name, "status": invoice_doc.docstatus}
+
     invoice_doc.save()
 
     if data.get("due_date"):
@@ -850,44 +1012,90 @@ def submit_invoice(invoice, data):
             update_modified=False,
         )
 
-    if frappe.get_value(
-        "POS Profile",
-        invoice_doc.pos_profile,
-        "posa_allow_submissions_in_background_job",
-    ):
-        invoices_list = frappe.get_all(
-            invoice_doc.doctype,
-            filters={
-                "posa_pos_opening_shift": invoice_doc.posa_pos_opening_shift,
-                "docstatus": 0,
-                "posa_is_printed": 1,
-            },
-        )
-        for invoice in invoices_list:
-            enqueue(
-                method=submit_in_background_job,
-                queue="short",
-                timeout=1000,
-                is_async=True,
-                kwargs={
-                    "invoice": invoice.name,
-                    "doctype": invoice_doc.doctype,
-                    "invoice_doc": invoice_doc,
-                    "data": data,
-                    "is_payment_entry": is_payment_entry,
-                    "total_cash": total_cash,
-                    "cash_account": cash_account,
-                    "payments": payments,
-                },
-            )
-    else:
-        invoice_doc.submit()
-        _create_change_payment_entries(invoice_doc, data, pos_profile, cash_account)
-        redeeming_customer_credit(invoice_doc, data, is_payment_entry, total_cash, cash_account, payments)
+    if profile_flag(invoice_doc.pos_profile, "allow_background_submission", False):
+        return _queued_response(enqueue_submission(invoice_doc, data, data.get("idempotency_key")))
+
+    invoice_doc.submit()
+    _create_change_payment_entries(invoice_doc, data, pos_profile, cash_account)
+    redeeming_customer_credit(invoice_doc, data, is_payment_entry, total_cash, cash_account, payments)
 
     return {"name": invoice_doc.name, "status": invoice_doc.docstatus}
 
 
+def _get_cash_account(invoice_doc):
+    """Return the account of the first cash payment or the company cash account."""
+
+    mop_cash_list = [
+        i.mode_of_payment
+        for i in invoice_doc.payments
+        if "cash" in i.mode_of_payment.lower() and i.type == "Cash"
+    ]
+    company = invoice_doc.company
+    if len(mop_cash_list) > 0:
+        mode_of_payment = mop_cash_list[0]
+        return _batch_lookup(
+            "cash_account",
+            (mode_of_payment, company),
+            lambda: get_bank_cash_account(mode_of_payment, company),
+        )
+    return {
+        "account": _batch_lookup(
+            "company_cash_account",
+            company,
+            lambda: frappe.get_value("Company", company, "default_cash_account"),
+        )
+    }
+
+
+def _queued_response(entry):
+    return {
+        "name": entry.get("invoice"),
+        "status": 1 if entry.get("status") == SUBMITTED else 0,
+        "submission": public_entry(entry),
+    }
+
+
+def submit_queued_invoice(key):
+    """Background job submitting the draft queued under idempotency ``key``."""
+
+    entry = get_entry(key)
+    if not entry or entry.get("status") == SUBMITTED:
+        return
+
+    data = entry.get("data") or {}
+    try:
+        invoice_doc = frappe.get_doc(entry["doctype"], entry["invoice"])
+        if invoice_doc.docstatus == 0:
+            total_cash = 0
+            is_payment_entry = 0
+            if data.get("redeemed_customer_credit"):
+                total_cash = invoice_doc.total - float(data.get("redeemed_customer_credit"))
+                is_payment_entry = cint(
+                    any(
+                        row["type"] == "Advance" and row["credit_to_redeem"]
+                        for row in data.get("customer_credit_dict") or []
+                    )
+                )
+            cash_account = _get_cash_account(invoice_doc)
+
+            invoice_doc.remarks = _invoice_remarks(invoice_doc)
+            invoice_doc.flags.ignore_permissions = True
+            frappe.flags.ignore_account_permission = True
+            invoice_doc.submit()
+            _create_change_payment_entries(invoice_doc, data, invoice_doc.pos_profile, cash_account)
+            redeeming_customer_credit(
+                invoice_doc, data, is_payment_entry, total_cash, cash_account, invoice_doc.payments
+            )
+            frappe.db.commit()
+        entry.update(status=SUBMITTED if invoice_doc.docstatus == 1 else FAILED, error=None)
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(frappe.get_traceback(), "POS Awesome invoice submission")
+        entry.update(status=FAILED, error=strip_html_tags(cstr(e)))
+    set_entry(key, entry)
+
+
+# Kept for jobs enqueued before submissions went through the submission queue.
 def submit_in_background_job(kwargs):
     invoice = kwargs.get("invoice")
     doctype = kwargs.get("doctype") or "Sales Invoice"
@@ -900,17 +1108,7 @@ def submit_in_background_job(kwargs):
     invoice_doc = frappe.get_doc(doctype, invoice)
 
     # Update remarks with items details for background job
-    items = []
-    for item in invoice_doc.items:
-        if item.item_name and item.rate and item.qty:
-            total = item.rate * item.qty
-            items.append(f"{item.item_name} - Rate: {item.rate}, Qty: {item.qty}, Amount: {total}")
-
-    # Add the grand total at the end of remarks
-    grand_total = f"\nGrand Total: {invoice_doc.grand_total}"
-    items.append(grand_total)
-
-    invoice_doc.remarks = "\n".join(items)
+    invoice_doc.remarks = _invoice_remarks(invoice_doc)
     invoice_doc.save()
 
     invoice_doc.submit()
@@ -0,0 +1,241 @@
+"""Single-flight, stale-while-revalidate caching for the item lookups.
+
+Entries stay fresh for ``ttl`` seconds and are kept for another ``ttl`` as a
+stale fallback. When an entry expires one worker takes a short redis lock and
+recomputes it while the others keep serving the stale value. On a cold miss
+the other workers wait briefly for the lock holder instead of running the same
+query concurrently.
+
+:func:`cached_item_rows` applies the same rules to per item entries so that
+overlapping pages and single item lookups share cached rows.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import pickle
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import frappe
+
+from .item_changes import change_floor, change_sequences, current_sequence
+
+_STATS_KEY = "posa_item_cache_stats"
+_LOCK_SECONDS = 30
+_WAIT_SECONDS = 2.0
+_WAIT_INTERVAL = 0.05
+
+EVENTS = ("hit", "stale", "miss", "refresh", "wait")
+
+
+def _args_digest(args: tuple) -> str:
+    raw = json.dumps(args, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def count_event(name: str, event: str, amount: int = 1) -> None:
+    """Increment the ``event`` counter of cache ``name``."""
+
+    if amount <= 0:
+        return
+    try:
+        cache = frappe.cache()
+        cache.hincrby(cache.make_key(_STATS_KEY), f"{name}:{event}", amount)
+    except Exception:
+        # Counters are diagnostics only and must never fail a lookup.
+        pass
+
+
+def _store(key: str, value: Any, ttl: int) -> None:
+    frappe.cache().set_value(
+        key,
+        {"value": value, "fresh_until": time.time() + ttl},
+        expires_in_sec=ttl * 2,
+    )
+
+
+def single_flight(ttl: int) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Cache ``fn`` in redis so that only one worker recomputes an entry."""
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        def compute(key: str, lock_key: str, args: tuple) -> Any:
+            try:
+                value = fn(*args)
+                _store(key, value, ttl)
+                return value
+            finally:
+                frappe.cache().delete(lock_key)
+
+        @wraps(fn)
+        def wrapper(*args):
+            cache = frappe.cache()
+            key = f"{name}|{_args_digest(args)}"
+            lock_key = cache.make_key(f"{key}|lock")
+
+            entry = cache.get_value(key)
+            if entry and time.time() < entry["fresh_until"]:
+                count_event(name, "hit")
+                return entry["value"]
+
+            locked = bool(cache.set(lock_key, 1, nx=True, ex=_LOCK_SECONDS))
+            if locked:
+                count_event(name, "refresh" if entry else "miss")
+                return compute(key, lock_key, args)
+
+            if entry:
+                count_event(name, "stale")
+                return entry["value"]
+
+            deadline = time.monotonic() + _WAIT_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(_WAIT_INTERVAL)
+                entry = cache.get_value(key)
+                if entry:
+                    count_event(name, "wait")
+                    return entry["value"]
+
+            # The lock holder is slow or died; compute without caching.
+            count_event(name, "miss")
+            return fn(*args)
+
+        return wrapper
+
+    return decorator
+
+
+def _read_entries(keys: Sequence[str]) -> List[Any]:
+    return [pickle.loads(raw) if raw is not None else None for raw in frappe.cache().mget(keys)]
+
+
+def cached_item_rows(
+    name: str,
+    context: tuple,
+    item_codes: Sequence[str],
+    key_field: str,
+    domains: Sequence[str],
+    fetch: Callable[[Tuple[str, ...]], List[Any]],
+    ttl: int,
+) -> List[Any]:
+    """Return the rows of ``item_codes`` from per item cache entries.
+
+    Entries are keyed on ``name``, the ``context`` (warehouse, price list...)
+    and one item code, read with a single MGET. Only missing codes and codes
+    changed in ``domains`` since their entry was stored are passed to
+    ``fetch``, which must return rows carrying the code in ``key_field``.
+    """
+
+    codes = [code for code in dict.fromkeys(item_codes) if code]
+    if not codes:
+        return []
+
+    cache = frappe.cache()
+    prefix = f"{name}|{_args_digest(context)}"
+    key_of = {code: cache.make_key(f"{prefix}|{code}") for code in codes}
+
+    now = time.time()
+    rows_of: Dict[str, List[Any]] = {}
+    expired: List[str] = []
+    for code, entry in zip(codes, _read_entries([key_of[code] for code in codes]), strict=True):
+        if entry:
+            rows_of[code] = entry
+    if rows_of:
+        floor = change_floor()
+        latest = change_sequences(rows_of, domains)
+        for code, (sequence, fresh_until, _rows) in list(rows_of.items()):
+            if sequence < floor or latest.get(code, -1) > sequence:
+                del rows_of[code]
+            elif now >= fresh_until:
+                expired.append(code)
+        rows_of = {code: entry[2] for code, entry in rows_of.items()}
+
+    missing = [code for code in codes if code not in rows_of]
+    count_event(name, "hit", len(rows_of) - len(expired))
+
+    to_fetch: List[str] = []
+    locks: List[str] = []
+    if expired:
+        lock_key = cache.make_key(f"{prefix}|lock|{_args_digest(tuple(expired))}")
+        if cache.set(lock_key, 1, nx=True, ex=_LOCK_SECONDS):
+            locks.append(lock_key)
+            to_fetch.extend(expired)
+            count_event(name, "refresh", len(expired))
+        else:
+            count_event(name, "stale", len(expired))
+
+    if missing:
+        lock_key = cache.make_key(f"{prefix}|lock|{_args_digest(tuple(missing))}")
+        if cache.set(lock_key, 1, nx=True, ex=_LOCK_SECONDS):
+            locks.append(lock_key)
+        else:
+            deadline = time.monotonic() + _WAIT_SECONDS
+            while missing and time.monotonic() < deadline:
+                time.sleep(_WAIT_INTERVAL)
+                entries = _read_entries([key_of[code] for code in missing])
+                waited = {code: entry[2] for code, entry in zip(missing, entries, strict=True) if entry}
+                if waited:
+                    rows_of.update(waited)
+                    count_event(name, "wait", len(waited))
+                    missing = [code for code in missing if code not in waited]
+        to_fetch.extend(missing)
+        count_event(name, "miss", len(missing))
+
+    if to_fetch:
+        try:
+            # Read the sequence first so changes made while fetching are refreshed.
+            sequence = current_sequence()
+            fetched: Dict[str, List[Any]] = {code: [] for code in to_fetch}
+            for row in fetch(tuple(sorted(to_fetch))):
+                fetched.setdefault(row.get(key_field), []).append(row)
+
+            fresh_until = time.time() + ttl
+            pipe = cache.pipeline()
+            for code in to_fetch:
+                rows_of[code] = fetched[code]
+                pipe.set(key_of[code], pickle.dumps((sequence, fresh_until, fetched[code])), ex=ttl * 2)
+            pipe.execute()
+        finally:
+            for lock_key in locks:
+                cache.delete(lock_key)
+
+    result: List[Any] = []
+    for code in codes:
+        result.extend(rows_of.get(code, ()))
+    return result
+
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Return ``cache name -> event -> count`` for the single-flight caches."""
+
+    cache = frappe.cache()
+    # The wrapper's ``hgetall`` unpickles values, read the raw counters instead.
+    pipe = cache.pipeline()
+    pipe.hgetall(cache.make_key(_STATS_KEY))
+    raw = pipe.execute()[0] or {}
+    stats: Dict[str, Dict[str, int]] = {}
+    for field, value in raw.items():
+        if isinstance(field, bytes):
+            field = field.decode()
+        name, _sep, event = field.rpartition(":")
+        stats.setdefault(name, dict.fromkeys(EVENTS, 0))[event] = int(value)
+    return stats
+
+
+def reset_cache_stats() -> None:
+    """Clear every counter returned by :func:`get_cache_stats`."""
+
+    cache = frappe.cache()
+    cache.delete(cache.make_key(_STATS_KEY))
+
+
+__all__ = [
+    "cached_item_rows",
+    "count_event",
+    "get_cache_stats",
+    "reset_cache_stats",
+    "single_flight",
+]
@@ -0,0 +1,220 @@
+"""Change tracking for the item data served to POS terminals.
+
+Document events record which item codes had their master data, prices, stock,
+barcodes, UOMs or batches changed, stamped with a monotonically increasing
+sequence number kept in redis. Cached lookups remember the sequence they were
+computed at and refresh only the item codes changed since then, which keeps
+long lived caches exact without rebuilding them wholesale.
+
+The keys are declared as ``persistent_cache_keys`` so clearing the cache keeps
+them; should they still be lost, a sequence ahead of the current one is
+treated like one older than the tracked history.
+"""
+
+from __future__ import annotations
+
+from functools import partial
+from typing import Dict, Iterable, Optional, Sequence, Set
+
+import frappe
+
+DOMAINS = ("item", "price", "stock", "barcode", "uom", "batch")
+
+_SEQUENCE_KEY = "posa_item_change_seq"
+_FLOOR_KEY = "posa_item_change_floor"
+_CHANGES_KEY = "posa_item_changes"
+# Number of item codes remembered per domain before the oldest are dropped.
+_MAX_TRACKED_CHANGES = 200000
+
+
+def _key(name: str) -> str:
+    return frappe.cache().make_key(name)
+
+
+def _domain_key(domain: str) -> str:
+    return _key(f"{_CHANGES_KEY}|{domain}")
+
+
+def current_sequence() -> int:
+    """Return the latest change sequence number."""
+
+    value = frappe.cache().get(_key(_SEQUENCE_KEY))
+    return int(value or 0)
+
+
+def change_floor() -> int:
+    """Return the oldest sequence still covered by the tracked changes."""
+
+    value = frappe.cache().get(_key(_FLOOR_KEY))
+    return int(value or 0)
+
+
+def record_item_changes(item_codes: Iterable[str], domains: Sequence[str]) -> Optional[int]:
+    """Mark ``item_codes`` as changed for ``domains`` and return the new sequence."""
+
+    codes = {code for code in item_codes if code}
+    domains = [domain for domain in domains if domain in DOMAINS]
+    if not codes or not domains:
+        return None
+
+    cache = frappe.cache()
+    sequence = cache.incr(_key(_SEQUENCE_KEY))
+    pipe = cache.pipeline()
+    for domain in domains:
+        pipe.zadd(_domain_key(domain), {code: sequence for code in codes})
+        pipe.zcard(_domain_key(domain))
+    results = pipe.execute()
+
+    for domain, size in zip(domains, results[1::2], strict=True):
+        if size and size > _MAX_TRACKED_CHANGES:
+            _trim(domain, size - _MAX_TRACKED_CHANGES)
+    return sequence
+
+
+def _trim(domain: str, count: int) -> None:
+    """Forget the ``count`` oldest changes of ``domain`` and raise the floor."""
+
+    cache = frappe.cache()
+    dropped = cache.zrange(_domain_key(domain), count - 1, count - 1, withscores=True)
+    cache.zremrangebyrank(_domain_key(domain), 0, count - 1)
+    if dropped:
+        floor = int(dropped[0][1])
+        if floor > change_floor():
+            cache.set(_key(_FLOOR_KEY), floor)
+
+
+def change_sequences(item_codes: Iterable[str], domains: Sequence[str]) -> Dict[str, int]:
+    """Return the latest change sequence of each code changed in ``domains``.
+
+    Codes without a tracked change are omitted.
+    """
+
+    codes = [code for code in dict.fromkeys(item_codes) if code]
+    if not codes:
+        return {}
+
+    pipe = frappe.cache().pipeline()
+    for domain in domains:
+        for code in codes:
+            pipe.zscore(_domain_key(domain), code)
+    scores = pipe.execute()
+
+    latest: Dict[str, int] = {}
+    for position, score in enumerate(scores):
+        if score is None:
+            continue
+        code = codes[position % len(codes)]
+        if score > latest.get(code, -1):
+            latest[code] = int(score)
+    return latest
+
+
+def history_covers(since: int) -> bool:
+    """Return True when the tracked changes reach back to sequence ``since``.
+
+    A ``since`` ahead of the current sequence was issued before the counter
+    was reset and is not covered either.
+    """
+
+    return change_floor() <= since <= current_sequence()
+
+
+def changed_item_codes(item_codes: Iterable[str], since: Optional[int], domains: Sequence[str]) -> Set[str]:
+    """Return the subset of ``item_codes`` changed after sequence ``since``.
+
+    Every code is reported as changed when the history does not cover
+    ``since``, so callers always err on the side of refreshing.
+    """
+
+    codes = [code for code in dict.fromkeys(item_codes) if code]
+    if not codes or since is None:
+        return set()
+    if not history_covers(since):
+        return set(codes)
+
+    return {code for code, sequence in change_sequences(codes, domains).items() if sequence > since}
+
+
+def changes_since(since: int, domains: Sequence[str] = DOMAINS) -> Optional[Dict[str, Set[str]]]:
+    """Return ``item_code -> changed domains`` for every change after ``since``.
+
+    ``None`` means the history does not cover ``since`` and the caller has
+    to fall back to a full reload.
+    """
+
+    if not history_covers(since):
+        return None
+
+    cache = frappe.cache()
+    changes: Dict[str, Set[str]] = {}
+    for domain in domains:
+        for code in cache.zrangebyscore(_domain_key(domain), f"({int(since)}", "+inf"):
+            if isinstance(code, bytes):
+                code = code.decode()
+            changes.setdefault(code, set()).add(domain)
+    return changes
+
+
+def _record_after_commit(item_codes: Iterable[str], domains: Sequence[str]) -> None:
+    """Record changes once the surrounding transaction is committed.
+
+    Recording earlier would let a concurrent cache fill read the old rows after
+    the change had already been stamped, leaving the cache stale.
+    """
+
+    codes = tuple(sorted({code for code in item_codes if code}))
+    if not codes:
+        return
+    frappe.db.after_commit.add(partial(record_item_changes, codes, tuple(domains)))
+
+
+def _with_previous(doc, fieldname: str) -> Set[str]:
+    values = {doc.get(fieldname)}
+    previous = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+    if previous:
+        values.add(previous.get(fieldname))
+    return {value for value in values if value}
+
+
+def on_item_change(doc, method=None, *args):
+    """Item master, barcode and UOM rows are saved together with the Item.
+
+    ``after_rename`` passes the old name as the first extra argument.
+    """
+
+    codes = {doc.name}
+    if method == "after_rename" and args:
+        codes.add(args[0])
+    _record_after_commit(codes, ("item", "barcode", "uom"))
+
+
+def on_item_price_change(doc, method=None):
+    _record_after_commit(_with_previous(doc, "item_code"), ("price",))
+
+
+def on_bin_change(doc, method=None):
+    _record_after_commit([doc.item_code], ("stock",))
+
+
+def on_stock_ledger_entry(doc, method=None):
+    """ERPNext updates Bin with ``db.set_value`` so Bin events rarely fire."""
+
+    has_batches = doc.get("batch_no") or doc.get("serial_and_batch_bundle")
+    domains = ("stock", "batch") if has_batches else ("stock",)
+    _record_after_commit([doc.item_code], domains)
+
+
+def on_batch_change(doc, method=None):
+    _record_after_commit(_with_previous(doc, "item"), ("batch",))
+
+
+__all__ = [
+    "DOMAINS",
+    "change_floor",
+    "change_sequences",
+    "changed_item_codes",
+    "changes_since",
+    "current_sequence",
+    "history_covers",
+    "record_item_changes",
+]
@@ -3,30 +3,46 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
 
 import frappe
 from erpnext.setup.utils import get_exchange_rate
-from erpnext.stock.doctype.batch.batch import get_batch_qty
+from frappe import _
 from frappe.utils import flt, nowdate
-from frappe.utils.caching import redis_cache
+
+from .item_cache import cached_item_rows
+from .item_changes import changes_since, current_sequence
+from .stock_snapshot import get_stock_quantities
 
 
 def _resolve_cache_ttl(ttl: Optional[int]) -> int:
     """Return a numeric TTL value while falling back to the default window."""
 
-    return int(ttl) if ttl else 300
-
+    # Cached rows are refreshed per item by change events, so the default
+    # window only bounds memory usage rather than staleness.
+    return int(ttl) if ttl else 3600
 
-def _cache_wrapper(store: Dict[int, Callable[..., Any]], ttl: Optional[int], fn: Callable[..., Any]):
-    """Memoize the redis cache decorator for a given TTL to avoid re-wrapping."""
 
-    resolved_ttl = _resolve_cache_ttl(ttl)
-    cached = store.get(resolved_ttl)
-    if cached is None:
-        cached = redis_cache(ttl=resolved_ttl)(fn)
-        store[resolved_ttl] = cached
-    return cached
+def _cached_rows(
+    name: str,
+    context: tuple,
+    item_codes: Sequence[str],
+    key_field: str,
+    domains: Sequence[str],
+    fetch: Callable[[Tuple[str, ...]], List[Any]],
+    ttl: Optional[int],
+) -> List[Any]:
+    """Serve ``fetch`` results from per item cache entries of this module."""
+
+    return cached_item_rows(
+        f"{__name__}.{name}",
+        context,
+        item_codes,
+        key_field,
+        domains,
+        fetch,
+        _resolve_cache_ttl(ttl),
+    )
 
 
 def _normalize_codes(codes: Iterable[str]) -> Tuple[str, ...]:
@@ -35,15 +51,6 @@ def _normalize_codes(codes: Iterable[str]) -> Tuple[str, ...]:
     return tuple(sorted({code for code in codes if code}))
 
 
-_price_cache: Dict[int, Callable[..., Any]] = {}
-_bin_cache: Dict[int, Callable[..., Any]] = {}
-_meta_cache: Dict[int, Callable[..., Any]] = {}
-_barcode_cache: Dict[int, Callable[..., Any]] = {}
-_uom_cache: Dict[int, Callable[..., Any]] = {}
-_batch_cache: Dict[int, Callable[..., Any]] = {}
-_serial_cache: Dict[int, Callable[..., Any]] = {}
-
-
 def _fetch_item_prices(
     price_list: str,
     currency: str,
@@ -105,42 +112,142 @@ def get_item_prices(
 ):
     """Fetch Item Price data with optional redis caching based on TTL."""
 
-    cached = _cache_wrapper(_price_cache, ttl, _fetch_item_prices)
-    return cached(price_list, currency, tuple(item_codes), customer or "", today or nowdate())
+    customer = customer or ""
+    today = today or nowdate()
+    return _cached_rows(
+        "item_prices",
+        (price_list, currency, customer, today),
+        item_codes,
+        "item_code",
+        ("price",),
+        lambda codes: _fetch_item_prices(price_list, currency, codes, customer, today),
+        ttl,
+    )
 
 
 def _fetch_bin_qty(warehouse: str, item_codes: Tuple[str, ...]):
-    """Return stock quantities for each item, expanding warehouse groups."""
+    """Return stock quantities for each item, summed over warehouse groups."""
 
     if not item_codes or not warehouse:
         return []
 
-    if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-        warehouses = frappe.db.get_descendants("Warehouse", warehouse) or []
-        if not warehouses:
-            return []
-        return frappe.get_all(
-            "Bin",
-            fields=["item_code", "sum(actual_qty) as actual_qty"],
-            filters={
-                "warehouse": ["in", warehouses],
-                "item_code": ["in", item_codes],
-            },
-            group_by="item_code",
-        )
+    quantities = get_stock_quantities(warehouse, item_codes)
+    return [frappe._dict(item_code=code, actual_qty=qty["actual_qty"]) for code, qty in quantities.items()]
 
-    return frappe.get_all(
-        "Bin",
-        fields=["item_code", "actual_qty"],
-        filters={"warehouse": warehouse, "item_code": ["in", item_codes]},
-    )
+
+def _warehouse_scope(warehouse: str) -> List[str]:
+    """Return ``warehouse`` or, for a group warehouse, all of its descendants."""
+
+    if frappe.db.get_value("Warehouse", warehouse, "is_group"):
+        return frappe.db.get_descendants("Warehouse", warehouse) or []
+    return [warehouse]
 
 
 def get_bin_qty(warehouse: Optional[str], item_codes: Sequence[str], ttl: Optional[int] = None):
     """Return cached Bin quantities when a warehouse and codes are provided."""
 
-    cached = _cache_wrapper(_bin_cache, ttl, _fetch_bin_qty)
-    return cached(warehouse, tuple(item_codes))
+    return _cached_rows(
+        "bin_qty",
+        (warehouse,),
+        item_codes,
+        "item_code",
+        ("stock",),
+        lambda codes: _fetch_bin_qty(warehouse, codes),
+        ttl,
+    )
+
+
+# Worker-local sets of in-stock item codes keyed by (site, warehouse) and
+# stamped with the change sequence they reflect.
+_in_stock_cache: Dict[Tuple[str, str], Tuple[int, FrozenSet[str]]] = {}
+_IN_STOCK_CHUNK_SIZE = 1000
+
+
+def _fetch_in_stock_codes(warehouse: str, item_codes: Optional[Tuple[str, ...]] = None) -> FrozenSet[str]:
+    """Return the item codes with positive stock across the warehouse scope."""
+
+    warehouses = _warehouse_scope(warehouse)
+    if not warehouses:
+        return frozenset()
+
+    conditions = ["warehouse in %(warehouses)s"]
+    values: Dict[str, Any] = {"warehouses": tuple(warehouses)}
+    if item_codes is not None:
+        if not item_codes:
+            return frozenset()
+        conditions.append("item_code in %(item_codes)s")
+        values["item_codes"] = item_codes
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT item_code
+        FROM `tabBin`
+        WHERE {" AND ".join(conditions)}
+        GROUP BY item_code
+        HAVING SUM(actual_qty) > 0
+        """,
+        values,
+    )
+    return frozenset(row[0] for row in rows)
+
+
+def get_in_stock_item_codes(warehouse: Optional[str]) -> Optional[FrozenSet[str]]:
+    """Return every item code in stock for ``warehouse`` or ``None`` without one.
+
+    The full set is read once per worker and afterwards only the items with
+    stock changes are re-checked.
+    """
+
+    if not warehouse:
+        return None
+
+    key = (frappe.local.site, warehouse)
+    latest = current_sequence()
+    entry = _in_stock_cache.get(key)
+    # Any other sequence, a lower one after a counter reset included, refreshes the set.
+    if entry and entry[0] == latest:
+        return entry[1]
+
+    changes = changes_since(entry[0], ("stock",)) if entry else None
+    if changes is None:
+        codes = _fetch_in_stock_codes(warehouse)
+    else:
+        changed = sorted(changes)
+        fresh = set()
+        for start in range(0, len(changed), _IN_STOCK_CHUNK_SIZE):
+            fresh.update(
+                _fetch_in_stock_codes(warehouse, tuple(changed[start : start + _IN_STOCK_CHUNK_SIZE]))
+            )
+        codes = frozenset((entry[1] - set(changed)) | fresh)
+
+    _in_stock_cache[key] = (latest, codes)
+    return codes
+
+
+def in_stock_condition(warehouse: Optional[str], include_templates: bool = False) -> Optional[str]:
+    """Return an Item query condition keeping the items in stock for ``warehouse``.
+
+    Bin is checked per item inside the Item query, so neither the in-stock
+    set nor the templates are sent as an ``IN`` list. ``None`` without a
+    warehouse.
+    """
+
+    if not warehouse:
+        return None
+
+    warehouses = _warehouse_scope(warehouse)
+    in_stock = "1 = 0"
+    if warehouses:
+        scope = ", ".join(frappe.db.escape(name) for name in warehouses)
+        in_stock = f"""exists (
+            select 1 from `tabBin`
+            where `tabBin`.item_code = `tabItem`.name and `tabBin`.warehouse in ({scope})
+            group by `tabBin`.item_code
+            having sum(`tabBin`.actual_qty) > 0
+        )"""
+    if include_templates:
+        return f"(`tabItem`.has_variants = 1 or {in_stock})"
+    return in_stock
 
 
 def _fetch_item_meta(item_codes: Tuple[str, ...]):
@@ -158,8 +265,7 @@ def _fetch_item_meta(item_codes: Tuple[str, ...]):
 def get_item_meta(item_codes: Sequence[str], ttl: Optional[int] = None):
     """Fetch Item metadata with caching support."""
 
-    cached = _cache_wrapper(_meta_cache, ttl, _fetch_item_meta)
-    return cached(tuple(item_codes))
+    return _cached_rows("item_meta", (), item_codes, "name", ("item",), _fetch_item_meta, ttl)
 
 
 def _fetch_barcodes(item_codes: Tuple[str, ...]):
@@ -177,8 +283,7 @@ def _fetch_barcodes(item_codes: Tuple[str, ...]):
 def get_barcodes(item_codes: Sequence[str], ttl: Optional[int] = None):
     """Fetch Item Barcode entries while respecting the configured TTL."""
 
-    cached = _cache_wrapper(_barcode_cache, ttl, _fetch_barcodes)
-    return cached(tuple(item_codes))
+    return _cached_rows("barcodes", (), item_codes, "parent", ("barcode",), _fetch_barcodes, ttl)
 
 
 def _fetch_uoms(item_codes: Tuple[str, ...]):
@@ -196,41 +301,83 @@ def _fetch_uoms(item_codes: Tuple[str, ...]):
 def get_uoms(item_codes: Sequence[str], ttl: Optional[int] = None):
     """Fetch UOM Conversion Detail rows with redis caching support."""
 
-    cached = _cache_wrapper(_uom_cache, ttl, _fetch_uoms)
-    return cached(tuple(item_codes))
+    return _cached_rows("uoms", (), item_codes, "parent", ("uom",), _fetch_uoms, ttl)
 
 
 def _fetch_batches(warehouse: str, item_codes: Tuple[str, ...]):
-    """Collect positive batch quantities per item for the given warehouse."""
+    """Collect positive batch quantities per item for the given warehouse.
+
+    Balances of every requested item are aggregated in a single query over
+    Serial and Batch Bundle entries (plus legacy ``batch_no`` ledger rows) and
+    joined to Batch, instead of calling ``get_batch_qty`` once per item.
+    Disabled and expired batches are skipped.
+    """
 
     if not item_codes or not warehouse:
         return []
 
-    rows = []
-    for item_code in item_codes:
-        batch_list = get_batch_qty(item_code=item_code, warehouse=warehouse) or []
-        for batch in batch_list:
-            if batch.get("batch_no") and flt(batch.get("qty")) > 0:
-                rows.append(
-                    frappe._dict(
-                        {
-                            "item_code": item_code,
-                            "batch_no": batch.get("batch_no"),
-                            "batch_qty": batch.get("qty"),
-                            "expiry_date": batch.get("expiry_date"),
-                            "batch_price": batch.get("posa_batch_price"),
-                            "manufacturing_date": batch.get("manufacturing_date"),
-                        }
-                    )
-                )
-    return rows
+    warehouses = _warehouse_scope(warehouse)
+    if not warehouses:
+        return []
+
+    params = {
+        "item_codes": item_codes,
+        "warehouses": tuple(warehouses),
+        "today": nowdate(),
+    }
+    query = """
+        SELECT
+            ledger.item_code,
+            ledger.batch_no,
+            SUM(ledger.qty) AS batch_qty,
+            batch.expiry_date,
+            batch.posa_batch_price AS batch_price,
+            batch.manufacturing_date
+        FROM (
+            SELECT bundle.item_code, entry.batch_no, entry.qty
+            FROM `tabSerial and Batch Bundle` bundle
+            INNER JOIN `tabSerial and Batch Entry` entry ON entry.parent = bundle.name
+            WHERE
+                bundle.docstatus = 1
+                AND bundle.is_cancelled = 0
+                AND bundle.type_of_transaction IN ('Inward', 'Outward')
+                AND bundle.item_code IN %(item_codes)s
+                AND entry.warehouse IN %(warehouses)s
+                AND IFNULL(entry.batch_no, '') != ''
+            UNION ALL
+            SELECT sle.item_code, sle.batch_no, sle.actual_qty AS qty
+            FROM `tabStock Ledger Entry` sle
+            WHERE
+                sle.is_cancelled = 0
+                AND sle.item_code IN %(item_codes)s
+                AND sle.warehouse IN %(warehouses)s
+                AND IFNULL(sle.batch_no, '') != ''
+                AND IFNULL(sle.serial_and_batch_bundle, '') = ''
+        ) ledger
+        INNER JOIN `tabBatch` batch ON batch.name = ledger.batch_no
+        WHERE
+            batch.disabled = 0
+            AND (batch.expiry_date IS NULL OR batch.expiry_date >= %(today)s)
+        GROUP BY ledger.item_code, ledger.batch_no
+        HAVING batch_qty > 0
+        ORDER BY ledger.item_code, batch.expiry_date, batch.creation
+    """
+
+    return frappe.db.sql(query, params, as_dict=True)
 
 
 def get_batches(warehouse: Optional[str], item_codes: Sequence[str], ttl: Optional[int] = None):
     """Fetch batch availability constrained to the provided warehouse."""
 
-    cached = _cache_wrapper(_batch_cache, ttl, _fetch_batches)
-    return cached(warehouse, tuple(item_codes))
+    return _cached_rows(
+        "batches",
+        (warehouse,),
+        item_codes,
+        "item_code",
+        ("stock", "batch"),
+        lambda codes: _fetch_batches(warehouse, codes),
+        ttl,
+    )
 
 
 def _fetch_serials(warehouse: str, item_codes: Tuple[str, ...]):
@@ -252,8 +399,15 @@ def _fetch_serials(warehouse: str, item_codes: Tuple[str, ...]):
 def get_serials(warehouse: Optional[str], item_codes: Sequence[str], ttl: Optional[int] = None):
     """Fetch serial number data while honouring the redis cache TTL."""
 
-    cached = _cache_wrapper(_serial_cache, ttl, _fetch_serials)
-    return cached(warehouse, tuple(item_codes))
+    return _cached_rows(
+        "serials",
+        (warehouse,),
+        item_codes,
+        "item_code",
+        ("stock",),
+        lambda codes: _fetch_serials(warehouse, codes),
+        ttl,
+    )
 
 
 @dataclass(frozen=True)
@@ -267,6 +421,28 @@ class ItemLookupData:
     serial_map: Dict[str, List[Dict[str, Any]]]
 
 
+# Fetchers needed to fill each detail field; ``None`` projections fill all.
+DETAIL_FIELD_FETCHERS: Dict[str, FrozenSet[str]] = {
+    "item_uoms": frozenset({"meta", "uoms"}),
+    "item_barcode": frozenset({"barcodes"}),
+    "actual_qty": frozenset({"stock"}),
+    "has_batch_no": frozenset({"meta"}),
+    "has_serial_no": frozenset({"meta"}),
+    "batch_no_data": frozenset({"meta", "batches"}),
+    "serial_no_data": frozenset({"meta", "serials"}),
+    "rate": frozenset({"meta", "prices"}),
+    "price_list_rate": frozenset({"meta", "prices"}),
+    "currency": frozenset({"meta", "prices"}),
+    "price_list_currency": frozenset(),
+    "plc_conversion_rate": frozenset(),
+    "conversion_rate": frozenset(),
+}
+_CURRENCY_FIELDS = frozenset(
+    {"rate", "price_list_rate", "currency", "price_list_currency", "plc_conversion_rate", "conversion_rate"}
+)
+_ALL_FETCHERS = frozenset().union(*DETAIL_FIELD_FETCHERS.values())
+
+
 def _select_price(
     price_rows: Dict[str, frappe._dict],
     requested_uom: Optional[str],
@@ -304,8 +480,12 @@ def merge_item_row(
     lookup_data: ItemLookupData,
     price_list_currency: Optional[str],
     exchange_rate: float,
+    fields: Optional[FrozenSet[str]] = None,
 ) -> Dict[str, Any]:
-    """Merge lookup data into a POS item row for downstream consumption."""
+    """Merge lookup data into a POS item row for downstream consumption.
+
+    ``fields`` restricts the merged detail fields to the given projection.
+    """
 
     item_code = item.get("item_code")
     if not item_code:
@@ -316,24 +496,26 @@ def merge_item_row(
     price_row = _select_price(lookup_data.price_map.get(item_code, {}), item.get("uom"), meta.get("stock_uom"))
     price_currency = price_row.get("currency") if price_row else None
 
+    details = {
+        "item_uoms": uoms,
+        "item_barcode": lookup_data.barcode_map.get(item_code, []),
+        "actual_qty": lookup_data.stock_map.get(item_code, 0) or 0,
+        "has_batch_no": meta.get("has_batch_no"),
+        "has_serial_no": meta.get("has_serial_no"),
+        "batch_no_data": lookup_data.batch_map.get(item_code, []),
+        "serial_no_data": lookup_data.serial_map.get(item_code, []),
+        "rate": price_row.get("price_list_rate") if price_row else 0,
+        "price_list_rate": price_row.get("price_list_rate") if price_row else 0,
+        "currency": price_currency or price_list_currency,
+        "price_list_currency": price_list_currency,
+        "plc_conversion_rate": exchange_rate,
+        "conversion_rate": exchange_rate,
+    }
     row = dict(item)
-    row.update(
-        {
-            "item_uoms": uoms,
-            "item_barcode": lookup_data.barcode_map.get(item_code, []),
-            "actual_qty": lookup_data.stock_map.get(item_code, 0) or 0,
-            "has_batch_no": meta.get("has_batch_no"),
-            "has_serial_no": meta.get("has_serial_no"),
-            "batch_no_data": lookup_data.batch_map.get(item_code, []),
-            "serial_no_data": lookup_data.serial_map.get(item_code, []),
-            "rate": price_row.get("price_list_rate") if price_row else 0,
-            "price_list_rate": price_row.get("price_list_rate") if price_row else 0,
-            "currency": price_currency or price_list_currency,
-            "price_list_currency": price_list_currency,
-            "plc_conversion_rate": exchange_rate,
-            "conversion_rate": exchange_rate,
-        }
-    )
+    if fields is None:
+        row.update(details)
+    else:
+        row.update({field: value for field, value in details.items() if field in fields})
     if not row.get("item_name") and meta.get("item_name"):
         row["item_name"] = meta.get("item_name")
     return row
@@ -347,6 +529,7 @@ class ItemDetailAggregator:
         pos_profile: Dict[str, Any],
         price_list: Optional[str] = None,
         customer: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
     ) -> None:
         self.pos_profile = pos_profile
         self.customer = customer
@@ -354,8 +537,30 @@ class ItemDetailAggregator:
         self.cache_ttl = self._resolve_ttl()
         self.today = nowdate()
         self.warehouse = pos_profile.get("warehouse")
-        self.price_list_currency = self._determine_price_list_currency()
-        self.exchange_rate = self._compute_exchange_rate()
+        self.fields = self._resolve_fields(fields)
+        self.fetchers = (
+            _ALL_FETCHERS
+            if self.fields is None
+            else frozenset().union(*(DETAIL_FIELD_FETCHERS[field] for field in self.fields))
+        )
+        # Currency lookups are skipped when no price related field is requested.
+        self.price_list_currency = None
+        self.exchange_rate = 1
+        if self.fields is None or self.fields & _CURRENCY_FIELDS:
+            self.price_list_currency = self._determine_price_list_currency()
+            self.exchange_rate = self._compute_exchange_rate()
+
+    @staticmethod
+    def _resolve_fields(fields: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
+        """Validate the requested detail field projection."""
+
+        if fields is None:
+            return None
+        fields = frozenset(fields)
+        unknown = fields - set(DETAIL_FIELD_FETCHERS)
+        if unknown:
+            frappe.throw(_("Unknown item detail fields: {0}").format(", ".join(sorted(unknown))))
+        return fields
 
     def _resolve_ttl(self) -> Optional[int]:
         """Convert the POS profile cache duration to seconds."""
@@ -405,8 +610,9 @@ class ItemDetailAggregator:
         if not item_codes_tuple:
             return ItemLookupData({}, {}, {}, {}, {}, {}, {})
 
+        fetchers = self.fetchers
         price_rows = []
-        if self.price_list:
+        if self.price_list and "prices" in fetchers:
             price_rows = get_item_prices(
                 self.price_list,
                 self.price_list_currency or self.pos_profile.get("currency"),
@@ -417,15 +623,20 @@ class ItemDetailAggregator:
             )
         # Stock, metadata, UOM and barcode data are reused both for batches and the
         # final merged item rows, so collect them up front.
-        stock_rows = get_bin_qty(self.warehouse, item_codes_tuple, ttl=self.cache_ttl)
-        meta_rows = get_item_meta(item_codes_tuple, ttl=self.cache_ttl)
-        uom_rows = get_uoms(item_codes_tuple, ttl=self.cache_ttl)
-        barcode_rows = get_barcodes(item_codes_tuple, ttl=self.cache_ttl)
-
-        batch_items = [row.name for row in meta_rows if row.get("has_batch_no")]
-        serial_items = [row.name for row in meta_rows if row.get("has_serial_no")]
-        batch_rows = get_batches(self.warehouse, _normalize_codes(batch_items), ttl=self.cache_ttl)
-        serial_rows = get_serials(self.warehouse, _normalize_codes(serial_items), ttl=self.cache_ttl)
+        ttl = self.cache_ttl
+        stock_rows = get_bin_qty(self.warehouse, item_codes_tuple, ttl=ttl) if "stock" in fetchers else []
+        meta_rows = get_item_meta(item_codes_tuple, ttl=ttl) if "meta" in fetchers else []
+        uom_rows = get_uoms(item_codes_tuple, ttl=ttl) if "uoms" in fetchers else []
+        barcode_rows = get_barcodes(item_codes_tuple, ttl=ttl) if "barcodes" in fetchers else []
+
+        batch_rows = []
+        if "batches" in fetchers:
+            batch_items = [row.name for row in meta_rows if row.get("has_batch_no")]
+            batch_rows = get_batches(self.warehouse, _normalize_codes(batch_items), ttl=ttl)
+        serial_rows = []
+        if "serials" in fetchers:
+            serial_items = [row.name for row in meta_rows if row.get("has_serial_no")]
+            serial_rows = get_serials(self.warehouse, _normalize_codes(serial_items), ttl=ttl)
 
         price_map: Dict[str, Dict[str, frappe._dict]] = {}
         for row in price_rows:
@@ -485,16 +696,25 @@ class ItemDetailAggregator:
             if not item.get("item_code") or item.get("has_variants"):
                 continue
             result.append(
-                merge_item_row(item, lookup_data, self.price_list_currency or self.pos_profile.get("currency"), self.exchange_rate)
+                merge_item_row(
+                    item,
+                    lookup_data,
+                    self.price_list_currency or self.pos_profile.get("currency"),
+                    self.exchange_rate,
+                    self.fields,
+                )
             )
         return result
 
 
 __all__ = [
+    "DETAIL_FIELD_FETCHERS",
     "ItemDetailAggregator",
     "ItemLookupData",
     "get_item_prices",
     "get_bin_qty",
+    "get_in_stock_item_codes",
+    "in_stock_condition",
     "get_item_meta",
     "get_barcodes",
     "get_uoms",
@@ -0,0 +1,114 @@
+"""Relevance ranked item search over the ``item_name_description_ft`` index.
+
+Search words are turned into a boolean-mode ``MATCH ... AGAINST`` query where
+every word is required and matched as a prefix (``+word*``). Words shorter
+than the server's minimum full-text token size are not indexed, so they are
+left to the caller's LIKE / word filter instead.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Sequence, Set
+
+import frappe
+from frappe.utils import cint
+
+FULLTEXT_MODE = "Full Text"
+
+# Characters with a meaning in boolean mode; they split words instead.
+_BOOLEAN_OPERATORS = re.compile(r"[+\-<>()~*\"@]+")
+_DEFAULT_MIN_TOKEN_SIZE = 3
+
+# Worker-local ``innodb_ft_min_token_size`` per site and the sites whose
+# full-text query failed (index missing), which are not retried.
+_min_token_sizes: Dict[str, int] = {}
+_failed_sites: Set[str] = set()
+
+
+def _min_token_size() -> int:
+    site = frappe.local.site
+    size = _min_token_sizes.get(site)
+    if size is None:
+        size = _DEFAULT_MIN_TOKEN_SIZE
+        try:
+            row = frappe.db.sql("show variables like 'innodb_ft_min_token_size'")
+            if row:
+                size = cint(row[0][1]) or _DEFAULT_MIN_TOKEN_SIZE
+        except Exception:
+            pass
+        _min_token_sizes[site] = size
+    return size
+
+
+def boolean_query(search_words: Sequence[str]) -> Optional[str]:
+    """Return the boolean-mode query for ``search_words``.
+
+    ``None`` means no word is long enough for the full-text index.
+    """
+
+    min_size = _min_token_size()
+    terms: List[str] = []
+    for word in search_words:
+        for part in _BOOLEAN_OPERATORS.sub(" ", word).split():
+            if len(part) >= min_size and f"+{part}*" not in terms:
+                terms.append(f"+{part}*")
+    return " ".join(terms) or None
+
+
+def is_available() -> bool:
+    """Full-text search needs MariaDB/MySQL; Postgres sites keep LIKE."""
+
+    return frappe.db.db_type == "mariadb"
+
+
+def fulltext_item_codes(
+    search_words: Sequence[str],
+    item_groups: Optional[Sequence[str]] = None,
+    limit: int = 500,
+) -> Optional[List[str]]:
+    """Return up to ``limit`` sellable item codes ranked by relevance.
+
+    Returns ``None`` when full-text search cannot answer the query (no word
+    long enough, unsupported database or missing index) so the caller falls
+    back to its LIKE search.
+    """
+
+    if not is_available() or frappe.local.site in _failed_sites:
+        return None
+    query = boolean_query(search_words)
+    if not query:
+        return None
+
+    conditions = ["disabled = 0", "is_sales_item = 1", "is_fixed_asset = 0"]
+    values: Dict[str, object] = {"query": query, "limit": cint(limit)}
+    if item_groups:
+        conditions.append("item_group in %(item_groups)s")
+        values["item_groups"] = tuple(item_groups)
+
+    try:
+        rows = frappe.db.sql(
+            f"""
+            select name
+            from `tabItem`
+            where match(item_name, description) against (%(query)s in boolean mode)
+                and {" and ".join(conditions)}
+            order by match(item_name, description) against (%(query)s in boolean mode) desc, item_name asc
+            limit %(limit)s
+            """,
+            values,
+        )
+    except Exception:
+        # Usually the index is missing (patch failed); keep searching with LIKE.
+        _failed_sites.add(frappe.local.site)
+        frappe.log_error(frappe.get_traceback(), "POS Awesome full-text search")
+        return None
+    return [row[0] for row in rows]
+
+
+__all__ = [
+    "FULLTEXT_MODE",
+    "boolean_query",
+    "fulltext_item_codes",
+    "is_available",
+]
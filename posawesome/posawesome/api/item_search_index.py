@@ -0,0 +1,518 @@
+"""Per-profile token index used to answer item searches without LIKE scans."""
+
+from __future__ import annotations
+
+import heapq
+import re
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import frappe
+from frappe.utils import cstr
+
+from .item_changes import changes_since, current_sequence
+from .item_fetchers import _fetch_barcodes
+from .utils import get_item_groups
+
+# Bumped whenever the indexed fields change so stale payloads are rebuilt.
+_INDEX_CACHE_KEY = "posa_item_search_index_v3"
+_INDEX_VERSION_KEY = "posa_item_search_index_version_v3"
+# Item and barcode changes are applied incrementally, periodic rebuilds only
+# compact the index and pick up items moved between item groups.
+_DEFAULT_REFRESH_SECONDS = 6 * 60 * 60
+_CHUNK_SIZE = 1000
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+RANKED_MODE = "Ranked"
+# Words are looked up through token trigrams; shorter words cannot narrow.
+_MIN_SEARCH_LENGTH = 3
+# Shorter words produce too many one-edit neighbours to be useful.
+_MIN_FUZZY_LENGTH = 4
+# Match kinds of a search word against an item, best first.
+_EXACT, _PREFIX, _FUZZY = 2, 1, 0
+
+# Worker-local copies of the indexes keyed by (site, profile). The serialised
+# entries live in redis so a single build is shared by every worker.
+_local_indexes: Dict[Tuple[str, str], "ItemSearchIndex"] = {}
+
+
+def tokenize(value: Any) -> Set[str]:
+    """Return the lowercased tokens used to index ``value``.
+
+    Whitespace separated words are kept intact (so ``coca-cola`` matches a
+    search for ``coca-cola``) and additionally split on punctuation so that
+    ``cola`` also matches.
+    """
+
+    text = cstr(value).strip().lower()
+    if not text:
+        return set()
+
+    tokens = set(text.split())
+    for part in _NON_WORD.split(text):
+        if part:
+            tokens.add(part)
+    return tokens
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"${token}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _word_trigrams(word: str) -> Set[str]:
+    """Unpadded trigrams of ``word``; each is a padded trigram of any token containing it."""
+
+    return {word[i : i + 3] for i in range(len(word) - 2)}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Return True when ``a`` and ``b`` differ by one insertion, deletion,
+    substitution or transposition of adjacent characters."""
+
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    start = 0
+    while start < len(a) and a[start] == b[start]:
+        start += 1
+    if len(a) == len(b):
+        if a[start + 1 :] == b[start + 1 :]:
+            return True
+        return a[start + 2 :] == b[start + 2 :] and a[start : start + 2] == b[start : start + 2][::-1]
+    return a[start:] == b[start + 1 :]
+
+
+class ItemSearchIndex:
+    """Inverted token index answering multi-word item searches."""
+
+    def __init__(
+        self,
+        entries: Dict[str, Iterable[str]],
+        groups: Sequence[str] = (),
+        version: Optional[str] = None,
+        built_at: float = 0,
+        sequence: int = 0,
+    ) -> None:
+        self.entries: Dict[str, Set[str]] = {code: set(tokens) for code, tokens in entries.items()}
+        self.groups = tuple(groups or ())
+        self.version = version
+        self.built_at = built_at
+        self.sequence = sequence
+        self._postings: Dict[str, Set[str]] = {}
+        for code, tokens in self.entries.items():
+            for token in tokens:
+                self._postings.setdefault(token, set()).add(code)
+        self._tokens = sorted(self._postings)
+        # Token trigrams for substring and typo tolerant lookups, built on first use.
+        self._trigram_postings: Optional[Dict[str, Set[str]]] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def covers(self, item_groups: Optional[Sequence[str]]) -> bool:
+        """Return True when the index contains every item of ``item_groups``."""
+
+        if not self.groups:
+            return True
+        return bool(item_groups) and set(item_groups) <= set(self.groups)
+
+    def set_entry(self, item_code: str, tokens: Optional[Iterable[str]]) -> None:
+        """Replace the tokens of ``item_code``; ``None`` removes the item."""
+
+        for token in self.entries.pop(item_code, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(item_code)
+            if not postings:
+                del self._postings[token]
+                position = bisect_left(self._tokens, token)
+                if position < len(self._tokens) and self._tokens[position] == token:
+                    del self._tokens[position]
+                if self._trigram_postings is not None:
+                    for gram in _trigrams(token):
+                        self._trigram_postings.get(gram, set()).discard(token)
+
+        if not tokens:
+            return
+        self.entries[item_code] = set(tokens)
+        for token in self.entries[item_code]:
+            if token not in self._postings:
+                self._postings[token] = set()
+                insort(self._tokens, token)
+                if self._trigram_postings is not None:
+                    for gram in _trigrams(token):
+                        self._trigram_postings.setdefault(gram, set()).add(token)
+            self._postings[token].add(item_code)
+
+    def _prefix_tokens(self, word: str) -> Iterable[str]:
+        position = bisect_left(self._tokens, word)
+        while position < len(self._tokens) and self._tokens[position].startswith(word):
+            yield self._tokens[position]
+            position += 1
+
+    def _trigram_map(self) -> Dict[str, Set[str]]:
+        if self._trigram_postings is None:
+            self._trigram_postings = {}
+            for token in self._postings:
+                for gram in _trigrams(token):
+                    self._trigram_postings.setdefault(gram, set()).add(token)
+        return self._trigram_postings
+
+    def _substring_matches(self, word: str) -> Set[str]:
+        """Return the item codes having a token that contains ``word``."""
+
+        trigram_map = self._trigram_map()
+        candidates: Optional[Set[str]] = None
+        # Rarest trigrams first keep the candidate tokens few.
+        for gram in sorted(_word_trigrams(word), key=lambda gram: len(trigram_map.get(gram, ()))):
+            tokens = trigram_map.get(gram, set())
+            candidates = set(tokens) if candidates is None else candidates & tokens
+            if not candidates:
+                return set()
+
+        matches: Set[str] = set()
+        for token in candidates or ():
+            if word in token:
+                matches.update(self._postings[token])
+        return matches
+
+    def _fuzzy_tokens(self, word: str) -> Set[str]:
+        """Return the indexed tokens one edit away from ``word``."""
+
+        if len(word) < _MIN_FUZZY_LENGTH:
+            return set()
+        trigram_map = self._trigram_map()
+
+        grams = _trigrams(word)
+        # One edit changes at most three trigrams.
+        needed = max(len(grams) - 3, 1)
+        shared: Counter = Counter()
+        for gram in grams:
+            for token in trigram_map.get(gram, ()):
+                if abs(len(token) - len(word)) <= 1:
+                    shared[token] += 1
+        return {
+            token
+            for token, count in shared.items()
+            if count >= needed and token != word and _within_one_edit(word, token)
+        }
+
+    def _word_matches(self, word: str) -> Dict[str, int]:
+        """Return ``item_code -> best match kind`` of one search word."""
+
+        kinds: Dict[str, int] = {}
+        for token in self._fuzzy_tokens(word):
+            kinds.update(dict.fromkeys(self._postings[token], _FUZZY))
+        for token in self._prefix_tokens(word):
+            kind = _EXACT if token == word else _PREFIX
+            for code in self._postings[token]:
+                if kinds.get(code, -1) < kind:
+                    kinds[code] = kind
+        return kinds
+
+    def rank(self, words: Sequence[str], limit: int) -> List[str]:
+        """Return the ``limit`` best item codes matching every word.
+
+        Items rank by exact item code, then item code prefix, then items whose
+        words all match a token exactly or as a prefix, then items needing a
+        one-edit (typo) match; ties prefer more exact word matches.
+        """
+
+        words = list(dict.fromkeys(cstr(w).strip().lower() for w in words if w))
+        if not words:
+            return []
+
+        matched: Optional[Dict[str, List[int]]] = None
+        for word in sorted(words, key=len, reverse=True):
+            kinds = self._word_matches(word)
+            if matched is None:
+                matched = {code: [kind] for code, kind in kinds.items()}
+            else:
+                matched = {code: [*found, kinds[code]] for code, found in matched.items() if code in kinds}
+            if not matched:
+                return []
+
+        query = " ".join(words)
+
+        def order(code: str) -> Tuple[int, int, str]:
+            lowered = code.lower()
+            found = matched[code]
+            if lowered == query:
+                tier = 4
+            elif lowered.startswith(query):
+                tier = 3
+            elif min(found) > _FUZZY:
+                tier = 2
+            else:
+                tier = 1
+            return (-tier, -sum(found), code)
+
+        return heapq.nsmallest(limit, matched, key=order)
+
+    def search(self, words: Sequence[str]) -> Optional[Set[str]]:
+        """Return the item codes having a token that contains every word.
+
+        Like the word filter of ``get_items`` a word matches anywhere inside a
+        token. Words shorter than three characters are left to that filter,
+        so the result is a superset of what it accepts; ``None`` means no
+        word is long enough to narrow the search.
+        """
+
+        words = {cstr(w).strip().lower() for w in words if w}
+        words = {word for word in words if len(word) >= _MIN_SEARCH_LENGTH}
+        if not words:
+            return None
+
+        result: Optional[Set[str]] = None
+        # Longer words tend to be more selective, keep the running set small.
+        for word in sorted(words, key=len, reverse=True):
+            matches = self._substring_matches(word)
+            result = matches if result is None else result & matches
+            if not result:
+                return set()
+        return result
+
+
+def _chunks(values: Sequence[str], size: int = _CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield tuple(values[start : start + size])
+
+
+def _profile_groups(profile_name: str) -> List[str]:
+    return sorted(get_item_groups(profile_name) or [])
+
+
+def _collect_index_entries(item_filters: Dict[str, Any]) -> Dict[str, Set[str]]:
+    """Return ``item_code -> tokens`` for the sellable items matching ``item_filters``.
+
+    Tokens cover the values the ``get_items`` word filter checks: code, name,
+    brand, item group, barcodes, variant attributes and batch numbers. Serial
+    numbers are not indexed; they are found through the serial number lookup.
+    """
+
+    items = frappe.get_all(
+        "Item",
+        filters=item_filters,
+        fields=["name", "item_code", "item_name", "brand", "item_group", "has_batch_no"],
+        limit_page_length=0,
+    )
+
+    entries: Dict[str, Set[str]] = {}
+    batch_items: List[str] = []
+    for item in items:
+        tokens: Set[str] = set()
+        for value in (item.name, item.item_code, item.item_name, item.brand, item.item_group):
+            tokens.update(tokenize(value))
+        entries[item.name] = tokens
+        if item.has_batch_no:
+            batch_items.append(item.name)
+
+    codes = list(entries)
+    for chunk in _chunks(codes):
+        for row in _fetch_barcodes(chunk):
+            entries[row.parent].update(tokenize(row.barcode))
+
+        attributes = frappe.get_all(
+            "Item Variant Attribute",
+            fields=["parent", "attribute", "attribute_value"],
+            filters={"parent": ["in", chunk]},
+        )
+        for row in attributes:
+            entries[row.parent].update(tokenize(row.attribute))
+            entries[row.parent].update(tokenize(row.attribute_value))
+
+    for chunk in _chunks(batch_items):
+        for row in frappe.get_all(
+            "Batch", fields=["name", "item"], filters={"item": ["in", chunk], "disabled": 0}
+        ):
+            entries[row.item].update(tokenize(row.name))
+
+    return entries
+
+
+def _base_item_filters(groups: Sequence[str]) -> Dict[str, Any]:
+    filters: Dict[str, Any] = {"disabled": 0, "is_sales_item": 1, "is_fixed_asset": 0}
+    if groups:
+        filters["item_group"] = ["in", list(groups)]
+    return filters
+
+
+def build_profile_index(profile: str) -> Optional[ItemSearchIndex]:
+    """Build the search index for ``profile`` and publish it to redis."""
+
+    if not profile:
+        return None
+
+    groups = _profile_groups(profile)
+    sequence = current_sequence()
+    entries = _collect_index_entries(_base_item_filters(groups))
+    built_at = time.time()
+    version = f"{built_at:.6f}"
+
+    cache = frappe.cache()
+    cache.set_value(
+        f"{_INDEX_CACHE_KEY}|{profile}",
+        {
+            "version": version,
+            "built_at": built_at,
+            "sequence": sequence,
+            "groups": groups,
+            "entries": {code: sorted(tokens) for code, tokens in entries.items()},
+        },
+    )
+    cache.set_value(f"{_INDEX_VERSION_KEY}|{profile}", version)
+
+    index = ItemSearchIndex(entries, groups, version, built_at, sequence)
+    _local_indexes[(frappe.local.site, profile)] = index
+    return index
+
+
+def _enqueue_build(profile: str) -> None:
+    """Schedule a single background rebuild for ``profile``."""
+
+    try:
+        frappe.enqueue(
+            "posawesome.posawesome.api.item_search_index.build_profile_index",
+            queue="long",
+            job_id=f"posa_item_search_index::{frappe.local.site}::{profile}",
+            deduplicate=True,
+            profile=profile,
+        )
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "POS Awesome item search index")
+
+
+def get_profile_index(profile: str, refresh_seconds: Optional[int] = None) -> Optional[ItemSearchIndex]:
+    """Return the warm index for ``profile`` or ``None`` when it is cold.
+
+    A cold index schedules a background build so that subsequent searches can
+    use it. Stale indexes keep serving while a refresh is queued.
+    """
+
+    if not profile:
+        return None
+
+    cache = frappe.cache()
+    key = (frappe.local.site, profile)
+    version = cache.get_value(f"{_INDEX_VERSION_KEY}|{profile}")
+    if not version:
+        _local_indexes.pop(key, None)
+        _enqueue_build(profile)
+        return None
+
+    index = _local_indexes.get(key)
+    if not index or index.version != version:
+        payload = cache.get_value(f"{_INDEX_CACHE_KEY}|{profile}")
+        if not payload:
+            _enqueue_build(profile)
+            return None
+        index = ItemSearchIndex(
+            payload.get("entries") or {},
+            payload.get("groups") or (),
+            payload.get("version"),
+            payload.get("built_at") or 0,
+            payload.get("sequence") or 0,
+        )
+        _local_indexes[key] = index
+
+    _apply_item_changes(profile, index)
+
+    if time.time() - index.built_at > (refresh_seconds or _DEFAULT_REFRESH_SECONDS):
+        _enqueue_build(profile)
+
+    return index
+
+
+def _apply_item_changes(profile: str, index: ItemSearchIndex) -> None:
+    """Re-index the items whose master data, barcodes or batches changed since the build."""
+
+    latest = current_sequence()
+    if latest == index.sequence:
+        return
+
+    # ``None`` also covers a sequence that went backwards after a reset.
+    changes = changes_since(index.sequence, ("item", "barcode", "batch"))
+    if changes is None:
+        _enqueue_build(profile)
+        return
+
+    if changes:
+        codes = tuple(sorted(changes))
+        filters = _base_item_filters(index.groups)
+        filters["name"] = ["in", codes]
+        entries = _collect_index_entries(filters)
+        for code in codes:
+            index.set_entry(code, entries.get(code))
+    index.sequence = latest
+
+
+def search_item_codes(
+    profile: str,
+    search_words: Sequence[str],
+    item_groups: Optional[Sequence[str]] = None,
+    refresh_seconds: Optional[int] = None,
+) -> Optional[Set[str]]:
+    """Resolve ``search_words`` to item codes, or ``None`` to fall back to SQL."""
+
+    if not search_words:
+        return None
+
+    index = get_profile_index(profile, refresh_seconds)
+    if index is None or not index.covers(item_groups):
+        return None
+    return index.search(search_words)
+
+
+def rank_item_codes(
+    profile: str,
+    search_words: Sequence[str],
+    item_groups: Optional[Sequence[str]] = None,
+    limit: int = 500,
+    refresh_seconds: Optional[int] = None,
+) -> Optional[List[str]]:
+    """Return the best ``limit`` item codes for ``search_words`` in rank order.
+
+    Unlike :func:`search_item_codes` words may match with one typo. ``None``
+    means the index is cold and the caller should fall back to SQL.
+    """
+
+    if not search_words:
+        return None
+
+    index = get_profile_index(profile, refresh_seconds)
+    if index is None or not index.covers(item_groups):
+        return None
+    return index.rank(search_words, limit)
+
+
+def clear_profile_index(profile: Optional[str] = None) -> None:
+    """Drop the cached index for ``profile`` (or every profile)."""
+
+    cache = frappe.cache()
+    if profile:
+        cache.delete_value([f"{_INDEX_CACHE_KEY}|{profile}", f"{_INDEX_VERSION_KEY}|{profile}"])
+        _local_indexes.pop((frappe.local.site, profile), None)
+        return
+
+    cache.delete_keys(_INDEX_CACHE_KEY)
+    cache.delete_keys(_INDEX_VERSION_KEY)
+    _local_indexes.clear()
+
+
+__all__ = [
+    "RANKED_MODE",
+    "ItemSearchIndex",
+    "build_profile_index",
+    "clear_profile_index",
+    "get_profile_index",
+    "rank_item_codes",
+    "search_item_codes",
+    "tokenize",
+]
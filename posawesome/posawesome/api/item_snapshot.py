@@ -0,0 +1,165 @@
+"""Prebuilt per-profile catalogue snapshots shared by every terminal."""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import frappe
+from frappe.utils import cstr
+from werkzeug.wrappers import Response
+
+from .item_changes import current_sequence
+from .item_sync import DEFAULT_CHUNK_SIZE, fetch_catalogue_chunk
+from .items import _ensure_pos_profile
+
+_SNAPSHOT_KEY = "posa_catalogue_snapshot"
+_SNAPSHOT_META_KEY = "posa_catalogue_snapshot_meta"
+# Snapshots are served stale while a rebuild runs; terminals catch up on the
+# remaining edits through the item change feed from the snapshot sequence.
+_REBUILD_AFTER_SECONDS = 60 * 60
+
+
+def _columnar(fields: List[str], rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Return ``rows`` as one value array per field."""
+
+    return {field: [row.get(field) for row in rows] for field in fields}
+
+
+def build_catalogue_snapshot(profile: str) -> Optional[Dict[str, Any]]:
+    """Materialise the catalogue of ``profile`` and publish it to redis."""
+
+    if not profile:
+        return None
+
+    pos_profile, _profile_json = _ensure_pos_profile(profile)
+    sequence = current_sequence()
+    built_at = time.time()
+
+    fields: List[str] = []
+    rows: List[Dict[str, Any]] = []
+    after = None
+    while True:
+        chunk = fetch_catalogue_chunk(pos_profile, after, DEFAULT_CHUNK_SIZE)
+        fields = chunk["fields"]
+        rows.extend(chunk["rows"])
+        after = chunk["last_name"]
+        if not chunk["has_more"]:
+            break
+
+    payload = {
+        "profile": profile,
+        "sequence": sequence,
+        "built_at": built_at,
+        "count": len(rows),
+        "fields": fields,
+        "columns": _columnar(fields, rows),
+    }
+    blob = gzip.compress(json.dumps(payload, separators=(",", ":"), default=str).encode())
+    meta = {
+        "etag": hashlib.sha1(blob).hexdigest(),
+        "sequence": sequence,
+        "built_at": built_at,
+        "count": len(rows),
+        "size": len(blob),
+        "profile_modified": cstr(pos_profile.get("modified")),
+    }
+
+    cache = frappe.cache()
+    cache.set_value(f"{_SNAPSHOT_KEY}|{profile}", blob)
+    cache.set_value(f"{_SNAPSHOT_META_KEY}|{profile}", meta)
+    return meta
+
+
+def _enqueue_build(profile: str) -> None:
+    """Schedule a single background build for ``profile``."""
+
+    try:
+        frappe.enqueue(
+            "posawesome.posawesome.api.item_snapshot.build_catalogue_snapshot",
+            queue="long",
+            job_id=f"posa_catalogue_snapshot::{frappe.local.site}::{profile}",
+            deduplicate=True,
+            profile=profile,
+        )
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "POS Awesome catalogue snapshot")
+
+
+def _is_stale(meta: Dict[str, Any], pos_profile: Dict[str, Any]) -> bool:
+    if meta.get("profile_modified") != cstr(pos_profile.get("modified")):
+        return True
+    if time.time() - (meta.get("built_at") or 0) < _REBUILD_AFTER_SECONDS:
+        return False
+    return current_sequence() > (meta.get("sequence") or 0)
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = {value.strip().removeprefix("W/").strip('"') for value in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+@frappe.whitelist()
+def get_catalogue_snapshot(pos_profile):
+    """Serve the prebuilt catalogue snapshot of ``pos_profile``.
+
+    The body is gzip encoded JSON holding ``fields`` and one array per field in
+    ``columns``. Requests carrying a matching ``If-None-Match`` get a 304 and a
+    202 is returned while the first snapshot is being built. After loading a
+    snapshot terminals request the item change feed from its ``sequence``.
+    """
+
+    profile, _profile_json = _ensure_pos_profile(pos_profile)
+    name = profile.get("name")
+    cache = frappe.cache()
+
+    meta = cache.get_value(f"{_SNAPSHOT_META_KEY}|{name}")
+    blob = cache.get_value(f"{_SNAPSHOT_KEY}|{name}") if meta else None
+    if not meta or not blob:
+        _enqueue_build(name)
+        return Response(
+            json.dumps({"status": "building"}),
+            status=202,
+            mimetype="application/json",
+            headers={"Retry-After": "10"},
+        )
+
+    if _is_stale(meta, profile):
+        _enqueue_build(name)
+
+    etag = meta["etag"]
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": "private, no-cache",
+        "X-Snapshot-Sequence": cstr(meta.get("sequence")),
+    }
+
+    request_etag = frappe.request.headers.get("If-None-Match") if frappe.request else None
+    if _etag_matches(request_etag, etag):
+        return Response(status=304, headers=headers)
+
+    headers["Content-Encoding"] = "gzip"
+    return Response(blob, status=200, mimetype="application/json", headers=headers)
+
+
+def clear_catalogue_snapshot(profile: Optional[str] = None) -> None:
+    """Drop the snapshot of ``profile`` (or every profile)."""
+
+    cache = frappe.cache()
+    if profile:
+        cache.delete_value([f"{_SNAPSHOT_KEY}|{profile}", f"{_SNAPSHOT_META_KEY}|{profile}"])
+        return
+
+    cache.delete_keys(_SNAPSHOT_KEY)
+
+
+__all__ = [
+    "build_catalogue_snapshot",
+    "clear_catalogue_snapshot",
+    "get_catalogue_snapshot",
+]
@@ -0,0 +1,306 @@
+"""Catalogue synchronisation endpoints used to bootstrap offline terminals."""
+
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Dict, List, Optional
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now_datetime
+from werkzeug.wrappers import Response
+
+from .item_changes import changes_since, current_sequence
+from .item_fetchers import ItemDetailAggregator
+from .items import (
+    SearchPlan,
+    _attach_stock_codes,
+    _build_search_plan,
+    _ensure_pos_profile,
+    _is_sellable,
+    _load_item_attributes,
+    _prepare_item_groups,
+    _shape_item_row,
+)
+
+DEFAULT_CHUNK_SIZE = 2000
+MAX_CHUNK_SIZE = 5000
+# Larger deltas are cheaper to replace with a fresh bootstrap.
+MAX_DELTA_ITEMS = 20000
+DELTA_CHUNK_SIZE = 1000
+
+# Columns appended to the Item fields for every synced row.
+DETAIL_FIELDS = [
+    "item_uoms",
+    "item_barcode",
+    "actual_qty",
+    "batch_no_data",
+    "serial_no_data",
+    "rate",
+    "price_list_rate",
+    "currency",
+    "price_list_currency",
+    "plc_conversion_rate",
+    "conversion_rate",
+    "attributes",
+    "item_attributes",
+]
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Return an opaque, url safe cursor for ``state``."""
+
+    raw = json.dumps(state, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Dict[str, Any]:
+    """Decode a cursor produced by :func:`encode_cursor`."""
+
+    if not cursor:
+        return {}
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        frappe.throw(_("Invalid sync cursor"))
+    if not isinstance(state, dict):
+        frappe.throw(_("Invalid sync cursor"))
+    return state
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def _catalogue_plan(
+    pos_profile: Dict[str, Any], include_description: bool, include_image: bool
+) -> SearchPlan:
+    """Return the search plan selecting the whole catalogue of ``pos_profile``."""
+
+    groups_ctx = _prepare_item_groups(pos_profile.get("name"), None)
+    plan = _build_search_plan(
+        pos_profile,
+        "",
+        "",
+        None,
+        None,
+        None,
+        None,
+        include_description,
+        include_image,
+        groups_ctx.groups,
+    )
+    return _attach_stock_codes(pos_profile, plan)
+
+
+def _shape_rows(
+    pos_profile: Dict[str, Any],
+    items: List[Dict[str, Any]],
+    plan: SearchPlan,
+    price_list: Optional[str] = None,
+    customer: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Merge ``items`` with their aggregated details in a single pass."""
+
+    items = [item for item in items if _is_sellable(item, plan)]
+    if not items:
+        return []
+
+    aggregator = ItemDetailAggregator(pos_profile, price_list=price_list, customer=customer)
+    detail_map = {d["item_code"]: d for d in aggregator.build_details(items)}
+
+    attribute_map = _load_item_attributes(items, plan)
+
+    rows: List[Dict[str, Any]] = []
+    for item in items:
+        row = _shape_item_row(dict(item), detail_map.get(item.get("item_code"), {}), plan, attribute_map)
+        if row:
+            rows.append(row)
+    return rows
+
+
+def fetch_catalogue_chunk(
+    pos_profile: Dict[str, Any],
+    after: Optional[str],
+    chunk_size: int,
+    price_list: Optional[str] = None,
+    customer: Optional[str] = None,
+    include_description: bool = False,
+    include_image: bool = False,
+) -> Dict[str, Any]:
+    """Return the next ``chunk_size`` catalogue rows ordered by item ``name``."""
+
+    plan = _catalogue_plan(pos_profile, include_description, include_image)
+    filters = dict(plan.filters)
+    if after:
+        filters["name"] = [">", after]
+
+    # Fetch one extra row to learn whether another chunk follows.
+    items = frappe.get_all(
+        "Item",
+        filters=filters,
+        fields=plan.fields,
+        order_by="name asc",
+        limit_page_length=chunk_size + 1,
+    )
+    has_more = len(items) > chunk_size
+    items = items[:chunk_size]
+
+    return {
+        "fields": [*plan.fields, *DETAIL_FIELDS],
+        "rows": _shape_rows(pos_profile, items, plan, price_list, customer),
+        "last_name": items[-1].name if items else after,
+        "has_more": has_more,
+    }
+
+
+def fetch_changed_items(
+    pos_profile: Dict[str, Any],
+    since: int,
+    price_list: Optional[str] = None,
+    customer: Optional[str] = None,
+    include_description: bool = False,
+    include_image: bool = False,
+) -> Dict[str, Any]:
+    """Return the catalogue rows changed after sync token ``since``.
+
+    ``removed`` lists changed item codes that no longer belong to the profile
+    catalogue (disabled, moved to another group or out of stock when only
+    stocked items are displayed). ``full_reload`` is set when the change
+    history does not cover ``since`` or holds too many changes.
+    """
+
+    # Read the token first: changes recorded meanwhile are sent again next time.
+    sequence = current_sequence()
+    result: Dict[str, Any] = {
+        "sequence": sequence,
+        "full_reload": False,
+        "items": [],
+        "removed": [],
+        "changes": {},
+    }
+    if since == sequence:
+        return result
+    # A token ahead of the sequence predates a reset of the change counter.
+    if since > sequence:
+        result["full_reload"] = True
+        return result
+
+    changes = changes_since(since)
+    if changes is None or len(changes) > MAX_DELTA_ITEMS:
+        result["full_reload"] = True
+        return result
+
+    plan = _catalogue_plan(pos_profile, include_description, include_image)
+    codes = sorted(changes)
+    rows: List[Dict[str, Any]] = []
+    for start in range(0, len(codes), DELTA_CHUNK_SIZE):
+        filters = dict(plan.filters)
+        filters["name"] = ["in", codes[start : start + DELTA_CHUNK_SIZE]]
+        items = frappe.get_all("Item", filters=filters, fields=plan.fields, order_by="name asc")
+        rows.extend(_shape_rows(pos_profile, items, plan, price_list, customer))
+
+    present = {row.get("item_code") for row in rows}
+    result["items"] = rows
+    result["removed"] = [code for code in codes if code not in present]
+    result["changes"] = {code: sorted(domains) for code, domains in changes.items()}
+    return result
+
+
+@frappe.whitelist()
+def sync_items(
+    pos_profile,
+    cursor=None,
+    chunk_size=None,
+    price_list=None,
+    customer=None,
+    include_description=False,
+    include_image=False,
+):
+    """Stream one chunk of the profile catalogue as newline delimited JSON.
+
+    The first line is a header with the column ``fields``, the ``cursor`` to
+    request the next chunk with, ``done`` once the catalogue is exhausted and
+    the ``snapshot``/``sequence`` taken when the sync started. Every following
+    line is one item encoded as an array in ``fields`` order. Terminals pass
+    ``sequence`` to the change feed afterwards to catch up on edits made while
+    the bootstrap was running.
+    """
+
+    state = decode_cursor(cursor)
+    profile, _profile_json = _ensure_pos_profile(pos_profile)
+    if state.get("profile") and state.get("profile") != profile.get("name"):
+        frappe.throw(_("Sync cursor belongs to a different POS Profile"))
+
+    if not state:
+        state = {
+            "profile": profile.get("name"),
+            "after": None,
+            "snapshot": now_datetime(),
+            "sequence": current_sequence(),
+        }
+
+    size = min(cint(chunk_size) or DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE)
+    chunk = fetch_catalogue_chunk(
+        profile,
+        state.get("after"),
+        size,
+        price_list=price_list,
+        customer=customer,
+        include_description=cint(include_description),
+        include_image=cint(include_image),
+    )
+
+    state["after"] = chunk["last_name"]
+    header = {
+        "fields": chunk["fields"],
+        "count": len(chunk["rows"]),
+        "done": not chunk["has_more"],
+        "cursor": encode_cursor(state) if chunk["has_more"] else None,
+        "snapshot": state["snapshot"],
+        "sequence": state["sequence"],
+    }
+
+    lines = [_dumps(header)]
+    for row in chunk["rows"]:
+        lines.append(_dumps([row.get(field) for field in chunk["fields"]]))
+
+    return Response("\n".join(lines) + "\n", mimetype="application/x-ndjson")
+
+
+@frappe.whitelist()
+def get_item_changes(
+    pos_profile,
+    since=None,
+    price_list=None,
+    customer=None,
+    include_description=False,
+    include_image=False,
+):
+    """Return the items changed since sync token ``since``.
+
+    The token is the ``sequence`` returned by :func:`sync_items` or by a
+    previous call; store the returned ``sequence`` for the next request. Price,
+    stock, barcode, UOM and batch edits are reported even when they leave
+    ``Item.modified`` untouched.
+    """
+
+    profile, _profile_json = _ensure_pos_profile(pos_profile)
+    if since in (None, ""):
+        return {
+            "sequence": current_sequence(),
+            "full_reload": True,
+            "items": [],
+            "removed": [],
+            "changes": {},
+        }
+
+    return fetch_changed_items(
+        profile,
+        cint(since),
+        price_list=price_list,
+        customer=customer,
+        include_description=cint(include_description),
+        include_image=cint(include_image),
+    )
@@ -3,8 +3,8 @@
 
 import json
 import re
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, replace
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
 
 import frappe
 from erpnext.stock.doctype.batch.batch import (
@@ -15,9 +15,18 @@ from erpnext.stock.get_item_details import get_item_details
 from frappe import _, as_json
 from frappe.utils import cint, cstr, flt, get_datetime, nowdate
 from frappe.utils.background_jobs import enqueue
-from frappe.utils.caching import redis_cache
-
-from .item_fetchers import ItemDetailAggregator
+from frappe.utils.data import make_filter_tuple
+
+from .barcode_map import entry_rate, lookup_barcode, lookup_barcodes
+from .item_cache import single_flight
+from .item_changes import DOMAINS as ITEM_CHANGE_DOMAINS
+from .item_changes import changed_item_codes, current_sequence
+from .item_fetchers import ItemDetailAggregator, get_in_stock_item_codes, in_stock_condition
+from .item_fulltext import FULLTEXT_MODE, fulltext_item_codes
+from .item_search_index import RANKED_MODE, rank_item_codes, search_item_codes
+from .profile_context import get_profile_context, profile_flag
+from .scale_barcode import get_scale_barcode_parser
+from .stock_snapshot import get_stock_quantities
 from .utils import (
     HAS_VARIANTS_EXCLUSION,
     expand_item_groups,
@@ -31,7 +40,6 @@ class ProfileContext:
     """Container describing the active POS profile and caching metadata."""
 
     pos_profile: Dict[str, Any]
-    pos_profile_json: str
     use_price_list_cache: bool
     profile_name: str
     warehouse: Optional[str]
@@ -66,6 +74,27 @@ class SearchPlan:
     include_image: bool
     posa_display_items_in_stock: bool
     posa_show_template_items: bool
+    in_stock_codes: Optional[FrozenSet[str]] = None
+    # Item codes in relevance order when the search was ranked.
+    rank: Optional[Tuple[str, ...]] = None
+    # Item the search value resolved to through a serial, batch or barcode lookup.
+    resolved_item_code: Optional[str] = None
+    # SQL condition restricting the Item query to in-stock items.
+    stock_condition: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class ItemAttributeMap:
+    """Attributes of the templates and variants on one result page."""
+
+    templates: Dict[str, List[Dict[str, Any]]]
+    variants: Dict[str, List[Dict[str, Any]]]
+
+
+# Worker-local template attributes keyed by (site, template) and stamped with
+# the change sequence they were read at. Templates are re-read after an edit.
+_template_attribute_cache: Dict[Tuple[str, str], Tuple[int, List[Dict[str, Any]]]] = {}
+_MAX_CACHED_TEMPLATES = 10000
 
 
 def normalize_brand(brand: str) -> str:
@@ -73,6 +102,12 @@ def normalize_brand(brand: str) -> str:
     return cstr(brand).strip().lower()
 
 
+def _is_profile_reference(value: Dict[str, Any]) -> bool:
+    """Return whether ``value`` only names a profile (``{"name", "version"}``)."""
+
+    return bool(value.get("name")) and set(value) <= {"name", "version"}
+
+
 def _ensure_pos_profile(pos_profile):
     """Return a ``(profile_dict, profile_json)`` tuple for the given input.
 
@@ -80,14 +115,18 @@ def _ensure_pos_profile(pos_profile):
     a bare profile name or even ``None`` (when the frontend has not yet loaded
     the active profile). This helper normalises those inputs so downstream code
     can rely on a fully populated dictionary and a JSON serialised
-    representation of the same profile. If no valid profile can be resolved a
-    user-facing validation error is raised.
+    representation of the same profile. Profile names and ``{"name",
+    "version"}`` references resolve through the cached profile context. If no
+    valid profile can be resolved a user-facing validation error is raised.
     """
 
     profile_dict = None
     profile_json = None
 
-    if isinstance(pos_profile, dict):
+    if isinstance(pos_profile, dict) and _is_profile_reference(pos_profile):
+        context = get_profile_context(pos_profile["name"])
+        return context.as_dict(), context.profile_json
+    elif isinstance(pos_profile, dict):
         profile_dict = pos_profile
         profile_json = as_json(pos_profile)
     elif isinstance(pos_profile, str):
@@ -98,13 +137,15 @@ def _ensure_pos_profile(pos_profile):
             except Exception:
                 decoded_value = raw_value
 
-            if isinstance(decoded_value, dict):
+            if isinstance(decoded_value, dict) and not _is_profile_reference(decoded_value):
                 profile_dict = decoded_value
                 profile_json = raw_value
+            elif isinstance(decoded_value, dict):
+                return _ensure_pos_profile(decoded_value)
             elif isinstance(decoded_value, str):
                 if decoded_value:
-                    profile_doc = frappe.get_doc("POS Profile", decoded_value)
-                    profile_dict = profile_doc.as_dict()
+                    context = get_profile_context(decoded_value)
+                    return context.as_dict(), context.profile_json
                 else:
                     profile_dict = get_active_pos_profile()
             elif decoded_value is None:
@@ -131,21 +172,10 @@ def get_stock_availability(item_code, warehouse):
     to provide an accurate availability figure.
     """
 
-    if not warehouse:
+    if not warehouse or not item_code:
         return 0.0
 
-    warehouses = [warehouse]
-    if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-        # Include all child warehouses when a group warehouse is set
-        warehouses = frappe.db.get_descendants("Warehouse", warehouse) or []
-
-    rows = frappe.get_all(
-        "Bin",
-        fields=["sum(actual_qty) as actual_qty"],
-        filters={"item_code": item_code, "warehouse": ["in", warehouses]},
-    )
-
-    return flt(rows[0].actual_qty) if rows else 0.0
+    return get_stock_quantities(warehouse, [item_code])[item_code]["actual_qty"]
 
 
 @frappe.whitelist()
@@ -163,20 +193,27 @@ def get_available_qty(items):
 
     if isinstance(items, str):
         items = json.loads(items)
+    items = [it for it in items or [] if it.get("item_code") and it.get("warehouse")]
+
+    # Rows without a batch are resolved with one grouped query per warehouse.
+    codes_by_warehouse: Dict[str, List[str]] = {}
+    for it in items:
+        if not it.get("batch_no"):
+            codes_by_warehouse.setdefault(it.get("warehouse"), []).append(it.get("item_code"))
+    stock_by_warehouse = {
+        warehouse: get_stock_quantities(warehouse, codes) for warehouse, codes in codes_by_warehouse.items()
+    }
 
     result = []
-    for it in items or []:
+    for it in items:
         item_code = it.get("item_code")
         warehouse = it.get("warehouse")
         batch_no = it.get("batch_no")
 
-        if not item_code or not warehouse:
-            continue
-
         if batch_no:
             available_qty = get_batch_qty(batch_no, warehouse) or 0
         else:
-            available_qty = get_stock_availability(item_code, warehouse)
+            available_qty = stock_by_warehouse[warehouse][item_code]["actual_qty"]
 
         result.append(
             {
@@ -207,8 +244,8 @@ def get_items(
     profile_ctx = _normalize_profile_context(pos_profile)
     groups_ctx = _prepare_item_groups(profile_ctx.profile_name, item_groups)
 
-    @redis_cache(ttl=profile_ctx.cache_ttl or 300)
-    def __get_items(
+    @single_flight(ttl=profile_ctx.cache_ttl or 300)
+    def __get_stamped_items(
         _pos_profile_name,
         _warehouse,
         price_list,
@@ -223,8 +260,9 @@ def get_items(
         include_image,
         item_groups_tuple,
     ):
-        return _execute_item_search(
-            profile_ctx.pos_profile_json,
+        sequence = current_sequence()
+        return sequence, _execute_item_search(
+            profile_ctx.pos_profile,
             price_list,
             item_group,
             search_value,
@@ -239,7 +277,7 @@ def get_items(
         )
 
     if profile_ctx.use_price_list_cache:
-        return __get_items(
+        sequence, items = __get_stamped_items(
             profile_ctx.profile_name,
             profile_ctx.warehouse,
             price_list,
@@ -254,9 +292,10 @@ def get_items(
             include_image,
             groups_ctx.groups_tuple,
         )
+        return _refresh_changed_rows(items, sequence, profile_ctx.pos_profile, price_list, customer)
 
     return _execute_item_search(
-        profile_ctx.pos_profile_json,
+        profile_ctx.pos_profile,
         price_list,
         item_group,
         search_value,
@@ -271,10 +310,72 @@ def get_items(
     )
 
 
+_REFRESHABLE_ITEM_FIELDS = [
+    "item_name",
+    "stock_uom",
+    "is_stock_item",
+    "item_group",
+    "has_batch_no",
+    "has_serial_no",
+    "max_discount",
+    "brand",
+]
+
+
+def _refresh_changed_rows(
+    rows: List[Dict[str, Any]],
+    sequence: int,
+    pos_profile: Dict[str, Any],
+    price_list: Optional[str],
+    customer: Optional[str],
+) -> List[Dict[str, Any]]:
+    """Refresh cached ``get_items`` rows whose item data changed after ``sequence``."""
+
+    changed = changed_item_codes((row.get("item_code") for row in rows), sequence, ITEM_CHANGE_DOMAINS)
+    if not changed:
+        return rows
+
+    items = {
+        item.name: item
+        for item in frappe.get_all(
+            "Item",
+            filters={"name": ["in", list(changed)]},
+            fields=["name", "disabled", "is_sales_item", *_REFRESHABLE_ITEM_FIELDS],
+        )
+    }
+    aggregator = ItemDetailAggregator(
+        pos_profile,
+        price_list=price_list or pos_profile.get("selling_price_list"),
+        customer=customer,
+    )
+    details = aggregator.build_details([row for row in rows if row.get("item_code") in changed])
+    detail_map = {d["item_code"]: d for d in details}
+    in_stock_only = pos_profile.get("posa_display_items_in_stock")
+
+    result = []
+    for row in rows:
+        item_code = row.get("item_code")
+        if item_code not in changed:
+            result.append(row)
+            continue
+
+        item = items.get(item_code)
+        if not item or item.disabled or not item.is_sales_item:
+            continue
+
+        row = dict(row)
+        row.update({field: item.get(field) for field in _REFRESHABLE_ITEM_FIELDS if field in row})
+        row.update(detail_map.get(item_code, {}))
+        if in_stock_only and not row.get("has_variants") and flt(row.get("actual_qty")) <= 0:
+            continue
+        result.append(row)
+    return result
+
+
 def _normalize_profile_context(pos_profile) -> ProfileContext:
     """Return the active profile metadata required by :func:`get_items`."""
 
-    profile_dict, profile_json = _ensure_pos_profile(pos_profile)
+    profile_dict, _ = _ensure_pos_profile(pos_profile)
     ttl = profile_dict.get("posa_server_cache_duration")
     try:
         ttl = int(ttl) * 60 if ttl else None
@@ -283,7 +384,6 @@ def _normalize_profile_context(pos_profile) -> ProfileContext:
 
     return ProfileContext(
         pos_profile=profile_dict,
-        pos_profile_json=profile_json,
         use_price_list_cache=bool(profile_dict.get("posa_use_server_cache")),
         profile_name=profile_dict.get("name"),
         warehouse=profile_dict.get("warehouse"),
@@ -362,6 +462,7 @@ def _build_search_plan(
 
     or_filters: List[Any] = []
     item_code_for_search: Optional[str] = None
+    resolved_item_code: Optional[str] = None
     search_words: List[str] = []
     normalized_search_value = ""
     longest_search_token = ""
@@ -473,6 +574,7 @@ def _build_search_plan(
         include_image=include_image,
         posa_display_items_in_stock=bool(posa_display_items_in_stock),
         posa_show_template_items=bool(posa_show_template_items),
+        resolved_item_code=resolved_item_code,
     )
 
 
@@ -543,10 +645,95 @@ def _matches_search_words(row: Dict[str, Any], search_words: Sequence[str], word
     return True
 
 
+def _get_template_attributes(templates: Sequence[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Return the ``Item Attribute`` rows of every template, cached per worker."""
+
+    site = frappe.local.site
+    result: Dict[str, List[Dict[str, Any]]] = {}
+    cached = {}
+    for template in templates:
+        entry = _template_attribute_cache.get((site, template))
+        if entry:
+            cached[template] = entry
+
+    stale = set(templates) - set(cached)
+    if cached:
+        since = min(sequence for sequence, _attrs in cached.values())
+        stale |= changed_item_codes(cached, since, ("item",))
+    for template, (_sequence, attributes) in cached.items():
+        if template not in stale:
+            result[template] = attributes
+
+    if not stale:
+        return result
+
+    # Read the sequence first so edits made meanwhile invalidate these rows.
+    sequence = current_sequence()
+    rows = frappe.get_all(
+        "Item Variant Attribute",
+        fields=["parent", "attribute"],
+        filters={"parent": ["in", sorted(stale)]},
+        order_by="idx asc",
+    )
+    names = {row.attribute for row in rows}
+    meta = {}
+    if names:
+        meta = {
+            attr.name: attr
+            for attr in frappe.get_all(
+                "Item Attribute",
+                fields=["name", "attribute_name"],
+                filters={"name": ["in", sorted(names)]},
+            )
+        }
+
+    per_template: Dict[str, Dict[str, Dict[str, Any]]] = {template: {} for template in stale}
+    for row in rows:
+        attr = meta.get(row.attribute)
+        if attr:
+            per_template[row.parent].setdefault(attr.name, attr)
+
+    if len(_template_attribute_cache) > _MAX_CACHED_TEMPLATES:
+        _template_attribute_cache.clear()
+    for template, attrs in per_template.items():
+        attributes = list(attrs.values())
+        _template_attribute_cache[(site, template)] = (sequence, attributes)
+        result[template] = attributes
+    return result
+
+
+def _load_item_attributes(items: Sequence[Dict[str, Any]], plan: SearchPlan) -> ItemAttributeMap:
+    """Fetch template and variant attributes for a whole page of items."""
+
+    if not plan.posa_show_template_items:
+        return ItemAttributeMap(templates={}, variants={})
+
+    templates = sorted({item.get("name") for item in items if item.get("has_variants")})
+    variants = sorted({item.get("name") for item in items if item.get("variant_of")})
+
+    variant_attributes: Dict[str, List[Dict[str, Any]]] = {}
+    if variants:
+        for row in frappe.get_all(
+            "Item Variant Attribute",
+            fields=["parent", "attribute", "attribute_value"],
+            filters={"parent": ["in", variants], "parentfield": "attributes"},
+            order_by="idx asc",
+        ):
+            variant_attributes.setdefault(row.parent, []).append(
+                {"attribute": row.attribute, "attribute_value": row.attribute_value}
+            )
+
+    return ItemAttributeMap(
+        templates=_get_template_attributes(templates) if templates else {},
+        variants=variant_attributes,
+    )
+
+
 def _shape_item_row(
     item: Dict[str, Any],
     detail: Dict[str, Any],
     plan: SearchPlan,
+    attribute_map: Optional[ItemAttributeMap] = None,
 ) -> Optional[Dict[str, Any]]:
     """Merge item and detail data while respecting stock and template settings."""
 
@@ -554,17 +741,16 @@ def _shape_item_row(
     if not item_code:
         return None
 
-    attributes = ""
+    if attribute_map is None and plan.posa_show_template_items:
+        attribute_map = _load_item_attributes([item], plan)
+
+    attributes: Any = ""
     if plan.posa_show_template_items and item.get("has_variants"):
-        attributes = get_item_attributes(item.get("name"))
+        attributes = attribute_map.templates.get(item.get("name"), [])
 
     item_attributes: Any = ""
     if plan.posa_show_template_items and item.get("variant_of"):
-        item_attributes = frappe.get_all(
-            "Item Variant Attribute",
-            fields=["attribute", "attribute_value"],
-            filters={"parent": item.get("name"), "parentfield": "attributes"},
-        )
+        item_attributes = attribute_map.variants.get(item.get("name"), [])
 
     if (
         plan.posa_display_items_in_stock
@@ -590,11 +776,12 @@ def _run_item_query(
 
     result: List[Dict[str, Any]] = []
     page_start = plan.initial_page_start
+    filters = _item_query_filters(plan)
 
     while True:
         items_data = frappe.get_all(
             "Item",
-            filters=plan.filters,
+            filters=filters,
             or_filters=plan.or_filters or None,
             fields=plan.fields,
             limit_start=page_start,
@@ -605,7 +792,7 @@ def _run_item_query(
         if not items_data and plan.item_code_for_search and page_start == plan.initial_page_start:
             items_data = frappe.get_all(
                 "Item",
-                filters=plan.filters,
+                filters=filters,
                 or_filters=[
                     ["name", "like", f"%{plan.item_code_for_search}%"],
                     ["item_name", "like", f"%{plan.item_code_for_search}%"],
@@ -620,17 +807,16 @@ def _run_item_query(
         if not items_data:
             break
 
-        details = get_items_details(
-            json.dumps(pos_profile),
-            json.dumps(items_data),
-            price_list=price_list,
-            customer=customer,
-        )
+        fetched = len(items_data)
+        items_data = [item for item in items_data if _is_sellable(item, plan)]
+
+        details = _build_items_details(pos_profile, items_data, price_list, customer)
         detail_map = {d["item_code"]: d for d in details}
+        attribute_map = _load_item_attributes(items_data, plan)
 
         for item in items_data:
             detail = detail_map.get(item.get("item_code"), {})
-            row = _shape_item_row(dict(item), detail, plan)
+            row = _shape_item_row(dict(item), detail, plan, attribute_map)
             if not row:
                 continue
             if not _matches_search_words(row, plan.search_words, plan.word_filter_active):
@@ -642,15 +828,19 @@ def _run_item_query(
         if plan.limit_page_length and len(result) >= plan.limit_page_length:
             break
 
-        page_start += len(items_data)
-        if len(items_data) < plan.page_size:
+        page_start += fetched
+        if fetched < plan.page_size:
             break
 
+    if plan.rank:
+        position = {code: index for index, code in enumerate(plan.rank)}
+        result.sort(key=lambda row: position.get(row.get("item_code"), len(position)))
+
     return result[: plan.limit_page_length] if plan.limit_page_length else result
 
 
 def _execute_item_search(
-    pos_profile_json: str,
+    pos_profile: Dict[str, Any],
     price_list: Optional[str],
     item_group: str,
     search_value: str,
@@ -665,8 +855,6 @@ def _execute_item_search(
 ) -> List[Dict[str, Any]]:
     """Orchestrate the helpers responsible for executing the search query."""
 
-    pos_profile = json.loads(pos_profile_json)
-
     if not price_list:
         price_list = pos_profile.get("selling_price_list")
 
@@ -683,9 +871,153 @@ def _execute_item_search(
         item_groups,
     )
 
+    plan = _apply_ranked_search(pos_profile, plan, item_groups)
+    if plan is not None and plan.rank is None:
+        plan = _apply_search_index(pos_profile, plan, item_groups)
+    if plan is None:
+        return []
+
+    plan = _apply_stock_filter(pos_profile, plan)
+    if plan is None:
+        return []
+
     return _run_item_query(pos_profile, price_list, customer, plan)
 
 
+# Above this many candidates the ``IN`` list costs more than the LIKE scan.
+_MAX_INDEX_CANDIDATES = 5000
+
+
+def _apply_search_index(
+    pos_profile: Dict[str, Any],
+    plan: SearchPlan,
+    item_groups: Optional[Sequence[str]],
+) -> SearchPlan:
+    """Narrow ``plan`` to the item codes resolved by the in-memory search index.
+
+    The index only narrows the query when it covers every value the word
+    filter checks. The plan is returned unchanged, and the SQL path answers,
+    when the index is cold, finds nothing, descriptions are searched or the
+    search value resolved to an item through a serial, batch or barcode lookup.
+    """
+
+    if not plan.word_filter_active or "item_code" in plan.filters:
+        return plan
+    if plan.include_description or plan.resolved_item_code:
+        return plan
+
+    codes = search_item_codes(pos_profile.get("name"), plan.search_words, item_groups)
+    if not codes or len(codes) > _MAX_INDEX_CANDIDATES:
+        return plan
+
+    filters = dict(plan.filters)
+    filters["name"] = ["in", sorted(codes)]
+    return replace(plan, filters=filters, or_filters=[], item_code_for_search=None)
+
+
+# Ranked results are ordered in memory, so only the top results are read.
+_MAX_RANKED_RESULTS = 500
+
+
+def _apply_ranked_search(
+    pos_profile: Dict[str, Any],
+    plan: SearchPlan,
+    item_groups: Optional[Sequence[str]],
+) -> Optional[SearchPlan]:
+    """Narrow ``plan`` to the best results of the profile's ranked search mode.
+
+    ``Full Text`` ranks ``MATCH ... AGAINST`` results of the full-text index,
+    ``Ranked`` ranks the in-memory search index and tolerates one typo per
+    word. The plan is returned unchanged (standard search) when the ranked
+    search cannot answer (no word long enough for the full-text index, cold
+    index), when nothing matches (item codes are not in the full-text index),
+    when the search value resolved to an item through a serial, batch or
+    barcode lookup and for keyset paged requests, which are ordered by item
+    name. ``None`` means the requested offset is past the last result.
+    """
+
+    mode = pos_profile.get("posa_item_search_mode")
+    if mode not in (FULLTEXT_MODE, RANKED_MODE):
+        return plan
+    if not plan.word_filter_active or "item_code" in plan.filters or "item_name" in plan.filters:
+        return plan
+    # The standard query keeps the lookup's item among the results.
+    if plan.resolved_item_code:
+        return plan
+
+    limit = plan.limit_page_length or _MAX_RANKED_RESULTS
+    offset = plan.limit_start or 0
+    if mode == FULLTEXT_MODE:
+        codes = fulltext_item_codes(plan.search_words, item_groups, offset + limit)
+    else:
+        codes = rank_item_codes(pos_profile.get("name"), plan.search_words, item_groups, offset + limit)
+    if not codes:
+        return plan
+    codes = codes[offset : offset + limit]
+    if not codes:
+        return None
+
+    filters = dict(plan.filters)
+    filters["name"] = ["in", codes]
+    return replace(
+        plan,
+        filters=filters,
+        or_filters=[],
+        item_code_for_search=None,
+        limit_start=None,
+        initial_page_start=0,
+        page_size=len(codes),
+        # Typo matches would fail the substring word filter.
+        word_filter_active=plan.word_filter_active and mode == FULLTEXT_MODE,
+        rank=tuple(codes),
+    )
+
+
+def _attach_stock_codes(pos_profile: Dict[str, Any], plan: SearchPlan) -> SearchPlan:
+    """Attach the in-stock item codes when only stocked items are displayed."""
+
+    if not plan.posa_display_items_in_stock:
+        return plan
+    codes = get_in_stock_item_codes(pos_profile.get("warehouse"))
+    if codes is None:
+        return plan
+    return replace(plan, in_stock_codes=codes)
+
+
+def _is_sellable(item: Dict[str, Any], plan: SearchPlan) -> bool:
+    """Return False for items known to be out of stock; templates always pass."""
+
+    if plan.in_stock_codes is None or item.get("has_variants"):
+        return True
+    return item.get("name") in plan.in_stock_codes
+
+
+def _apply_stock_filter(pos_profile: Dict[str, Any], plan: SearchPlan) -> Optional[SearchPlan]:
+    """Restrict the Item query to in-stock items before details are built.
+
+    Returns ``None`` when no item can be in stock.
+    """
+
+    plan = _attach_stock_codes(pos_profile, plan)
+    if plan.in_stock_codes is None:
+        return plan
+    if not plan.in_stock_codes and not plan.posa_show_template_items:
+        return None
+
+    condition = in_stock_condition(pos_profile.get("warehouse"), plan.posa_show_template_items)
+    return replace(plan, stock_condition=condition)
+
+
+def _item_query_filters(plan: SearchPlan) -> Any:
+    """Return the Item query filters of ``plan`` with its stock condition."""
+
+    if not plan.stock_condition:
+        return plan.filters
+    filters: List[Any] = [make_filter_tuple("Item", key, value) for key, value in plan.filters.items()]
+    filters.append(plan.stock_condition)
+    return filters
+
+
 @frappe.whitelist()
 def get_items_groups():
     return frappe.db.sql(
@@ -714,7 +1046,7 @@ def get_items_count(pos_profile, item_groups=None):
 @frappe.whitelist()
 def get_item_variants(pos_profile, parent_item_code, price_list=None, customer=None):
     """Return variants of an item along with attribute metadata."""
-    pos_profile, pos_profile_json = _ensure_pos_profile(pos_profile)
+    pos_profile, _ = _ensure_pos_profile(pos_profile)
     price_list = price_list or pos_profile.get("selling_price_list")
 
     fields = [
@@ -744,12 +1076,7 @@ def get_item_variants(pos_profile, parent_item_code, price_list=None, customer=N
     if not items_data:
         return {"variants": [], "attributes_meta": {}}
 
-    details = get_items_details(
-        pos_profile_json,
-        json.dumps(items_data),
-        price_list=price_list,
-        customer=customer,
-    )
+    details = _build_items_details(pos_profile, items_data, price_list, customer)
 
     detail_map = {d["item_code"]: d for d in details}
     result = []
@@ -789,16 +1116,36 @@ def get_item_variants(pos_profile, parent_item_code, price_list=None, customer=N
 
 
 @frappe.whitelist()
-def get_items_details(pos_profile, items_data, price_list=None, customer=None):
-    """Bulk fetch item details for a list of items."""
+def get_items_details(pos_profile, items_data, price_list=None, customer=None, fields=None):
+    """Bulk fetch item details for a list of items.
+
+    ``fields`` (a JSON list or comma separated string) projects the result to
+    the given detail fields so only the lookups they need are run, e.g.
+    ``["actual_qty"]`` refreshes stock with a single Bin query.
+    """
 
     pos_profile, _ = _ensure_pos_profile(pos_profile)
     items_data = json.loads(items_data)
+    if isinstance(fields, str):
+        fields = json.loads(fields) if fields.lstrip().startswith("[") else fields.split(",")
+    if fields is not None:
+        fields = [cstr(field).strip() for field in fields if cstr(field).strip()]
+    return _build_items_details(pos_profile, items_data, price_list, customer, fields=fields or None)
+
+
+def _build_items_details(
+    pos_profile: Dict[str, Any],
+    items_data: List[Dict[str, Any]],
+    price_list: Optional[str] = None,
+    customer: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Return the item details for already parsed ``pos_profile`` and ``items_data``."""
 
     if not items_data:
         return []
 
-    aggregator = ItemDetailAggregator(pos_profile, price_list=price_list, customer=customer)
+    aggregator = ItemDetailAggregator(pos_profile, price_list=price_list, customer=customer, fields=fields)
     return aggregator.build_details(items_data)
 
 
@@ -841,11 +1188,7 @@ def get_item_detail(item, doc=None, warehouse=None, price_list=None, company=Non
     item["selling_price_list"] = price_list
 
     # Determine if multi-currency is enabled on the POS Profile
-    allow_multi_currency = False
-    if item.get("pos_profile"):
-        allow_multi_currency = (
-            frappe.db.get_value("POS Profile", item.get("pos_profile"), "posa_allow_multi_currency") or 0
-        )
+    allow_multi_currency = profile_flag(item.get("pos_profile"), "allow_multi_currency", False)
 
     # Ensure conversion rate exists when price list currency differs from
     # company currency to avoid ValidationError from ERPNext. Also provide
@@ -926,122 +1269,19 @@ def get_item_detail(item, doc=None, warehouse=None, price_list=None, company=Non
     return res
 
 
-def _get_scale_barcode_settings():
-    """Return the Scale Barcode Settings single document if it exists."""
-
-    try:
-        return frappe.get_cached_doc("Scale Barcode Settings")
-    except frappe.DoesNotExistError:
-        return None
-    except Exception:
-        frappe.log_error("Unable to load Scale Barcode Settings", "POS Awesome")
-        return None
-
-
-def _extract_numeric_segment(barcode: str, start: int, length: int, decimals: int = 0):
-    """Extract a numeric value from ``barcode`` using 1-indexed ``start`` and ``length``."""
-
-    if not (start and length):
-        return None
-
-    start_index = max(start - 1, 0)
-    end_index = start_index + max(length, 0)
-    if len(barcode) < end_index:
-        return None
-
-    whole = barcode[start_index:end_index]
-    decimal_part = ""
-    if decimals and decimals > 0:
-        decimal_end = end_index + decimals
-        if len(barcode) < decimal_end:
-            return None
-        decimal_part = barcode[end_index:decimal_end]
-
-    number_str = whole
-    if decimal_part:
-        number_str = f"{whole}.{decimal_part}"
-
-    try:
-        return flt(number_str)
-    except Exception:
-        return None
-
-
 def _parse_scale_barcode_data(barcode: str) -> Optional[Dict[str, Any]]:
-    """Parse barcode data according to the configured scale barcode settings."""
-
-    barcode_value = cstr(barcode or "").strip()
-    if not barcode_value:
-        return None
-
-    settings = _get_scale_barcode_settings()
-    if not settings:
-        return None
-
-    prefix_included = cint(settings.prefix_included_or_not)
-    prefix_length = cint(settings.no_of_prefix_characters) if prefix_included else 0
-    prefix_value = cstr(settings.prefix or "").strip()
+    """Parse barcode data according to the configured scale barcode formats."""
 
-    if prefix_value and not barcode_value.startswith(prefix_value):
-        return None
-
-    if prefix_included and prefix_length and len(barcode_value) < prefix_length:
-        return None
-
-    item_start = cint(settings.item_code_starting_digit)
-    item_digits = cint(settings.item_code_total_digits)
-    if not (item_start and item_digits):
-        return None
-
-    item_start_index = max(item_start - 1, 0)
-    item_end_index = item_start_index + item_digits
-    if len(barcode_value) < item_end_index:
-        return None
-
-    item_code = barcode_value[item_start_index:item_end_index]
-    data: Dict[str, Any] = {"barcode": barcode_value, "item_code": item_code}
-
-    qty = _extract_numeric_segment(
-        barcode_value,
-        cint(settings.weight_starting_digit),
-        cint(settings.weight_total_digits),
-        cint(settings.weight_decimals),
-    )
-    if qty is not None:
-        data["qty"] = qty
-
-    if cint(settings.price_included_in_barcode_or_not):
-        price = _extract_numeric_segment(
-            barcode_value,
-            cint(settings.price_starting_digit),
-            cint(settings.price_total_digit),
-            cint(settings.price_decimals),
-        )
-        if price is not None:
-            data["price"] = price
-
-    return data
+    return get_scale_barcode_parser().parse(barcode)
 
 
 @frappe.whitelist()
 def parse_scale_barcode(barcode: str):
     """Public API to parse a scale barcode and return decoded data."""
 
-    settings = _get_scale_barcode_settings()
-    metadata: Optional[Dict[str, Any]] = None
-
-    if settings:
-        metadata = {
-            "prefix": cstr(getattr(settings, "prefix", "") or "").strip(),
-            "prefix_included_or_not": cint(
-                getattr(settings, "prefix_included_or_not", 0)
-            ),
-            "no_of_prefix_characters": cint(
-                getattr(settings, "no_of_prefix_characters", 0)
-            ),
-        }
-
-    data = _parse_scale_barcode_data(barcode)
+    parser = get_scale_barcode_parser()
+    fmt, data = parser.match(barcode)
+    metadata = fmt.metadata if fmt else parser.metadata
 
     if not data:
         return {"settings": metadata} if metadata else None
@@ -1065,6 +1305,21 @@ def get_items_from_barcode(selling_price_list, currency, barcode):
         scale_price = scale_data.get("price")
 
     if not item_code:
+        entry = lookup_barcode(barcode)
+        if entry:
+            rate = entry_rate(entry, selling_price_list, currency)
+            return {
+                "item_code": entry["item_code"],
+                "item_name": entry["item_name"],
+                "barcode": barcode,
+                "rate": rate or 0,
+                "price_list_rate": rate or 0,
+                "uom": entry.get("posa_uom") or entry.get("stock_uom"),
+                "currency": currency,
+                "scale_qty": None,
+                "scale_price": None,
+            }
+
         search_item = frappe.db.get_value(
             "Item Barcode",
             {"barcode": barcode},
@@ -1194,6 +1449,149 @@ def search_serial_or_batch_or_barcode_number(search_value, search_serial_no=None
     return {}
 
 
+# Upper bound of values resolved by a single ``resolve_barcodes`` call.
+_MAX_BULK_BARCODES = 1000
+
+
+@frappe.whitelist()
+def resolve_barcodes(
+    values,
+    selling_price_list=None,
+    currency=None,
+    search_serial_no=None,
+    search_batch_no=None,
+):
+    """Resolve many scanned barcodes, serial numbers or batch numbers at once.
+
+    Returns one entry per input value, in input order, shaped like the result
+    of :func:`get_items_from_barcode` plus ``batch_no``/``serial_no`` when the
+    value matched one, or ``None`` when nothing matched. Lookups are set based
+    so the query count does not grow with the number of values.
+    """
+
+    if isinstance(values, str):
+        values = json.loads(values)
+    values = [cstr(value).strip() for value in values or []]
+    if len(values) > _MAX_BULK_BARCODES:
+        frappe.throw(_("At most {0} barcodes can be resolved at once").format(_MAX_BULK_BARCODES))
+
+    unique = [value for value in dict.fromkeys(values) if value]
+    matches: Dict[str, Dict[str, Any]] = {}
+
+    for value in unique:
+        scale_data = _parse_scale_barcode_data(value)
+        if scale_data and scale_data.get("item_code"):
+            matches[value] = {
+                "item_code": scale_data["item_code"],
+                "scale_qty": scale_data.get("qty"),
+                "scale_price": scale_data.get("price"),
+            }
+
+    pending = [value for value in unique if value not in matches]
+    entries = lookup_barcodes(pending) or {}
+    for value, entry in entries.items():
+        matches[value] = {
+            "item_code": entry["item_code"],
+            "item_name": entry["item_name"],
+            "uom": entry.get("posa_uom") or entry.get("stock_uom"),
+            "stock_uom": entry.get("stock_uom"),
+            "rate": entry_rate(entry, selling_price_list, currency) if selling_price_list else None,
+        }
+
+    pending = [value for value in pending if value not in matches]
+    if pending:
+        for row in frappe.get_all(
+            "Item Barcode",
+            fields=["parent", "barcode", "posa_uom"],
+            filters={"barcode": ["in", pending]},
+        ):
+            matches.setdefault(row.barcode, {"item_code": row.parent, "uom": row.posa_uom})
+
+    pending = [value for value in pending if value not in matches]
+    if pending and search_batch_no:
+        for row in frappe.get_all(
+            "Batch",
+            fields=["name", "item"],
+            filters={"name": ["in", pending]},
+        ):
+            matches[row.name] = {"item_code": row.item, "batch_no": row.name}
+
+    pending = [value for value in pending if value not in matches]
+    if pending and search_serial_no:
+        for row in frappe.get_all(
+            "Serial No",
+            fields=["name", "item_code"],
+            filters={"name": ["in", pending]},
+        ):
+            matches[row.name] = {"item_code": row.item_code, "serial_no": row.name}
+
+    item_codes = {match["item_code"] for match in matches.values() if "item_name" not in match}
+    items = {}
+    if item_codes:
+        items = {
+            item.name: item
+            for item in frappe.get_all(
+                "Item",
+                fields=["name", "item_name", "stock_uom"],
+                filters={"name": ["in", sorted(item_codes)]},
+            )
+        }
+
+    price_codes = {
+        match["item_code"]
+        for match in matches.values()
+        if match.get("rate") is None and match.get("scale_price") is None
+    }
+    rates: Dict[str, float] = {}
+    if selling_price_list and price_codes:
+        # Oldest first so the most recently modified price wins.
+        for row in frappe.get_all(
+            "Item Price",
+            fields=["item_code", "price_list_rate"],
+            filters={
+                "item_code": ["in", sorted(price_codes)],
+                "price_list": selling_price_list,
+                "currency": currency,
+            },
+            order_by="modified asc",
+        ):
+            rates[row.item_code] = row.price_list_rate
+
+    resolved: Dict[str, Optional[Dict[str, Any]]] = {}
+    for value, match in matches.items():
+        item_code = match["item_code"]
+        if "item_name" not in match:
+            item = items.get(item_code)
+            if not item:
+                resolved[value] = None
+                continue
+            match["item_name"] = item.item_name
+            match["stock_uom"] = item.stock_uom
+
+        rate = match.get("rate")
+        if match.get("scale_price") is not None:
+            rate = flt(match["scale_price"])
+        elif rate is None:
+            rate = rates.get(item_code)
+
+        resolved[value] = {
+            "value": value,
+            "item_code": item_code,
+            "item_name": match["item_name"],
+            "barcode": value,
+            "rate": rate or 0,
+            "price_list_rate": rate or 0,
+            "uom": match.get("uom") or match.get("stock_uom"),
+            "currency": currency,
+            "scale_qty": match.get("scale_qty"),
+            "scale_price": match.get("scale_price"),
+            "batch_no": match.get("batch_no"),
+            "serial_no": match.get("serial_no"),
+        }
+
+    return [resolved.get(value) for value in values]
+
+
 @frappe.whitelist()
 def update_price_list_rate(item_code, price_list, rate, uom=None):
     """Create or update Item Price for the given item and price list."""
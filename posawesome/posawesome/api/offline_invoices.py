@@ -0,0 +1,164 @@
+"""Replay of the invoices terminals queued while offline.
+
+Invoices carry a client generated ``posa_offline_uuid``; replaying an
+invoice that was already ingested returns the existing one, so a terminal
+can safely resend its queue after a dropped response. The whole queue is
+sent in one request: lookups the invoices share (profiles, customers, price
+list currencies, cash accounts, replayed UUIDs) are resolved once for the
+batch and each invoice is handled in its own savepoint.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple
+
+import frappe
+from frappe import _
+from frappe.utils import cstr, strip_html_tags
+
+from .invoices import (
+    OFFLINE_UUID_FIELD,
+    _invoice_doctype,
+    ingest_invoice,
+    update_invoice,
+)
+
+SUBMITTED = "Submitted"
+QUEUED = "Queued"
+REPLAYED = "Replayed"
+DRAFTED = "Drafted"
+FAILED = "Failed"
+
+_MAX_REPLAY_INVOICES = 200
+
+
+def _parse(value):
+    if isinstance(value, str):
+        return json.loads(value) if value else {}
+    return value or {}
+
+
+def _error_message(error: Exception) -> str:
+    return strip_html_tags(cstr(error)) or error.__class__.__name__
+
+
+@contextmanager
+def _shared_lookups(invoices: List[Dict[str, Any]]):
+    """Prefetch the lookups shared by ``invoices`` and memoise the rest for the batch."""
+
+    lookups: Dict[str, Any] = {"customer": set(), "price_list_currency": {}, "offline_invoice": {}}
+
+    customers = list({invoice.get("customer") for invoice in invoices if invoice.get("customer")})
+    if customers:
+        existing = frappe.get_all("Customer", filters={"name": ["in", customers]}, pluck="name")
+        lookups["customer"].update(existing)
+
+    price_lists = list({invoice.get("selling_price_list") for invoice in invoices} - {None, ""})
+    if price_lists:
+        rows = frappe.get_all(
+            "Price List", filters={"name": ["in", price_lists]}, fields=["name", "currency"]
+        )
+        lookups["price_list_currency"].update({row.name: row.currency for row in rows})
+
+    uuids_by_doctype: Dict[str, List[str]] = {}
+    for invoice in invoices:
+        offline_uuid = cstr(invoice.get(OFFLINE_UUID_FIELD)).strip()
+        if offline_uuid:
+            uuids_by_doctype.setdefault(_invoice_doctype(invoice), []).append(offline_uuid)
+    for doctype, uuids in uuids_by_doctype.items():
+        found = {
+            row[OFFLINE_UUID_FIELD]: row
+            for row in frappe.get_all(
+                doctype,
+                filters={OFFLINE_UUID_FIELD: ["in", uuids]},
+                fields=["name", "docstatus", OFFLINE_UUID_FIELD],
+            )
+        }
+        for offline_uuid in uuids:
+            lookups["offline_invoice"][(doctype, offline_uuid)] = found.get(offline_uuid)
+
+    frappe.local.posa_invoice_lookups = lookups
+    try:
+        yield
+    finally:
+        frappe.local.posa_invoice_lookups = None
+
+
+def _result(offline_uuid, name, status, error=None) -> Dict[str, Any]:
+    result = {"offline_uuid": offline_uuid, "name": name, "status": status}
+    if error:
+        result["error"] = error
+    return result
+
+
+def _replay_one(index: int, invoice: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    offline_uuid = cstr(invoice.get(OFFLINE_UUID_FIELD)).strip() or None
+    savepoint = f"posa_offline_replay_{index}"
+
+    frappe.db.savepoint(savepoint)
+    try:
+        response = ingest_invoice(copy.deepcopy(invoice), data)
+        if response.get("replayed"):
+            status = REPLAYED
+        elif response.get("submission"):
+            status = QUEUED
+        else:
+            status = SUBMITTED
+        return _result(offline_uuid, response.get("name"), status)
+    except frappe.UniqueValidationError:
+        frappe.db.rollback(save_point=savepoint)
+        # The batch memo predates the insert that won, ask the database.
+        existing = frappe.db.get_value(_invoice_doctype(invoice), {OFFLINE_UUID_FIELD: offline_uuid}, "name")
+        if existing:
+            return _result(offline_uuid, existing, REPLAYED)
+        error = _("Duplicate offline invoice")
+    except Exception as e:
+        frappe.db.rollback(save_point=savepoint)
+        error = _error_message(e)
+    finally:
+        frappe.clear_messages()
+
+    # Keep the sale as a draft, like the one by one sync did, so it is not lost.
+    frappe.db.savepoint(savepoint)
+    try:
+        draft = update_invoice(json.dumps(invoice, default=str))
+        return _result(offline_uuid, draft.get("name"), DRAFTED, error)
+    except Exception as e:
+        frappe.db.rollback(save_point=savepoint)
+        return _result(offline_uuid, None, FAILED, _error_message(e))
+    finally:
+        frappe.clear_messages()
+
+
+@frappe.whitelist()
+def replay_offline_invoices(invoices):
+    """Ingest a queue of offline invoices in one request.
+
+    ``invoices`` is a list of ``{"invoice": ..., "data": ...}`` entries as
+    passed to ``submit_invoice``. Returns one result per entry, in order, with
+    ``offline_uuid``, ``name`` and ``status`` (Submitted, Queued, Replayed,
+    Drafted or Failed); drafted and failed invoices add their ``error``.
+    """
+
+    entries: List[Dict[str, Any]] = _parse(invoices) or []
+    if len(entries) > _MAX_REPLAY_INVOICES:
+        frappe.throw(_("At most {0} offline invoices can be replayed at once").format(_MAX_REPLAY_INVOICES))
+
+    parsed: List[Tuple[Dict[str, Any], Dict[str, Any]]] = [
+        (_parse(entry.get("invoice")), _parse(entry.get("data"))) for entry in entries
+    ]
+    with _shared_lookups([invoice for invoice, _data in parsed]):
+        return [_replay_one(index, invoice, data) for index, (invoice, data) in enumerate(parsed)]
+
+
+__all__ = [
+    "DRAFTED",
+    "FAILED",
+    "QUEUED",
+    "REPLAYED",
+    "SUBMITTED",
+    "replay_offline_invoices",
+]
@@ -12,6 +12,7 @@ from erpnext.accounts.doctype.payment_request.payment_request import (
     get_dummy_message,
     get_existing_payment_request_amount,
 )
+from posawesome.posawesome.api.profile_context import profile_flag
 from posawesome.posawesome.api.utilities import ensure_child_doctype
 
 
@@ -216,7 +217,7 @@ def redeeming_customer_credit(invoice_doc, data, is_payment_entry, total_cash, c
     # redeeming customer credit with journal voucher
     today = nowdate()
     if data.get("redeemed_customer_credit"):
-        cost_center = frappe.get_value("POS Profile", invoice_doc.pos_profile, "cost_center")
+        cost_center = profile_flag(invoice_doc.pos_profile, "cost_center")
         if not cost_center:
             cost_center = frappe.get_value("Company", invoice_doc.company, "cost_center")
         if not cost_center:
@@ -0,0 +1,186 @@
+"""Cached, versioned POS Profile context shared by the API endpoints.
+
+The profile is loaded once per worker and exposed as an immutable
+:class:`PosProfileContext` with typed accessors for the flags the endpoints
+read on every call. Saving or deleting a POS Profile bumps its version in
+redis which makes every worker reload it on its next request; within one
+request the context is memoised on ``frappe.local``.
+"""
+
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, Optional, Tuple
+
+import frappe
+from frappe.utils import as_json, cint
+
+# Worker-local contexts keyed by (site, profile name).
+_contexts: Dict[Tuple[str, str], "PosProfileContext"] = {}
+_MAX_CACHED_PROFILES = 256
+
+
+@dataclass(frozen=True)
+class PosProfileContext:
+    """Immutable view of one POS Profile."""
+
+    name: str
+    version: str
+    company: Optional[str]
+    warehouse: Optional[str]
+    currency: Optional[str]
+    selling_price_list: Optional[str]
+    cost_center: Optional[str]
+    create_pos_invoice: bool
+    allow_background_submission: bool
+    single_pass_submission: bool
+    allow_delete: bool
+    allow_sales_order: bool
+    allow_multi_currency: bool
+    allow_return_without_invoice: bool
+    allow_free_batch_return: bool
+    tax_inclusive: bool
+    cash_mode_of_payment: Optional[str]
+    block_sale_beyond_available_qty: bool
+    server_cache_ttl: Optional[int]
+    profile: Dict[str, Any] = field(compare=False, repr=False)
+    profile_json: str = field(compare=False, repr=False)
+
+    @classmethod
+    def load(cls, name: str, version: str) -> "PosProfileContext":
+        profile = frappe.get_doc("POS Profile", name).as_dict()
+        ttl = cint(profile.get("posa_server_cache_duration"))
+        # An unset (or zero) value has always meant "block".
+        block_sale = cint(profile.get("posa_block_sale_beyond_available_qty") or 1)
+        return cls(
+            name=profile.name,
+            version=version,
+            company=profile.get("company"),
+            warehouse=profile.get("warehouse"),
+            currency=profile.get("currency"),
+            selling_price_list=profile.get("selling_price_list"),
+            cost_center=profile.get("cost_center"),
+            create_pos_invoice=bool(cint(profile.get("create_pos_invoice_instead_of_sales_invoice"))),
+            allow_background_submission=bool(cint(profile.get("posa_allow_submissions_in_background_job"))),
+            single_pass_submission=bool(cint(profile.get("posa_single_pass_submission"))),
+            allow_delete=bool(cint(profile.get("posa_allow_delete"))),
+            allow_sales_order=bool(cint(profile.get("posa_allow_sales_order"))),
+            allow_multi_currency=bool(cint(profile.get("posa_allow_multi_currency"))),
+            allow_return_without_invoice=bool(cint(profile.get("posa_allow_return_without_invoice"))),
+            allow_free_batch_return=bool(cint(profile.get("posa_allow_free_batch_return"))),
+            tax_inclusive=bool(cint(profile.get("posa_tax_inclusive"))),
+            cash_mode_of_payment=profile.get("posa_cash_mode_of_payment"),
+            block_sale_beyond_available_qty=bool(block_sale),
+            server_cache_ttl=ttl * 60 if ttl else None,
+            profile=profile,
+            profile_json=as_json(profile),
+        )
+
+    @property
+    def invoice_doctype(self) -> str:
+        return "POS Invoice" if self.create_pos_invoice else "Sales Invoice"
+
+    def get(self, fieldname: str, default: Any = None) -> Any:
+        """Return any other field of the profile."""
+
+        return self.profile.get(fieldname, default)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return a copy of the profile, child tables included, that callers may modify."""
+
+        return copy.deepcopy(self.profile)
+
+
+def _version_key(name: str) -> str:
+    return f"posa_profile_context_version|{name}"
+
+
+def get_profile_context(name: str) -> PosProfileContext:
+    """Return the context of POS Profile ``name``.
+
+    Raises ``frappe.DoesNotExistError`` for unknown profiles.
+    """
+
+    memo = getattr(frappe.local, "posa_profile_contexts", None)
+    if memo is None:
+        memo = frappe.local.posa_profile_contexts = {}
+    context = memo.get(name)
+    if context is not None:
+        return context
+
+    cache = frappe.cache()
+    version = cache.get_value(_version_key(name))
+    key = (frappe.local.site, name)
+    context = _contexts.get(key)
+    if version is None or context is None or context.version != version:
+        if version is None:
+            version = frappe.generate_hash(length=10)
+            cache.set_value(_version_key(name), version)
+        context = PosProfileContext.load(name, version)
+        if len(_contexts) >= _MAX_CACHED_PROFILES:
+            _contexts.clear()
+        _contexts[key] = context
+
+    memo[name] = context
+    return context
+
+
+def profile_flag(name: Optional[str], attribute: str, default: Any = None) -> Any:
+    """Return ``attribute`` of the context of ``name`` or ``default``.
+
+    Unknown or empty profile names resolve to ``default`` like the
+    ``frappe.db.get_value`` lookups this replaces.
+    """
+
+    if not name:
+        return default
+    try:
+        return getattr(get_profile_context(name), attribute)
+    except frappe.DoesNotExistError:
+        return default
+
+
+def clear_profile_context(name: str) -> None:
+    """Make every worker reload the context of ``name``."""
+
+    frappe.cache().set_value(_version_key(name), frappe.generate_hash(length=10))
+    _contexts.pop((frappe.local.site, name), None)
+    memo = getattr(frappe.local, "posa_profile_contexts", None)
+    if memo:
+        memo.pop(name, None)
+
+
+def on_pos_profile_change(doc, method=None, *args):
+    """Invalidate the cached context once the edit is committed.
+
+    ``after_rename`` passes the old name as the first extra argument.
+    """
+
+    names = {doc.name}
+    if method == "after_rename" and args:
+        names.add(args[0])
+    for name in names:
+        frappe.db.after_commit.add(partial(clear_profile_context, name))
+
+
+@frappe.whitelist()
+def get_pos_profile_version(pos_profile):
+    """Return the current version of ``pos_profile``.
+
+    Clients that cache the profile compare it with the version they hold and
+    only download the profile again when it changed.
+    """
+
+    context = get_profile_context(pos_profile)
+    return {"name": context.name, "version": context.version}
+
+
+__all__ = [
+    "PosProfileContext",
+    "clear_profile_context",
+    "get_pos_profile_version",
+    "get_profile_context",
+    "profile_flag",
+]
@@ -0,0 +1,220 @@
+"""Compiled scale barcode parser built from the Scale Barcode Settings."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+import frappe
+from frappe.utils import cint, cstr, flt
+
+_VERSION_KEY = "posa_scale_barcode_version"
+
+# Worker-local parser keyed by site, tagged with the settings version it was
+# compiled from. Saving the settings bumps the version in redis.
+_parsers: Dict[str, Tuple[Optional[str], "ScaleBarcodeParser"]] = {}
+
+
+@dataclass(frozen=True)
+class NumericSegment:
+    """Slice of a barcode holding a number with optional implied decimals."""
+
+    start: int
+    end: int
+    decimal_end: int
+
+    def read(self, barcode: str) -> Optional[float]:
+        if len(barcode) < self.decimal_end:
+            return None
+        whole = barcode[self.start : self.end]
+        if self.decimal_end > self.end:
+            whole = f"{whole}.{barcode[self.end : self.decimal_end]}"
+        try:
+            return float(whole)
+        except ValueError:
+            return flt(whole)
+
+
+def _segment(start: Any, length: Any, decimals: Any = 0) -> Optional[NumericSegment]:
+    start, length, decimals = cint(start), cint(length), cint(decimals)
+    if not (start and length):
+        return None
+    start_index = max(start - 1, 0)
+    end_index = start_index + max(length, 0)
+    return NumericSegment(start_index, end_index, end_index + max(decimals, 0))
+
+
+def _metadata(prefix: str, prefix_included: int, prefix_characters: int) -> Dict[str, Any]:
+    return {
+        "prefix": prefix,
+        "prefix_included_or_not": prefix_included,
+        "no_of_prefix_characters": prefix_characters,
+    }
+
+
+@dataclass(frozen=True)
+class ScaleBarcodeFormat:
+    """One scale barcode layout with all offsets resolved."""
+
+    name: str
+    prefix: str
+    prefix_included: int
+    prefix_characters: int
+    prefix_length: int
+    item_start: int
+    item_end: int
+    weight: Optional[NumericSegment]
+    price: Optional[NumericSegment]
+
+    @classmethod
+    def compile(cls, row: Any, name: str = "") -> Optional["ScaleBarcodeFormat"]:
+        """Return the format described by a settings document or format row."""
+
+        item_start = cint(row.get("item_code_starting_digit"))
+        item_digits = cint(row.get("item_code_total_digits"))
+        if not (item_start and item_digits):
+            return None
+
+        prefix_included = cint(row.get("prefix_included_or_not"))
+        prefix_characters = cint(row.get("no_of_prefix_characters"))
+        start_index = max(item_start - 1, 0)
+        price = None
+        if cint(row.get("price_included_in_barcode_or_not")):
+            price = _segment(
+                row.get("price_starting_digit"),
+                row.get("price_total_digit"),
+                row.get("price_decimals"),
+            )
+
+        return cls(
+            name=cstr(row.get("format_name") or name),
+            prefix=cstr(row.get("prefix") or "").strip(),
+            prefix_included=prefix_included,
+            prefix_characters=prefix_characters,
+            prefix_length=prefix_characters if prefix_included else 0,
+            item_start=start_index,
+            item_end=start_index + item_digits,
+            weight=_segment(
+                row.get("weight_starting_digit"),
+                row.get("weight_total_digits"),
+                row.get("weight_decimals"),
+            ),
+            price=price,
+        )
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return _metadata(self.prefix, self.prefix_included, self.prefix_characters)
+
+    def parse(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """Decode an already stripped ``barcode`` or return ``None``."""
+
+        if self.prefix and not barcode.startswith(self.prefix):
+            return None
+        if self.prefix_length and len(barcode) < self.prefix_length:
+            return None
+        if len(barcode) < self.item_end:
+            return None
+
+        data: Dict[str, Any] = {"barcode": barcode, "item_code": barcode[self.item_start : self.item_end]}
+        if self.weight:
+            qty = self.weight.read(barcode)
+            if qty is not None:
+                data["qty"] = qty
+        if self.price:
+            price = self.price.read(barcode)
+            if price is not None:
+                data["price"] = price
+        return data
+
+
+@dataclass(frozen=True)
+class ScaleBarcodeParser:
+    """Immutable set of formats; barcodes use the longest matching prefix."""
+
+    formats: Tuple[ScaleBarcodeFormat, ...]
+    # Prefix metadata of the main settings, exposed by the public API.
+    metadata: Optional[Dict[str, Any]] = field(default=None, compare=False)
+
+    @classmethod
+    def compile(cls, settings: Any) -> "ScaleBarcodeParser":
+        if not settings:
+            return cls(())
+
+        formats = [ScaleBarcodeFormat.compile(settings, name="default")]
+        for row in settings.get("additional_formats") or []:
+            formats.append(ScaleBarcodeFormat.compile(row))
+        compiled = [fmt for fmt in formats if fmt]
+        # Stable sort: on equal prefixes the main settings keep precedence.
+        compiled.sort(key=lambda fmt: len(fmt.prefix), reverse=True)
+        metadata = _metadata(
+            cstr(settings.get("prefix") or "").strip(),
+            cint(settings.get("prefix_included_or_not")),
+            cint(settings.get("no_of_prefix_characters")),
+        )
+        return cls(tuple(compiled), metadata)
+
+    def match(self, barcode: Any) -> Tuple[Optional[ScaleBarcodeFormat], Optional[Dict[str, Any]]]:
+        """Return the matching format and the decoded data."""
+
+        value = cstr(barcode or "").strip()
+        if not value:
+            return None, None
+        for fmt in self.formats:
+            data = fmt.parse(value)
+            if data:
+                return fmt, data
+        return None, None
+
+    def parse(self, barcode: Any) -> Optional[Dict[str, Any]]:
+        return self.match(barcode)[1]
+
+
+def _load_settings():
+    try:
+        return frappe.get_cached_doc("Scale Barcode Settings")
+    except frappe.DoesNotExistError:
+        return None
+    except Exception:
+        frappe.log_error("Unable to load Scale Barcode Settings", "POS Awesome")
+        return None
+
+
+def get_scale_barcode_parser() -> ScaleBarcodeParser:
+    """Return the compiled parser, checking the settings version once per request."""
+
+    parser = getattr(frappe.local, "posa_scale_barcode_parser", None)
+    if parser is not None:
+        return parser
+
+    version = frappe.cache().get_value(_VERSION_KEY)
+    site = frappe.local.site
+    cached = _parsers.get(site)
+    if cached and cached[0] == version and version is not None:
+        parser = cached[1]
+    else:
+        parser = ScaleBarcodeParser.compile(_load_settings())
+        if version is None:
+            version = frappe.generate_hash(length=10)
+            frappe.cache().set_value(_VERSION_KEY, version)
+        _parsers[site] = (version, parser)
+
+    frappe.local.posa_scale_barcode_parser = parser
+    return parser
+
+
+def clear_scale_barcode_parser() -> None:
+    """Invalidate the compiled parser on every worker."""
+
+    frappe.cache().set_value(_VERSION_KEY, frappe.generate_hash(length=10))
+    _parsers.pop(frappe.local.site, None)
+    if hasattr(frappe.local, "posa_scale_barcode_parser"):
+        del frappe.local.posa_scale_barcode_parser
+
+
+__all__ = [
+    "ScaleBarcodeFormat",
+    "ScaleBarcodeParser",
+    "clear_scale_barcode_parser",
+    "get_scale_barcode_parser",
+]
@@ -0,0 +1,174 @@
+"""Bulk stock snapshots across a warehouse and all of its descendants.
+
+Quantities are summed per item in one grouped ``Bin`` query joined to the
+warehouse nested set, so group warehouses cost no extra descendant lookup.
+Every snapshot is stamped with the item change sequence it reflects; clients
+poll with that stamp as ``since`` and only receive the items whose stock
+changed in between. Changes are tracked from stock ledger and Bin events, so
+reservations written straight to ``Bin`` only show up in a full snapshot.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import frappe
+from frappe import _
+from frappe.utils import cint, cstr, flt
+
+from .item_changes import change_floor, changed_item_codes, current_sequence
+from .profile_context import profile_flag
+
+STOCK_FIELDS = ("actual_qty", "reserved_qty", "projected_qty")
+
+_MAX_SNAPSHOT_ITEMS = 20000
+_QUERY_CHUNK_SIZE = 1000
+
+
+def get_stock_quantities(warehouse: Optional[str], item_codes: Iterable[str]) -> Dict[str, Dict[str, float]]:
+    """Return ``item_code -> {actual_qty, reserved_qty, projected_qty}``.
+
+    Quantities are summed over ``warehouse`` and its descendants. Requested
+    codes without a ``Bin`` row in that scope are reported with zeros.
+    """
+
+    codes = [code for code in dict.fromkeys(cstr(code) for code in item_codes) if code]
+    quantities = {code: dict.fromkeys(STOCK_FIELDS, 0.0) for code in codes}
+    if not warehouse or not codes:
+        return quantities
+
+    for start in range(0, len(codes), _QUERY_CHUNK_SIZE):
+        rows = frappe.db.sql(
+            """
+            SELECT
+                bin.item_code,
+                SUM(bin.actual_qty) AS actual_qty,
+                SUM(bin.reserved_qty) AS reserved_qty,
+                SUM(bin.projected_qty) AS projected_qty
+            FROM `tabBin` bin
+            INNER JOIN `tabWarehouse` wh ON wh.name = bin.warehouse
+            INNER JOIN `tabWarehouse` root ON root.name = %(warehouse)s
+            WHERE wh.lft >= root.lft
+                AND wh.rgt <= root.rgt
+                AND bin.item_code IN %(item_codes)s
+            GROUP BY bin.item_code
+            """,
+            {"warehouse": warehouse, "item_codes": tuple(codes[start : start + _QUERY_CHUNK_SIZE])},
+            as_dict=True,
+        )
+        for row in rows:
+            quantities[row.item_code] = {field: flt(row.get(field)) for field in STOCK_FIELDS}
+    return quantities
+
+
+def get_batch_quantities(
+    warehouse: Optional[str], item_batches: Iterable[Tuple[str, str]]
+) -> Dict[Tuple[str, str], float]:
+    """Return ``(item_code, batch_no) -> qty`` balances across ``warehouse`` and its descendants.
+
+    Serial and Batch Bundle entries and legacy ``batch_no`` ledger rows are
+    summed in one grouped query. Requested batches without stock report zero.
+    """
+
+    requested = dict.fromkeys((cstr(code), cstr(batch_no)) for code, batch_no in item_batches)
+    keys = [key for key in requested if all(key)]
+    quantities = dict.fromkeys(keys, 0.0)
+    if not warehouse or not keys:
+        return quantities
+
+    for start in range(0, len(keys), _QUERY_CHUNK_SIZE):
+        chunk = keys[start : start + _QUERY_CHUNK_SIZE]
+        rows = frappe.db.sql(
+            """
+            SELECT ledger.item_code, ledger.batch_no, SUM(ledger.qty) AS qty
+            FROM (
+                SELECT bundle.item_code, entry.batch_no, entry.warehouse, entry.qty
+                FROM `tabSerial and Batch Bundle` bundle
+                INNER JOIN `tabSerial and Batch Entry` entry ON entry.parent = bundle.name
+                WHERE
+                    bundle.docstatus = 1
+                    AND bundle.is_cancelled = 0
+                    AND bundle.type_of_transaction IN ('Inward', 'Outward')
+                    AND bundle.item_code IN %(item_codes)s
+                    AND entry.batch_no IN %(batch_nos)s
+                UNION ALL
+                SELECT sle.item_code, sle.batch_no, sle.warehouse, sle.actual_qty AS qty
+                FROM `tabStock Ledger Entry` sle
+                WHERE
+                    sle.is_cancelled = 0
+                    AND sle.item_code IN %(item_codes)s
+                    AND sle.batch_no IN %(batch_nos)s
+                    AND IFNULL(sle.serial_and_batch_bundle, '') = ''
+            ) ledger
+            INNER JOIN `tabWarehouse` wh ON wh.name = ledger.warehouse
+            INNER JOIN `tabWarehouse` root ON root.name = %(warehouse)s
+            WHERE wh.lft >= root.lft
+                AND wh.rgt <= root.rgt
+            GROUP BY ledger.item_code, ledger.batch_no
+            """,
+            {
+                "warehouse": warehouse,
+                "item_codes": tuple({code for code, _batch in chunk}),
+                "batch_nos": tuple({batch for _code, batch in chunk}),
+            },
+            as_dict=True,
+        )
+        for row in rows:
+            key = (row.item_code, row.batch_no)
+            if key in quantities:
+                quantities[key] = flt(row.qty)
+    return quantities
+
+
+def _parse_codes(item_codes) -> List[str]:
+    if isinstance(item_codes, str):
+        is_json = item_codes.lstrip().startswith("[")
+        item_codes = frappe.parse_json(item_codes) if is_json else item_codes.split(",")
+    return [cstr(code).strip() for code in item_codes or [] if cstr(code).strip()]
+
+
+@frappe.whitelist()
+def get_stock_snapshot(item_codes, warehouse=None, pos_profile=None, since=None):
+    """Return stock of ``item_codes`` across ``warehouse`` and its descendants.
+
+    ``warehouse`` defaults to the warehouse of ``pos_profile``. The response
+    carries the ``version`` the quantities reflect; passing it back as
+    ``since`` returns only the items whose stock changed after it. ``full``
+    tells whether every requested item is included.
+    """
+
+    codes = _parse_codes(item_codes)
+    if len(codes) > _MAX_SNAPSHOT_ITEMS:
+        frappe.throw(_("At most {0} items can be included in a stock snapshot").format(_MAX_SNAPSHOT_ITEMS))
+
+    if isinstance(pos_profile, str) and pos_profile.lstrip().startswith("{"):
+        pos_profile = frappe.parse_json(pos_profile).get("name")
+    warehouse = warehouse or profile_flag(pos_profile, "warehouse")
+    if not warehouse:
+        frappe.throw(_("A warehouse or POS Profile is required for a stock snapshot"))
+
+    # Read the stamp before the quantities so a change committed in between is
+    # reported again on the next poll rather than missed.
+    version = current_sequence()
+    # A stamp outside the tracked history (older than it, or issued before the
+    # change counter was reset) gets everything back.
+    full = since in (None, "") or not change_floor() <= cint(since) <= version
+    if not full:
+        changed = changed_item_codes(codes, cint(since), ("stock",))
+        codes = [code for code in codes if code in changed]
+
+    quantities = get_stock_quantities(warehouse, codes)
+    return {
+        "version": version,
+        "warehouse": warehouse,
+        "full": full,
+        "items": [dict(item_code=code, **quantities[code]) for code in codes],
+    }
+
+
+__all__ = [
+    "STOCK_FIELDS",
+    "get_batch_quantities",
+    "get_stock_quantities",
+    "get_stock_snapshot",
+]
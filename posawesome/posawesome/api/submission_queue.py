@@ -0,0 +1,157 @@
+"""Background invoice submissions keyed by client generated idempotency keys.
+
+Every submission gets one status entry in redis and one background job, both
+keyed by the idempotency key the terminal sends (or the invoice name), so
+retried requests neither create a second job nor a second invoice. Jobs only
+carry the key; the invoice is loaded by name when the job runs. Terminals
+poll :func:`get_submission_status` to learn when the invoice is posted.
+"""
+
+from __future__ import annotations
+
+import json
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+import frappe
+from frappe.utils import cstr
+
+QUEUED = "Queued"
+SUBMITTED = "Submitted"
+FAILED = "Failed"
+
+_STATUS_KEY = "posa_invoice_submission"
+# Status entries outlive any realistic shift; the invoice stays the source of truth.
+_STATUS_TTL = 7 * 24 * 60 * 60
+_MAX_POLLED_KEYS = 200
+
+
+def _status_key(key: str) -> str:
+    return frappe.cache().make_key(f"{_STATUS_KEY}|{key}")
+
+
+def submission_key(doctype: str, name: str, key: Optional[str] = None) -> str:
+    """Return the idempotency key of a submission, defaulting to the invoice."""
+
+    return cstr(key).strip() or f"{doctype}::{name}"
+
+
+def get_entry(key: str) -> Optional[Dict[str, Any]]:
+    """Return the stored status entry of ``key``."""
+
+    raw = frappe.cache().get(_status_key(key))
+    return json.loads(raw) if raw else None
+
+
+def set_entry(key: str, entry: Dict[str, Any]) -> None:
+    frappe.cache().set(_status_key(key), json.dumps(entry, default=str), ex=_STATUS_TTL)
+
+
+def pending_entry(key: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Return the entry of ``key`` unless it is unknown or failed (and may be retried)."""
+
+    if not key:
+        return None
+    entry = get_entry(key)
+    if entry and entry.get("status") != FAILED:
+        return entry
+    return None
+
+
+def _publish(key: str, entry: Dict[str, Any]) -> None:
+    set_entry(key, entry)
+    frappe.enqueue(
+        "posawesome.posawesome.api.invoices.submit_queued_invoice",
+        queue="short",
+        timeout=1000,
+        job_id=f"posa_invoice_submission::{frappe.local.site}::{key}",
+        deduplicate=True,
+        key=key,
+    )
+
+
+def enqueue_submission(invoice_doc, data: Dict[str, Any], key: Optional[str] = None) -> Dict[str, Any]:
+    """Queue the submission of the saved draft ``invoice_doc``.
+
+    The entry and the job are published once the draft is committed so a
+    rolled back request leaves nothing behind.
+    """
+
+    key = submission_key(invoice_doc.doctype, invoice_doc.name, key)
+    entry = {
+        "key": key,
+        "doctype": invoice_doc.doctype,
+        "invoice": invoice_doc.name,
+        "status": QUEUED,
+        "error": None,
+        "data": data,
+    }
+    frappe.db.after_commit.add(partial(_publish, key, entry))
+    return public_entry(entry)
+
+
+def public_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Return ``entry`` without the request data kept for the job."""
+
+    return {field: entry.get(field) for field in ("key", "doctype", "invoice", "status", "error")}
+
+
+def _can_read(doctype: Optional[str], name: Optional[str]) -> bool:
+    """Return whether the session user may read the invoice of a submission."""
+
+    if doctype not in ("Sales Invoice", "POS Invoice") or not name:
+        return False
+    # A failed submission may reference a draft that no longer exists.
+    if not frappe.db.exists(doctype, name):
+        return bool(frappe.has_permission(doctype, "read"))
+    return bool(frappe.has_permission(doctype, "read", name))
+
+
+def _invoice_status(key: str) -> Optional[Dict[str, Any]]:
+    """Derive the status from the invoice once the redis entry has expired."""
+
+    doctype, _sep, name = key.partition("::")
+    if not name or doctype not in ("Sales Invoice", "POS Invoice"):
+        return None
+    docstatus = frappe.db.get_value(doctype, name, "docstatus")
+    if docstatus is None or not frappe.has_permission(doctype, "read", name):
+        return None
+    status = SUBMITTED if docstatus == 1 else QUEUED
+    return {"key": key, "doctype": doctype, "invoice": name, "status": status, "error": None}
+
+
+@frappe.whitelist()
+def get_submission_status(keys):
+    """Return the submission status of each idempotency key in ``keys``.
+
+    Unknown keys and keys of invoices the user may not read are reported
+    with a ``None`` status.
+    """
+
+    if isinstance(keys, str):
+        keys = json.loads(keys) if keys.lstrip().startswith("[") else [keys]
+    keys = [cstr(key).strip() for key in keys or [] if cstr(key).strip()][:_MAX_POLLED_KEYS]
+
+    result: List[Dict[str, Any]] = []
+    for key in keys:
+        entry = get_entry(key)
+        if entry:
+            entry = public_entry(entry) if _can_read(entry.get("doctype"), entry.get("invoice")) else None
+        else:
+            entry = _invoice_status(key)
+        result.append(entry or {"key": key, "doctype": None, "invoice": None, "status": None, "error": None})
+    return result
+
+
+__all__ = [
+    "FAILED",
+    "QUEUED",
+    "SUBMITTED",
+    "enqueue_submission",
+    "get_entry",
+    "get_submission_status",
+    "pending_entry",
+    "public_entry",
+    "set_entry",
+    "submission_key",
+]
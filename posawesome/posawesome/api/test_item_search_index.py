@@ -0,0 +1,149 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api.item_search_index import ItemSearchIndex, _collect_index_entries, tokenize
+from posawesome.posawesome.api.items import _apply_ranked_search, _apply_search_index, _build_search_plan
+
+
+class TestItemSearchIndex(FrappeTestCase):
+    def setUp(self):
+        self.index = ItemSearchIndex(
+            {
+                "COKE-330": tokenize("COKE-330")
+                | tokenize("Coca-Cola Can 330ml")
+                | tokenize("5449000000996"),
+                "COKE-1L": tokenize("COKE-1L") | tokenize("Coca-Cola Bottle 1L"),
+                "PEPSI-330": tokenize("PEPSI-330") | tokenize("Pepsi Can 330ml"),
+            },
+            groups=["Drinks"],
+        )
+
+    def test_tokenize_keeps_whole_words_and_parts(self):
+        self.assertEqual(tokenize(" Coca-Cola  Can "), {"coca-cola", "coca", "cola", "can"})
+
+    def test_multi_word_search_intersects_prefixes(self):
+        self.assertEqual(self.index.search(["coca", "can"]), {"COKE-330"})
+        self.assertEqual(self.index.search(["330"]), {"COKE-330", "PEPSI-330"})
+
+    def test_barcode_and_code_lookup(self):
+        self.assertEqual(self.index.search(["5449000000996"]), {"COKE-330"})
+        self.assertEqual(self.index.search(["coke-1"]), {"COKE-1L"})
+
+    def test_no_match_returns_empty_set(self):
+        self.assertEqual(self.index.search(["coca", "pepsi"]), set())
+
+    def test_words_match_inside_tokens(self):
+        self.assertEqual(self.index.search(["ola"]), {"COKE-330", "COKE-1L"})
+        self.assertEqual(self.index.search(["epsi", "0ml"]), {"PEPSI-330"})
+
+    def test_short_words_do_not_narrow(self):
+        self.assertEqual(self.index.search(["1l", "bottle"]), {"COKE-1L"})
+        self.assertIsNone(self.index.search(["1l"]))
+
+    def test_reindexed_item_replaces_its_tokens(self):
+        self.index.set_entry("PEPSI-330", tokenize("PEPSI-330") | tokenize("Pepsi Max Can 330ml"))
+        self.assertEqual(self.index.search(["max"]), {"PEPSI-330"})
+
+        self.index.set_entry("PEPSI-330", None)
+        self.assertEqual(self.index.search(["epsi"]), set())
+
+    def test_covers_only_indexed_groups(self):
+        self.assertTrue(self.index.covers(["Drinks"]))
+        self.assertFalse(self.index.covers(["Snacks"]))
+        self.assertFalse(self.index.covers([]))
+
+
+class TestIndexEntries(FrappeTestCase):
+    def setUp(self):
+        if not frappe.db.exists("Item Group", "Posa Sparkling Drinks"):
+            frappe.get_doc(
+                {
+                    "doctype": "Item Group",
+                    "item_group_name": "Posa Sparkling Drinks",
+                    "parent_item_group": "All Item Groups",
+                }
+            ).insert(ignore_permissions=True)
+        for code, has_batch_no in (("POSA-IDX-PLAIN", 0), ("POSA-IDX-BATCH", 1)):
+            if not frappe.db.exists("Item", code):
+                frappe.get_doc(
+                    {
+                        "doctype": "Item",
+                        "item_code": code,
+                        "item_name": code,
+                        "stock_uom": "Nos",
+                        "is_stock_item": 1,
+                        "has_batch_no": has_batch_no,
+                        "item_group": "Posa Sparkling Drinks",
+                        "is_sales_item": 1,
+                    }
+                ).insert(ignore_permissions=True, ignore_mandatory=True)
+        self.batch = "POSA-IDX-BATCH-0001"
+        if not frappe.db.exists("Batch", self.batch):
+            frappe.get_doc({"doctype": "Batch", "batch_id": self.batch, "item": "POSA-IDX-BATCH"}).insert(
+                ignore_permissions=True
+            )
+
+    def test_item_group_and_batch_numbers_are_indexed(self):
+        entries = _collect_index_entries({"name": ["in", ["POSA-IDX-PLAIN", "POSA-IDX-BATCH"]]})
+        index = ItemSearchIndex(entries)
+
+        self.assertIn("sparkling", entries["POSA-IDX-PLAIN"])
+        self.assertIn(self.batch.lower(), entries["POSA-IDX-BATCH"])
+        self.assertEqual(index.search(["parkl"]), {"POSA-IDX-PLAIN", "POSA-IDX-BATCH"})
+        self.assertEqual(index.search([self.batch]), {"POSA-IDX-BATCH"})
+
+
+class TestApplySearchIndex(FrappeTestCase):
+    def setUp(self):
+        self.profile = {"name": "Test POS Profile"}
+
+    def _plan(self, search_value, resolved_item_code=None, include_description=False, **profile):
+        lookup = {"item_code": resolved_item_code} if resolved_item_code else {}
+        with patch(
+            "posawesome.posawesome.api.items.search_serial_or_batch_or_barcode_number", return_value=lookup
+        ):
+            return _build_search_plan(
+                dict(self.profile, **profile),
+                "",
+                search_value,
+                None,
+                None,
+                None,
+                None,
+                include_description,
+                False,
+                None,
+            )
+
+    def test_index_hits_narrow_the_query(self):
+        plan = self._plan("cola")
+        with patch("posawesome.posawesome.api.items.search_item_codes", return_value={"COKE-330"}):
+            narrowed = _apply_search_index(self.profile, plan, None)
+        self.assertEqual(narrowed.filters["name"], ["in", ["COKE-330"]])
+
+    def test_empty_index_result_falls_back_to_sql(self):
+        plan = self._plan("ola")
+        with patch("posawesome.posawesome.api.items.search_item_codes", return_value=set()):
+            self.assertIs(_apply_search_index(self.profile, plan, None), plan)
+
+    def test_description_search_skips_index(self):
+        plan = self._plan("sugar free", include_description=True)
+        with patch("posawesome.posawesome.api.items.search_item_codes") as search:
+            self.assertIs(_apply_search_index(self.profile, plan, None), plan)
+        search.assert_not_called()
+
+    def test_serial_lookup_keeps_limit_search_filters(self):
+        plan = self._plan("SN-0001", resolved_item_code="LAPTOP", posa_use_limit_search=1)
+        with patch("posawesome.posawesome.api.items.search_item_codes") as search:
+            self.assertIs(_apply_search_index(self.profile, plan, None), plan)
+        search.assert_not_called()
+        self.assertIn(["item_code", "like", "%LAPTOP%"], plan.or_filters)
+
+    def test_ranked_search_keeps_the_resolved_item(self):
+        plan = self._plan("SN-0001", resolved_item_code="LAPTOP")
+        profile = dict(self.profile, posa_item_search_mode="Ranked")
+        with patch("posawesome.posawesome.api.items.rank_item_codes") as rank:
+            self.assertIs(_apply_ranked_search(profile, plan, None), plan)
+        rank.assert_not_called()
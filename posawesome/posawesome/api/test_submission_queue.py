@@ -0,0 +1,56 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from posawesome.posawesome.api.invoices import submit_queued_invoice
+from posawesome.posawesome.api.submission_queue import (
+    FAILED,
+    QUEUED,
+    _status_key,
+    get_entry,
+    get_submission_status,
+    pending_entry,
+    set_entry,
+)
+
+
+class TestSubmissionQueue(FrappeTestCase):
+    def setUp(self):
+        self.key = f"test-{frappe.generate_hash(length=12)}"
+        self.invoice = f"POSA-MISSING-{frappe.generate_hash(length=8)}"
+        set_entry(
+            self.key,
+            {
+                "key": self.key,
+                "doctype": "Sales Invoice",
+                "invoice": self.invoice,
+                "status": QUEUED,
+                "error": None,
+                "data": {},
+            },
+        )
+
+    def tearDown(self):
+        frappe.set_user("Administrator")
+        frappe.cache().delete(_status_key(self.key))
+
+    def test_failed_submission_is_recorded(self):
+        submit_queued_invoice(self.key)
+
+        entry = get_entry(self.key)
+        self.assertEqual(entry["status"], FAILED)
+        self.assertIn(self.invoice, entry["error"])
+
+        status = get_submission_status([self.key])[0]
+        self.assertEqual(status["status"], FAILED)
+        self.assertEqual(status["error"], entry["error"])
+
+    def test_failed_submission_can_be_retried(self):
+        self.assertIsNotNone(pending_entry(self.key))
+        submit_queued_invoice(self.key)
+        self.assertIsNone(pending_entry(self.key))
+
+    def test_status_needs_read_permission(self):
+        frappe.set_user("Guest")
+        status = get_submission_status([self.key])[0]
+        self.assertIsNone(status["status"])
+        self.assertIsNone(status["invoice"])
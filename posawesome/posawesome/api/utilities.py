@@ -17,6 +17,7 @@ except ImportError:  # pragma: no cover - optional dependency
 _PSUTIL_MISSING_LOGGED = False
 import functools
 
+from .group_tree import get_group_tree, group_tree_condition
 from .utils import get_item_groups, fetch_sales_person_names
 from posawesome.utils import get_build_version
 
@@ -60,21 +61,21 @@ def get_root_of(doctype):
 
 
 def get_child_nodes(group_type, root):
-    lft, rgt = frappe.db.get_value(group_type, root, ["lft", "rgt"])
-    return frappe.get_all(
-        group_type,
-        filters={"lft": [">=", lft], "rgt": ["<=", rgt]},
-        fields=["name", "lft", "rgt"],
-        order_by="lft",
-    )
+    tree = get_group_tree(group_type)
+    return [
+        frappe._dict(name=name, lft=tree.bounds[name][0], rgt=tree.bounds[name][1])
+        for name in tree.expand([root])
+        if name in tree.bounds
+    ]
 
 
 def get_item_group_condition(pos_profile, item_groups=None):
     cond = " and 1=1"
     item_groups = item_groups or get_item_groups(pos_profile)
     if item_groups:
-        cond = " and item_group in (%s)" % (", ".join(["%s"] * len(item_groups)))
-        return cond % tuple(item_groups)
+        cond = " and item_group in (select name from `tabItem Group` where {})".format(
+            group_tree_condition("Item Group", item_groups)
+        )
 
     return cond
 
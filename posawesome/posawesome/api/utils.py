@@ -2,10 +2,12 @@ from __future__ import annotations
 
 import json
 import logging
-from functools import cache
 
 import frappe
 
+from .group_tree import expand_groups
+from .profile_context import get_profile_context
+
 # Reusable ORM filter to exclude template items
 HAS_VARIANTS_EXCLUSION = {"has_variants": 0}
 
@@ -17,42 +19,13 @@ def expand_item_groups(item_groups):
     """Expand any parent item groups to include their children.
 
     This function takes a list of item groups and expands any parent groups
-    to include all their descendants, while keeping leaf groups as-is.
+    to include all their descendants, while keeping leaf groups as-is. The
+    expansion is done in memory from the cached Item Group tree index.
     """
     if not item_groups:
         return item_groups
 
-    try:
-        from erpnext.utilities.doctype.item_group.item_group import get_child_groups
-    except Exception:
-        get_child_groups = None
-
-    expanded_groups = set()
-    for group in item_groups:
-        if not group:
-            continue
-
-        # Check if this is a parent group
-        is_group = frappe.db.get_value("Item Group", group, "is_group")
-
-        if is_group:
-            # If it's a parent group, get all its children
-            if get_child_groups:
-                try:
-                    descendants = get_child_groups(group) or []
-                    expanded_groups.update(descendants)
-                except Exception:
-                    # Fallback to database method
-                    descendants = frappe.db.get_descendants("Item Group", group) or []
-                    expanded_groups.update(descendants)
-            else:
-                descendants = frappe.db.get_descendants("Item Group", group) or []
-                expanded_groups.update(descendants)
-        else:
-            # If it's a leaf group, add it directly
-            expanded_groups.add(group)
-
-    return list(expanded_groups)
+    return expand_groups("Item Group", item_groups)
 
 
 @frappe.whitelist()
@@ -64,7 +37,7 @@ def get_active_pos_profile(user=None):
         profile = frappe.db.get_single_value("POS Settings", "pos_profile")
     if not profile:
         return None
-    return frappe.get_doc("POS Profile", profile).as_dict()
+    return get_profile_context(profile).as_dict()
 
 
 @frappe.whitelist()
@@ -121,15 +94,12 @@ def fetch_sales_person_names():
         return []
 
 
-@cache
 def get_item_groups(pos_profile: str) -> list[str]:
     """Return all item groups for a POS profile, including descendants.
 
     The linked groups from the ``POS Item Group`` child table are
-    expanded to include all of their descendants. Results are cached
-    to avoid duplicate database calls within a process.
-
-
+    expanded to include all of their descendants using the cached
+    Item Group tree index.
     """
     if not pos_profile or not frappe.db.exists("DocType", "POS Item Group"):
         return []
@@ -12,6 +12,8 @@ from frappe import _, DoesNotExistError
 from frappe.model.document import Document
 from frappe.utils import flt
 
+from posawesome.posawesome.api.profile_context import get_profile_context, profile_flag
+
 
 def get_base_value(doc, fieldname, base_fieldname=None, conversion_rate=None):
     """Return the value for a field in company currency."""
@@ -83,11 +85,7 @@ class POSClosingShift(Document):
         # link invoices with this closing shift so ERPNext can block edits
         self._set_closing_entry_invoices()
 
-        if frappe.db.get_value(
-            "POS Profile",
-            self.pos_profile,
-            "create_pos_invoice_instead_of_sales_invoice",
-        ):
+        if profile_flag(self.pos_profile, "create_pos_invoice", False):
             pos_invoices = []
             for d in self.pos_transactions:
                 invoice_details = frappe._dict(
@@ -194,16 +192,8 @@ class POSClosingShift(Document):
         return bool(frappe.db.exists("POS Invoice Merge Log", {"consolidated_credit_note": sales_invoice}))
 
     def delete_draft_invoices(self):
-        if frappe.get_value("POS Profile", self.pos_profile, "posa_allow_delete"):
-            doctype = (
-                "POS Invoice"
-                if frappe.db.get_value(
-                    "POS Profile",
-                    self.pos_profile,
-                    "create_pos_invoice_instead_of_sales_invoice",
-                )
-                else "Sales Invoice"
-            )
+        if profile_flag(self.pos_profile, "allow_delete", False):
+            doctype = get_profile_context(self.pos_profile).invoice_doctype
             data = frappe.db.sql(
                 f"""
 		select
@@ -240,9 +230,7 @@ class POSClosingShift(Document):
             if currency:
                 row["currencies"][currency] += flt(amount)
 
-        cash_mode_of_payment = (
-            frappe.db.get_value("POS Profile", self.pos_profile, "posa_cash_mode_of_payment") or "Cash"
-        )
+        cash_mode_of_payment = profile_flag(self.pos_profile, "cash_mode_of_payment") or "Cash"
 
         for row in self.get("pos_transactions", []):
             invoice = row.get("sales_invoice") or row.get("pos_invoice")
@@ -394,12 +382,7 @@ def get_cashiers(doctype, txt, searchfield, start, page_len, filters):
 def get_pos_invoices(pos_opening_shift, doctype=None):
     if not doctype:
         pos_profile = frappe.db.get_value("POS Opening Shift", pos_opening_shift, "pos_profile")
-        use_pos_invoice = frappe.db.get_value(
-            "POS Profile",
-            pos_profile,
-            "create_pos_invoice_instead_of_sales_invoice",
-        )
-        doctype = "POS Invoice" if use_pos_invoice else "Sales Invoice"
+        doctype = profile_flag(pos_profile, "invoice_doctype", "Sales Invoice")
     submit_printed_invoices(pos_opening_shift, doctype)
     cond = " and ifnull(consolidated_invoice,'') = ''" if doctype == "POS Invoice" else ""
     data = frappe.db.sql(
@@ -484,12 +467,7 @@ def get_closing_shift_overview(pos_opening_shift):
     company = opening_shift_doc.company
     company_currency = frappe.get_cached_value("Company", company, "default_currency")
 
-    use_pos_invoice = frappe.db.get_value(
-        "POS Profile",
-        pos_profile,
-        "create_pos_invoice_instead_of_sales_invoice",
-    )
-    doctype = "POS Invoice" if use_pos_invoice else "Sales Invoice"
+    doctype = profile_flag(pos_profile, "invoice_doctype", "Sales Invoice")
     invoices = get_pos_invoices(opening_shift_doc.name, doctype)
 
     total_invoices = len(invoices)
@@ -510,11 +488,7 @@ def get_closing_shift_overview(pos_opening_shift):
     overpayment_change_totals_by_currency = {}
     total_change_totals_by_currency = {}
 
-    cash_mode_of_payment = frappe.db.get_value(
-        "POS Profile", pos_profile, "posa_cash_mode_of_payment"
-    )
-    if not cash_mode_of_payment:
-        cash_mode_of_payment = "Cash"
+    cash_mode_of_payment = profile_flag(pos_profile, "cash_mode_of_payment") or "Cash"
 
     def accumulate_payment(container, mode, currency, amount, base_amount=0, conversion_rate=None):
         if not mode:
@@ -1106,12 +1080,7 @@ def get_closing_shift_overview(pos_opening_shift):
 @frappe.whitelist()
 def make_closing_shift_from_opening(opening_shift):
     opening_shift = json.loads(opening_shift)
-    use_pos_invoice = frappe.db.get_value(
-        "POS Profile",
-        opening_shift.get("pos_profile"),
-        "create_pos_invoice_instead_of_sales_invoice",
-    )
-    doctype = "POS Invoice" if use_pos_invoice else "Sales Invoice"
+    doctype = profile_flag(opening_shift.get("pos_profile"), "invoice_doctype", "Sales Invoice")
     submit_printed_invoices(opening_shift.get("name"), doctype)
     closing_shift = frappe.new_doc("POS Closing Shift")
     closing_shift.pos_opening_shift = opening_shift.get("name")
@@ -1187,13 +1156,9 @@ def make_closing_shift_from_opening(opening_shift):
         for p in d.payments:
             existing_pay = [pay for pay in payments if pay.mode_of_payment == p.mode_of_payment]
             if existing_pay:
-                cash_mode_of_payment = frappe.get_value(
-                    "POS Profile",
-                    opening_shift.get("pos_profile"),
-                    "posa_cash_mode_of_payment",
+                cash_mode_of_payment = (
+                    profile_flag(opening_shift.get("pos_profile"), "cash_mode_of_payment") or "Cash"
                 )
-                if not cash_mode_of_payment:
-                    cash_mode_of_payment = "Cash"
                 conversion_rate = d.get("conversion_rate")
                 if existing_pay[0].mode_of_payment == cash_mode_of_payment:
                     amount = get_base_value(p, "amount", "base_amount", conversion_rate) - get_base_value(
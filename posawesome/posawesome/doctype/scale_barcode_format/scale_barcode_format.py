@@ -0,0 +1,9 @@
+"""Child table holding one additional scale barcode layout."""
+
+from frappe.model.document import Document
+
+
+class ScaleBarcodeFormat(Document):
+    """A scale barcode layout decoded alongside the main settings."""
+
+    pass
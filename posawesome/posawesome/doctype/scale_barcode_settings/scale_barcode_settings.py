@@ -1,10 +1,15 @@
 # -*- coding: utf-8 -*-
 """Server-side logic for the Scale Barcode Settings doctype."""
 
+import frappe
 from frappe.model.document import Document
 
+from posawesome.posawesome.api.scale_barcode import clear_scale_barcode_parser
+
 
 class ScaleBarcodeSettings(Document):
     """Simple single doctype used to configure scale barcode parsing."""
 
-    pass
+    def on_update(self):
+        # Workers would otherwise re-cache the old settings before the commit.
+        frappe.db.after_commit.add(clear_scale_barcode_parser)